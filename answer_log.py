@@ -0,0 +1,174 @@
+"""
+Answer log module - append-only JSON-Lines journal of quiz answers and skips.
+Each answer is buffered in memory and appended as one line by a background
+writer, so recording an answer costs the same no matter how much history exists.
+The active file is rotated by size and by day; the old quiz_answers.json array
+is migrated once into the journal on first start.
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from metrics import metrics
+from persistence import append_text, write_bytes
+
+FLUSH_INTERVAL = 2.0            # Seconds between background appends
+FLUSH_THRESHOLD = 50            # Append immediately once this many answers are waiting
+MAX_SEGMENT_BYTES = 5 * 1024 * 1024  # Rotate the active file past 5 MB
+
+ACTIVE_NAME = "quiz_answers.jsonl"
+SEGMENT_PREFIX = "quiz_answers-"
+LEGACY_SEGMENT_NAME = "quiz_answers-legacy.jsonl"
+
+
+def journal_segments(log_dir):
+    """All journal files in log_dir, oldest first."""
+    log_dir = Path(log_dir)
+    rotated = sorted(
+        p for p in log_dir.glob(f"{SEGMENT_PREFIX}*.jsonl")
+        if p.name != LEGACY_SEGMENT_NAME
+    )
+    legacy = log_dir / LEGACY_SEGMENT_NAME
+    segments = ([legacy] if legacy.exists() else []) + rotated
+    active = log_dir / ACTIVE_NAME
+    if active.exists():
+        segments.append(active)
+    return segments
+
+
+def read_journal(log_dir):
+    """Every answer in the journal files (read-only: nothing is migrated or rotated)."""
+    answers = []
+    for segment in journal_segments(log_dir):
+        try:
+            with open(segment, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        answers.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line from a power cut - skip it
+                        continue
+        except IOError:
+            continue
+    return answers
+
+
+class AnswerLog:
+    """
+    Buffered, append-only answer journal with rotation.
+    """
+
+    def __init__(self, log_dir, legacy_file=None):
+        self.log_dir = Path(log_dir)
+        self.active_path = self.log_dir / ACTIVE_NAME
+        self.legacy_file = Path(legacy_file) if legacy_file is not None else None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.buffer = []
+
+        self.running = True
+        self.wake = threading.Event()
+        self.thread = None   # Started by the first append
+
+        atexit.register(self.close)
+
+    def migrate(self):
+        """
+        One-time conversion of the old quiz_answers.json array into a journal segment
+        (run at startup, before the server binds; the legacy segment sorts first).
+        """
+        legacy_file = self.legacy_file
+        if legacy_file is None or not legacy_file.exists():
+            return
+
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[Answers] Could not migrate {legacy_file}: {e}")
+            return
+        if not isinstance(records, list):
+            records = []
+
+        segment = self.log_dir / LEGACY_SEGMENT_NAME
+        lines = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+        try:
+            write_bytes(segment, lines.encode('utf-8'))
+            # Keep the original as a backup, but out of the way of future starts
+            os.replace(legacy_file, legacy_file.with_name(legacy_file.name + '.migrated'))
+            print(f"[Answers] Migrated {len(records)} answers from {legacy_file.name}")
+        except (IOError, OSError) as e:
+            print(f"[Answers] Error migrating {legacy_file}: {e}")
+
+    def append(self, record):
+        """Queue one answer record for the journal."""
+        with self.lock:
+            self.buffer.append(record)
+            if len(self.buffer) >= FLUSH_THRESHOLD:
+                self.wake.set()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+                self.thread.start()
+
+    def _rotate_if_needed(self):
+        """Close off the active file if it is too large or from a previous day."""
+        try:
+            st = self.active_path.stat()
+        except OSError:
+            return
+
+        written_on = date.fromtimestamp(st.st_mtime)
+        if st.st_size < MAX_SEGMENT_BYTES and written_on == date.today():
+            return
+
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        rotated = self.log_dir / f"{SEGMENT_PREFIX}{stamp}.jsonl"
+        suffix = 1
+        while rotated.exists():
+            rotated = self.log_dir / f"{SEGMENT_PREFIX}{stamp}-{suffix}.jsonl"
+            suffix += 1
+        os.replace(self.active_path, rotated)
+
+    def flush(self):
+        """Append all buffered answers to the active file."""
+        with self.write_lock:
+            with self.lock:
+                if not self.buffer:
+                    return
+                pending = self.buffer
+                self.buffer = []
+
+            lines = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in pending)
+            try:
+                with metrics.io_timer('save_answer'):
+                    self._rotate_if_needed()
+                    append_text(self.active_path, lines)
+            except (IOError, OSError) as e:
+                print(f"[Answers] Error writing answer log: {e}")
+                with self.lock:
+                    self.buffer = pending + self.buffer
+
+    def load_all(self):
+        """Read every recorded answer (for analysis - not used on the answer path)."""
+        self.flush()
+        with metrics.io_timer('load_answers'):
+            return read_journal(self.log_dir)
+
+    def _flush_loop(self):
+        while self.running:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background writer and append anything still buffered."""
+        self.running = False
+        self.wake.set()
+        self.flush()
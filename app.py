@@ -4,15 +4,22 @@ A Flask app that displays skills and videos from a folder structure.
 Now includes integrated Quiz Game functionality.
 """
 
+# Must come first: gevent/eventlet server modes patch the standard library on import
+from server_mode import SERVER_MODE, run_server
+from startup import startup, open_browser_when_ready
+
 import os
 import sys
 import json
 import time
 import random
+import signal
+import urllib.parse
+import mimetypes
 import webbrowser
 import threading
 from pathlib import Path
-from flask import Flask, render_template, jsonify, send_file, abort, request
+from flask import Flask, render_template, jsonify, abort, request, g, send_from_directory, send_file, Response
 import platform
 
 # Try to import Flask-SocketIO (optional, for gamepad support)
@@ -23,8 +30,23 @@ except ImportError:
     SOCKETIO_AVAILABLE = False
     print("[Info] flask-socketio not installed. Gamepad support disabled.")
 
-from quiz import load_questions
-from leaderboard import get_leaderboard, add_score, is_top_score, save_scores
+from quiz import QuestionBank
+from leaderboard import get_leaderboard, submit_score, is_top_score, save_scores, use_leaderboard
+from media_stream import stream_file
+from view_counter import ViewCounter
+from answer_log import AnswerLog
+from storage import (STORAGE_BACKEND, DATABASE_NAME, Database, import_on_first_start, SQLiteViewCounter,
+                     SQLiteAnswerLog, SQLiteLeaderboard, SQLiteQuestionEdits)
+from quiz_sessions import SessionManager, SESSION_COOKIE, SESSION_HEADER
+from latency_tracker import latency_tracker
+from metrics import metrics
+from profiler import PROFILING_ENABLED, DEFAULT_SECONDS, DEFAULT_INTERVAL, SamplingProfiler, RequestProfiler
+from asset_manifest import AssetManifest
+from compress_assets import compress_static, is_compressible, is_fresh, ENCODINGS
+from media_derivatives import DerivativeStore
+from media_ingest import MediaIngest
+from content_cache import ContentCache, CACHE_MB
+from media_stream import REMOVABLE_MOUNT_PREFIXES
 
 # Determine base path (works for both dev and PyInstaller exe)
 if getattr(sys, 'frozen', False):
@@ -63,48 +85,85 @@ def get_content_directory():
     print(f"[Content] Using local path: {local_path}")
     return local_path
 
-CONTENT_DIR = get_content_directory()
+with startup.phase('content dir'):
+    CONTENT_DIR = get_content_directory()
 VIEWS_FILE = BASE_DIR / "views.json"
-ANSWERS_FILE = BASE_DIR / "quiz_answers.json"
-
-import datetime
+ANSWERS_FILE = BASE_DIR / "quiz_answers.json"  # Legacy array, migrated into the journal
+ANSWERS_LOG_DIR = BASE_DIR / "data"
+QUESTIONS_FILE = BASE_DIR / "questions.json"
+QUESTION_HISTORY_FILE = BASE_DIR / "data" / "question_history.json"
+QUESTION_EDITS_FILE = BASE_DIR / "data" / "question_edits.jsonl"
+DATABASE_FILE = BASE_DIR / "data" / DATABASE_NAME
+DERIVATIVES_DIR = BASE_DIR / "data" / "derivatives"
+OPTIMIZED_DIR = BASE_DIR / "data" / "optimized"
+CONTENT_CACHE_DIR = BASE_DIR / "data" / "content_cache"
 
 def get_build_time():
-    """Get the latest modification time of key files to serve as build time."""
-    try:
-        # Check multiple files to ensure timestamp updates if any part changes
-        files_to_check = [
-            __file__,
-            str(BASE_DIR / "static" / "app.js"),
-            str(BASE_DIR / "static" / "style.css"),
-            str(BASE_DIR / "templates" / "index.html")
-        ]
-        
-        max_timestamp = 0
-        for f in files_to_check:
-            p = Path(f)
-            if p.exists():
-                ts = p.stat().st_mtime
-                if ts > max_timestamp:
-                    max_timestamp = ts
-        
-        if max_timestamp > 0:
-            dt = datetime.datetime.fromtimestamp(max_timestamp)
-            return dt.strftime("%H:%M %d/%b") # HH:MM DD/MMM
-            
-        return "Unknown"
-    except Exception as e:
-        print(f"Error getting build time: {e}")
-        return "Unknown"
+    """Build stamp (latest change to the key app files), computed once with the asset manifest."""
+    return asset_manifest.build_time
+
+# Views, answers, scores and question edits: JSON files (default) or SQLite (SKILLPLAYER_STORAGE=sqlite)
+# (the first-start import of the JSON files runs in prepare(), before the server binds)
+database = None
+if STORAGE_BACKEND == 'sqlite':
+    database = Database(DATABASE_FILE)
+    use_leaderboard(SQLiteLeaderboard(database))
+    print(f"[Storage] Using SQLite: {DATABASE_FILE}")
 
 app = Flask(__name__, 
             template_folder=str(BASE_DIR / "templates"),
             static_folder=str(BASE_DIR / "static"))
 
+# Count and time every request (registered first so it sees requests other hooks answer early)
+metrics.init_app(app)
+
+# Content-hashed static URLs; versioned requests are cached as immutable (hashed in prepare())
+asset_manifest = AssetManifest(BASE_DIR / "static", build_files=[
+    __file__,
+    BASE_DIR / "static" / "app.js",
+    BASE_DIR / "static" / "style.css",
+    BASE_DIR / "templates" / "index.html"
+])
+app.jinja_env.globals['asset_url'] = asset_manifest.url
+
+
+@app.before_request
+def serve_precompressed_static():
+    """Serve a fresh .br/.gz sibling of a static text file if the client accepts it."""
+    if request.endpoint != 'static':
+        return None
+    filename = (request.view_args or {}).get('filename', '')
+    if not is_compressible(filename):
+        return None
+
+    source = Path(app.static_folder) / filename
+    for encoding, suffix in ENCODINGS.items():
+        if not request.accept_encodings[encoding]:
+            continue
+        sibling = source.with_name(source.name + suffix)
+        if not is_fresh(source, sibling):
+            continue
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        return response
+    return None
+
+
+@app.after_request
+def set_static_cache_headers(response):
+    """Immutable caching for /static/<file>?v=<current hash>, revalidation for everything else in static/."""
+    if request.endpoint == 'static':
+        filename = (request.view_args or {}).get('filename', '')
+        response.headers['Cache-Control'] = asset_manifest.cache_control(filename, request.args.get('v'))
+        if is_compressible(filename):
+            response.vary.add('Accept-Encoding')
+    return response
+
 # Initialize SocketIO if available
 if SOCKETIO_AVAILABLE:
-    # Force threading mode since we're using standard Flask/Waitress
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+    # Async mode follows SKILLPLAYER_SERVER_MODE (threading, gevent or eventlet)
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=SERVER_MODE)
 else:
     socketio = None
 
@@ -114,6 +173,7 @@ gamepad_handler = None
 # SocketIO event handlers for gamepad session control
 if SOCKETIO_AVAILABLE and socketio:
     @socketio.on('start_gamepad_binding')
+    @metrics.track_socket('start_gamepad_binding')
     def handle_start_binding(data=None):
         """Frontend requests to enter binding mode."""
         player_count = 1
@@ -140,6 +200,7 @@ if SOCKETIO_AVAILABLE and socketio:
             })
     
     @socketio.on('end_gamepad_session')
+    @metrics.track_socket('end_gamepad_session')
     def handle_end_session():
         """Frontend requests to end the session."""
         global gamepad_handler
@@ -147,6 +208,12 @@ if SOCKETIO_AVAILABLE and socketio:
             gamepad_handler.end_session()
             print("[SocketIO] Gamepad session ended")
 
+    @socketio.on('input_ack')
+    @metrics.track_socket('input_ack')
+    def handle_input_ack(data=None):
+        """Frontend acted on a traced input event (latency tracing)."""
+        latency_tracker.ack(data)
+
 # Supported extensions
 SUPPORTED_EXTENSIONS = {
     # Video
@@ -163,89 +230,278 @@ NEW_CONTENT_THRESHOLD = NEW_CONTENT_DAYS * 24 * 60 * 60
 CATEGORIES = ['Skills', 'Equipment', 'Other']
 
 
-def is_new_file(file_path):
-    """Check if a file was modified within the NEW_CONTENT_THRESHOLD."""
-    try:
-        mtime = file_path.stat().st_mtime
-        age = time.time() - mtime
-        return age < NEW_CONTENT_THRESHOLD
-    except OSError:
-        return False
+def is_new_mtime(mtime, now=None):
+    """Check if a modification time falls within the NEW_CONTENT_THRESHOLD."""
+    if now is None:
+        now = time.time()
+    return now - mtime < NEW_CONTENT_THRESHOLD
 
 
-def get_skills(category='Skills'):
-    """Get list of skill folders from a category directory."""
-    category_dir = CONTENT_DIR / category
-    if not category_dir.exists():
-        category_dir.mkdir(parents=True, exist_ok=True)
-        return []
-    
-    skills = []
-    for item in sorted(category_dir.iterdir()):
-        if item.is_dir() and not item.name.startswith('.'):
-            # Check for logo
-            logo_file = None
-            for ext in ['.jpg', '.jpeg', '.png']:
-                potential_logo = item / f"{item.name}{ext}"
-                if potential_logo.exists():
-                    logo_file = create_logo_filename(item.name, ext)
-                    break
-            
-            # Check if any files in this skill are new
-            has_new_content = False
-            for f in item.iterdir():
-                if f.is_file() and f.suffix.lower() in SUPPORTED_EXTENSIONS:
-                    if is_new_file(f):
-                        has_new_content = True
-                        break
-            
-            skills.append({
-                'id': item.name,
-                'name': item.name,
-                'path': str(item),
-                'logo': logo_file,
-                'is_new': has_new_content,
-                'category': category
-            })
-    return skills
-
 def create_logo_filename(skill_name, ext):
     """Helper to create consistent logo filename for frontend."""
     return f"{skill_name}{ext}"
 
 
-def get_videos_for_skill(category, skill_name):
-    """Get list of files (videos/pdfs) in a skill folder."""
-    skill_path = CONTENT_DIR / category / skill_name
-    if not skill_path.exists() or not skill_path.is_dir():
-        return []
-    
-    files = []
-    for item in sorted(skill_path.iterdir()):
-        if item.is_file() and item.suffix.lower() in SUPPORTED_EXTENSIONS:
-            # Create a nice display name from filename
-            display_name = item.stem.replace('_', ' ').replace('-', ' ')
-            
-            # Determine type
-            file_type = 'pdf' if item.suffix.lower() == '.pdf' else 'video'
-            
-            files.append({
-                'id': item.name,
-                'name': display_name,
-                'filename': item.name,
+class ContentCatalog:
+    """
+    In-memory index of the content folder.
+    Built once at startup and refreshed per-folder by the content watcher,
+    so the API never walks the (possibly USB-mounted) content tree per request.
+    """
+
+    def __init__(self, content_dir, categories, derivatives=None, ingest=None):
+        self.content_dir = Path(content_dir)
+        self.categories = list(categories)
+        self.derivatives = derivatives  # Optional DerivativeStore: thumbnails/posters are queued on scan
+        self.ingest = ingest            # Optional MediaIngest: videos are queued for remux/transcode on scan
+        self.lock = threading.Lock()
+        # skills[category][skill_name] = {'path', 'logo', 'logo_mtime', 'files', 'newest_mtime'}
+        self.skills = {cat: {} for cat in self.categories}
+        self.started = False
+        self.indexed = threading.Event()  # Set once the first full index is built
+        self.watcher = None
+
+    def start(self):
+        """Build the index and start watching for changes (safe to call repeatedly)."""
+        with self.lock:
+            already_started = self.started
+            self.started = True
+        if already_started:
+            # Another thread is building the first index - don't serve a partial one
+            self.indexed.wait()
+            return
+
+        start_time = time.time()
+        try:
+            self.rebuild()
+        finally:
+            self.indexed.set()
+        count = sum(len(skills) for skills in self.skills.values())
+        print(f"[Catalog] Indexed {count} skills in {(time.time() - start_time) * 1000:.0f}ms")
+
+        try:
+            from content_watcher import start_content_watcher
+            self.watcher = start_content_watcher(self.content_dir, self.refresh_folder)
+        except Exception as e:
+            print(f"[Catalog] Could not start content watcher: {e}")
+
+    def rebuild(self):
+        """Rescan every category from scratch."""
+        for category in self.categories:
+            self._refresh_category(category, rescan_all=True)
+
+    def refresh_folder(self, folder):
+        """Refresh only the part of the index covered by a changed folder."""
+        try:
+            rel = Path(folder).resolve().relative_to(self.content_dir.resolve())
+        except ValueError:
+            return
+        parts = rel.parts
+
+        if len(parts) == 0:
+            self.rebuild()
+        elif parts[0] not in self.categories:
+            return
+        elif len(parts) == 1:
+            self._refresh_category(parts[0])
+        elif len(parts) == 2:
+            self._refresh_skill(parts[0], parts[1])
+
+    def _refresh_category(self, category, rescan_all=False):
+        """Re-list skill folders in a category, scanning only new ones unless rescan_all."""
+        category_dir = self.content_dir / category
+        if not category_dir.exists():
+            category_dir.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with os.scandir(category_dir) as entries:
+                names = sorted(
+                    entry.name for entry in entries
+                    if entry.is_dir() and not entry.name.startswith('.')
+                )
+        except OSError:
+            names = []
+
+        with self.lock:
+            current = self.skills.get(category, {})
+
+        updated = {}
+        for name in names:
+            if not rescan_all and name in current:
+                updated[name] = current[name]
+            else:
+                updated[name] = self._scan_skill(category_dir / name)
+
+        with self.lock:
+            self.skills[category] = updated
+
+    def _refresh_skill(self, category, skill_name):
+        """Rescan a single skill folder."""
+        skill_dir = self.content_dir / category / skill_name
+        entry = self._scan_skill(skill_dir) if skill_dir.is_dir() else None
+
+        with self.lock:
+            skills = dict(self.skills.get(category, {}))
+            if entry is None:
+                skills.pop(skill_name, None)
+            else:
+                skills[skill_name] = entry
+            self.skills[category] = dict(sorted(skills.items()))
+
+    def _scan_skill(self, skill_dir):
+        """Read a skill folder once: its logo and the mtime of every supported file."""
+        files = []
+        names = set()
+        try:
+            with os.scandir(skill_dir) as entries:
+                for entry in entries:
+                    names.add(entry.name)
+                    suffix = os.path.splitext(entry.name)[1].lower()
+                    if suffix in SUPPORTED_EXTENSIONS and entry.is_file():
+                        try:
+                            mtime = entry.stat().st_mtime
+                        except OSError:
+                            continue
+                        files.append((entry.name, mtime))
+        except OSError:
+            pass
+
+        logo_file = None
+        logo_mtime = 0
+        for ext in ['.jpg', '.jpeg', '.png']:
+            if f"{skill_dir.name}{ext}" in names:
+                logo_file = create_logo_filename(skill_dir.name, ext)
+                try:
+                    logo_mtime = os.stat(skill_dir / logo_file).st_mtime
+                except OSError:
+                    pass
+                break
+
+        files.sort()
+        if self.derivatives is not None:
+            # Generate missing thumbnails/posters in the background
+            if logo_file:
+                self.derivatives.schedule(skill_dir / logo_file)
+            for name, _ in files:
+                self.derivatives.schedule(skill_dir / name)
+        if self.ingest is not None:
+            for name, _ in files:
+                self.ingest.schedule(skill_dir / name)
+
+        return {
+            'path': str(skill_dir),
+            'logo': logo_file,
+            'logo_mtime': logo_mtime,
+            'files': files,
+            'newest_mtime': max((mtime for _, mtime in files), default=0)
+        }
+
+    def get_skills(self, category):
+        """List skills in a category with their 'is new' status."""
+        self.start()
+        now = time.time()
+        with self.lock:
+            skills = self.skills.get(category, {})
+            return [
+                {
+                    'id': name,
+                    'name': name,
+                    'path': entry['path'],
+                    'logo': entry['logo'],
+                    'thumb': thumbnail_url(category, name, entry['logo'], entry['logo_mtime']) if entry['logo'] else None,
+                    'is_new': bool(entry['files']) and is_new_mtime(entry['newest_mtime'], now),
+                    'category': category
+                }
+                for name, entry in skills.items()
+            ]
+
+    def get_files(self, category, skill_name):
+        """List the videos/PDFs in a skill folder."""
+        self.start()
+        now = time.time()
+        with self.lock:
+            entry = self.skills.get(category, {}).get(skill_name)
+            files = entry['files'] if entry else []
+
+        result = []
+        for filename, mtime in files:
+            stem, suffix = os.path.splitext(filename)
+            has_poster = self.derivatives is not None and self.derivatives.can_make(filename)
+            result.append({
+                'id': filename,
+                # Create a nice display name from filename
+                'name': stem.replace('_', ' ').replace('-', ' '),
+                'filename': filename,
                 'skill': skill_name,
                 'category': category,
-                'type': file_type,
-                'is_new': is_new_file(item)
+                'type': 'pdf' if suffix.lower() == '.pdf' else 'video',
+                'poster': thumbnail_url(category, skill_name, filename, mtime) if has_poster else None,
+                'is_new': is_new_mtime(mtime, now)
             })
-    return files
+        return result
+
+    def find_file(self, skill_name, filename):
+        """Path of a content file by skill and filename (the view-count key), or None."""
+        self.start()
+        with self.lock:
+            for skills in self.skills.values():
+                entry = skills.get(skill_name)
+                if entry and any(name == filename for name, _ in entry['files']):
+                    return Path(entry['path']) / filename
+        return None
+
+    def has_files(self):
+        """Whether the index holds any content file at all."""
+        self.start()
+        with self.lock:
+            return any(entry['files'] for skills in self.skills.values() for entry in skills.values())
+
+    def category_has_new(self, category):
+        """Check whether any skill in a category has new content."""
+        self.start()
+        now = time.time()
+        with self.lock:
+            return any(
+                entry['files'] and is_new_mtime(entry['newest_mtime'], now)
+                for entry in self.skills.get(category, {}).values()
+            )
+
+
+def thumbnail_url(category, skill_name, filename, mtime):
+    """URL of the small thumbnail/poster for a content file (versioned by mtime so it can be cached)."""
+    path = '/'.join(urllib.parse.quote(part) for part in (category, skill_name, filename))
+    return f"/thumb/{path}?v={int(mtime * 1000)}"
+
+
+# Downscaled logos and video posters, made by background worker threads
+derivative_store = DerivativeStore(DERIVATIVES_DIR)
+# Faststart H.264 copies of videos the Pi can't stream well, made one at a time
+media_ingest = MediaIngest(OPTIMIZED_DIR)
+content_catalog = ContentCatalog(CONTENT_DIR, CATEGORIES, derivatives=derivative_store, ingest=media_ingest)
+
+# Local read-through copies of content on a USB stick (SKILLPLAYER_CONTENT_CACHE_MB=0 disables)
+# (the existing copies are indexed in warm_up)
+content_cache = None
+if CACHE_MB > 0 and str(CONTENT_DIR.resolve()).startswith(REMOVABLE_MOUNT_PREFIXES):
+    content_cache = ContentCache(CONTENT_DIR, CONTENT_CACHE_DIR)
+
+
+def get_skills(category='Skills'):
+    """Get list of skill folders from a category directory."""
+    return content_catalog.get_skills(category)
+
+
+def get_videos_for_skill(category, skill_name):
+    """Get list of files (videos/pdfs) in a skill folder."""
+    return content_catalog.get_files(category, skill_name)
 
 
 @app.route('/')
 def index():
     """Render the main application page."""
     build_time = get_build_time()
-    return render_template('index.html', build_time=build_time)
+    return render_template('index.html', build_time=build_time, asset_urls=asset_manifest.urls(),
+                           profiling_enabled=PROFILING_ENABLED)
 
 
 @app.route('/api/categories')
@@ -253,9 +509,7 @@ def api_categories():
     """API endpoint to get available categories with new status."""
     result = []
     for cat in CATEGORIES:
-        skills = get_skills(cat)
-        has_new = any(s.get('is_new', False) for s in skills)
-        result.append({'name': cat, 'is_new': has_new})
+        result.append({'name': cat, 'is_new': content_catalog.category_has_new(cat)})
     return jsonify(result)
 
 
@@ -279,39 +533,36 @@ def api_skill_videos(category, skill_name):
 # View Tracking Functions
 # ========================================
 
-def load_views():
-    """Load view counts from JSON file."""
-    if VIEWS_FILE.exists():
-        try:
-            with open(VIEWS_FILE, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
+# Counts live in memory and are written to views.json in the background (or one upsert per play in SQLite)
+view_counter = SQLiteViewCounter(database) if database else ViewCounter(VIEWS_FILE)
 
 
-def save_views(views):
-    """Save view counts to JSON file."""
-    try:
-        with open(VIEWS_FILE, 'w') as f:
-            json.dump(views, f, indent=2)
-    except IOError:
-        pass
+def load_views():
+    """Get a copy of all view counts."""
+    return view_counter.snapshot()
 
 
 def increment_view(skill_name, filename):
-    """Increment view count for a specific file."""
-    views = load_views()
+    """Increment view count for a specific file. Returns (count, total)."""
     key = f"{skill_name}/{filename}"
-    views[key] = views.get(key, 0) + 1
-    save_views(views)
-    return views[key]
+    return view_counter.increment(key)
 
 
 def get_total_views():
     """Get total view count across all files."""
-    views = load_views()
-    return sum(views.values())
+    return view_counter.get_total()
+
+
+def most_viewed_files():
+    """Content file paths, most viewed first (files that no longer exist are skipped)."""
+    ranked = sorted(view_counter.snapshot().items(), key=lambda item: item[1], reverse=True)
+    paths = []
+    for key, _ in ranked:
+        skill_name, _, filename = key.partition('/')
+        path = content_catalog.find_file(skill_name, filename)
+        if path is not None:
+            paths.append(path)
+    return paths
 
 
 @app.route('/api/views/increment', methods=['POST'])
@@ -321,8 +572,8 @@ def api_increment_view():
     skill = data.get('skill', '')
     filename = data.get('filename', '')
     if skill and filename:
-        count = increment_view(skill, filename)
-        return jsonify({'count': count, 'total': get_total_views()})
+        count, total = increment_view(skill, filename)
+        return jsonify({'count': count, 'total': total})
     return jsonify({'error': 'Missing skill or filename'}), 400
 
 
@@ -332,14 +583,36 @@ def api_total_views():
     return jsonify({'total': get_total_views()})
 
 
+def content_file(category, skill_name, filename):
+    """Path of a file in the content folder from URL parts, or None if it resolves outside the folder."""
+    file_path = CONTENT_DIR / category / skill_name / filename
+    try:
+        if not file_path.resolve().is_relative_to(CONTENT_DIR.resolve()):
+            return None
+    except OSError:
+        return None
+    return file_path
+
+
 @app.route('/video/<category>/<skill_name>/<filename>')
 def serve_file(category, skill_name, filename):
-    """Serve a video, PDF, or image file."""
-    file_path = CONTENT_DIR / category / skill_name / filename
+    """Serve a video, PDF, or image file (supports Range requests for seeking)."""
+    file_path = content_file(category, skill_name, filename)
     
-    if not file_path.exists():
+    if file_path is None or not file_path.is_file():
         abort(404)
     
+    # Stream the optimized copy once the ingest worker has made one
+    optimized = media_ingest.optimized_path(file_path)
+    if optimized is not None:
+        return stream_file(optimized, 'video/mp4')
+    
+    # Read from the local copy if the file is cached and unchanged
+    if content_cache is not None:
+        cached = content_cache.lookup(file_path)
+        if cached is not None:
+            file_path = cached
+    
     # Determine MIME type
     ext = file_path.suffix.lower()
     mime_types = {
@@ -359,46 +632,102 @@ def serve_file(category, skill_name, filename):
         '.png': 'image/png'
     }
     
-    return send_file(
-        file_path,
-        mimetype=mime_types.get(ext, 'application/octet-stream')
-    )
+    return stream_file(file_path, mime_types.get(ext, 'application/octet-stream'))
+
+
+def send_derivative(source):
+    """
+    Send the cached thumbnail/poster for source.
+    Until it exists, images fall back to the original and videos get a 404 (the UI keeps its icon).
+    """
+    derivative = derivative_store.get(source)
+    if derivative is not None:
+        # Versioned URLs (?v=mtime / ?v=hash) never change content
+        return send_file(derivative, max_age=31536000 if request.args.get('v') else None)
+    if source.suffix.lower() in ('.jpg', '.jpeg', '.png'):
+        return stream_file(source, mimetypes.guess_type(source.name)[0] or 'application/octet-stream')
+    abort(404)
+
+
+@app.route('/thumb/<category>/<skill_name>/<filename>')
+def serve_thumbnail(category, skill_name, filename):
+    """Small cached version of a skill logo, or a poster frame for a video."""
+    if category not in CATEGORIES:
+        abort(404)
+    source = content_file(category, skill_name, filename)
+    if source is None or not source.is_file():
+        abort(404)
+    return send_derivative(source)
+
+
+@app.route('/thumb/static/<filename>')
+def serve_static_thumbnail(filename):
+    """Downscaled version of a UI image from static/."""
+    if filename not in asset_manifest.hashes:
+        abort(404)
+    return send_derivative(Path(app.static_folder) / filename)
+
+
+def image_url(name):
+    """Template helper: downscaled UI image once its thumbnail is ready, else the original."""
+    version = asset_manifest.hashes.get(name)  # None until the manifest is built
+    if version is not None and derivative_store.get(Path(app.static_folder) / name) is not None:
+        return f"/thumb/static/{urllib.parse.quote(name)}?v={version}"
+    return asset_manifest.url(name)
+
+
+app.jinja_env.globals['image_url'] = image_url
 
 
 # ========================================
 # Quiz Game API Routes
 # ========================================
 
-# Store active quiz game sessions (simple in-memory for single player)
-current_quiz_game = {
-    "questions": [],
-    "current_index": 0,
-    "score": 0
-}
+# Per-client quiz/calibration/review state (see quiz_sessions.py)
+quiz_sessions = SessionManager()
+
+
+def get_quiz_session():
+    """Get (or create) the quiz session for the client making this request."""
+    session_id = request.cookies.get(SESSION_COOKIE) or request.headers.get(SESSION_HEADER)
+    session, created = quiz_sessions.get_or_create(session_id)
+    if created:
+        g.new_quiz_session_id = session.id
+    return session
+
+
+@app.after_request
+def set_quiz_session_cookie(response):
+    """Hand newly created session ids back to the browser."""
+    session_id = g.get('new_quiz_session_id')
+    if session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='Lax')
+    return response
 
-# Dealt deck: persists across games so every question is seen before any repeats.
-# Holds raw question dicts (answers not yet shuffled).
-quiz_deck = []
 
 DEAL_SIZE = 25  # Questions dealt per game (well above max answerable in 60s)
 
+# Parsed question bank shared by quiz, calibration and review (reloads on file change)
+question_bank = QuestionBank(QUESTIONS_FILE, QUESTION_HISTORY_FILE, QUESTION_EDITS_FILE,
+                             edit_store=SQLiteQuestionEdits(database) if database else None)
+
 
 @app.route('/api/quiz/start', methods=['GET'])
 def quiz_start_game():
-    """Start a new quiz game, dealing from the persistent deck."""
-    global quiz_deck
-
-    all_questions = load_questions()
+    """Start a new quiz game, dealing from this client's persistent deck."""
+    session = get_quiz_session()
+    all_questions = question_bank.all()
 
-    # Refill the deck whenever it runs low
-    if len(quiz_deck) < DEAL_SIZE:
-        new_deck = all_questions.copy()
-        random.shuffle(new_deck)
-        quiz_deck = quiz_deck + new_deck  # keep any remaining at the front
+    with session.lock:
+        # Refill the deck whenever it runs low
+        if len(session.deck) < DEAL_SIZE:
+            new_deck = all_questions.copy()
+            random.shuffle(new_deck)
+            session.deck = session.deck + new_deck  # keep any remaining at the front
 
-    # Deal from the front of the deck
-    deal = quiz_deck[:DEAL_SIZE]
-    quiz_deck = quiz_deck[DEAL_SIZE:]
+        # Deal from the front of the deck
+        deal = session.deck[:DEAL_SIZE]
+        session.deck = session.deck[DEAL_SIZE:]
 
     # Shuffle answers fresh for each dealt question
     game_questions = []
@@ -414,9 +743,10 @@ def quiz_start_game():
         })
 
     # Store game state
-    current_quiz_game["questions"] = game_questions
-    current_quiz_game["current_index"] = 0
-    current_quiz_game["score"] = 0
+    with session.lock:
+        session.game["questions"] = game_questions
+        session.game["current_index"] = 0
+        session.game["score"] = 0
 
     # Return questions without correct answer info to client
     client_questions = [
@@ -442,26 +772,18 @@ def quiz_start_game():
 # Quiz Answer Tracking Functions
 # ========================================
 
+# Answers are appended to a JSON-Lines journal in data/ by a background writer (or inserted in SQLite)
+answer_log = SQLiteAnswerLog(database) if database else AnswerLog(ANSWERS_LOG_DIR, legacy_file=ANSWERS_FILE)
+
+
 def load_answers():
-    """Load quiz answers from JSON file."""
-    if ANSWERS_FILE.exists():
-        try:
-            with open(ANSWERS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-    return []
+    """Load every recorded quiz answer from the journal."""
+    return answer_log.load_all()
 
 
 def save_answer(answer_data):
-    """Append a quiz answer record to the JSON file."""
-    answers = load_answers()
-    answers.append(answer_data)
-    try:
-        with open(ANSWERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(answers, f, indent=2)
-    except IOError:
-        pass
+    """Append a quiz answer record to the journal."""
+    answer_log.append(answer_data)
 
 
 @app.route('/api/quiz/answer', methods=['POST'])
@@ -474,14 +796,17 @@ def quiz_check_answer():
     streak_count = data.get('streak_count', 0)
     timestamp = data.get('timestamp', '')
     
-    if question_index >= len(current_quiz_game["questions"]):
-        return jsonify({"success": False, "error": "Invalid question"})
-    
-    question = current_quiz_game["questions"][question_index]
-    is_correct = answer_index == question["correct_index"]
-    
-    if is_correct:
-        current_quiz_game["score"] += 1
+    session = get_quiz_session()
+    with session.lock:
+        if question_index >= len(session.game["questions"]):
+            return jsonify({"success": False, "error": "Invalid question"})
+        
+        question = session.game["questions"][question_index]
+        is_correct = answer_index == question["correct_index"]
+        
+        if is_correct:
+            session.game["score"] += 1
+        score = session.game["score"]
     
     # Save answer tracking data
     # Use the hash ID if available, otherwise fallback to index (shouldn't happen with new logic)
@@ -501,7 +826,7 @@ def quiz_check_answer():
         "success": True,
         "correct": is_correct,
         "correct_index": question["correct_index"],
-        "score": current_quiz_game["score"]
+        "score": score
     })
 
 
@@ -522,19 +847,12 @@ def quiz_submit_score():
     name = data.get('name', 'ANON')
     stats = data.get('stats', {})  # Get optional stats
     
-    # Check if it's a top score
-    if is_top_score(score):
-        updated_scores = add_score(name, score, stats)
-        return jsonify({
-            "success": True,
-            "is_top_score": True,
-            "scores": updated_scores
-        })
-    
+    # Adds the score only if it makes the board (one check, one background write)
+    made_board, updated_scores = submit_score(name, score, stats)
     return jsonify({
         "success": True,
-        "is_top_score": False,
-        "scores": get_leaderboard()
+        "is_top_score": made_board,
+        "scores": updated_scores
     })
 
 
@@ -572,9 +890,11 @@ def quiz_track_skip():
     
     # Get question ID from current game state if possible
     question_id = question_index
-    if question_index < len(current_quiz_game["questions"]):
-        question = current_quiz_game["questions"][question_index]
-        question_id = question.get("id", question_index)
+    session = get_quiz_session()
+    with session.lock:
+        if question_index < len(session.game["questions"]):
+            question = session.game["questions"][question_index]
+            question_id = question.get("id", question_index)
 
     # Save skip as answer tracking data
     save_answer({
@@ -598,65 +918,42 @@ def quiz_track_skip():
 # Calibration Mode API Routes
 # ========================================
 
-# Store active calibration session
-calibration_session = {
-    "active": False,
-    "level": 0,
-    "questions": [],
-    "current_index": 0
-}
-
-QUESTIONS_FILE = BASE_DIR / "questions.json"
-
-
 @app.route('/api/quiz/calibration/counts', methods=['GET'])
 def calibration_counts():
     """Get count of questions at each calibration level."""
-    all_questions = load_all_questions()
-    
-    # Count questions at each level (0-5)
-    counts = {i: 0 for i in range(6)}
-    for q in all_questions:
-        level = q.get("calibration_level", 0)
-        if level in counts:
-            counts[level] += 1
-        else:
-            counts[0] += 1  # Default to 0 if invalid
+    counts = question_bank.level_counts()
     
     return jsonify({
         "success": True,
         "counts": counts,
-        "total": len(all_questions)
+        "total": len(question_bank.all())
     })
 
 
 def load_all_questions():
-    """Load all questions from the JSON file."""
-    if QUESTIONS_FILE.exists():
-        try:
-            with open(QUESTIONS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-    return []
+    """Get all questions from the shared question bank."""
+    return question_bank.all()
 
 
 def save_all_questions(questions):
     """Save all questions back to the JSON file."""
-    try:
-        with open(QUESTIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(questions, f, indent=2, ensure_ascii=False)
-        return True
-    except IOError:
-        return False
-
-
-def get_question_by_text(questions, question_text):
-    """Find a question in the list by its text."""
-    for q in questions:
-        if q.get("question") == question_text:
-            return q
-    return None
+    return question_bank.save(questions)
+
+
+def get_session_question_id(session_questions, data):
+    """
+    Work out which question a request refers to.
+    Prefers the stable hash ID sent by the client, falling back to the session index.
+    Returns None if neither identifies a question in the session.
+    """
+    question_id = data.get('question_id')
+    if question_id and any(q["id"] == question_id for q in session_questions):
+        return question_id
+
+    question_index = data.get('question_index', 0)
+    if question_index < 0 or question_index >= len(session_questions):
+        return None
+    return session_questions[question_index]["id"]
 
 
 @app.route('/api/quiz/calibration/start', methods=['POST'])
@@ -668,12 +965,8 @@ def calibration_start():
     if level < 1 or level > 5:
         return jsonify({"success": False, "error": "Invalid level. Must be 1-5."})
     
-    # Load all questions and filter by calibration_level < selected level
-    all_questions = load_all_questions()
-    eligible_questions = [
-        q for q in all_questions 
-        if q.get("calibration_level", 0) == level - 1
-    ]
+    # Questions sitting one level below the selected level
+    eligible_questions = question_bank.at_level(level - 1)
     
     if len(eligible_questions) == 0:
         return jsonify({
@@ -695,18 +988,22 @@ def calibration_start():
             "question": q["question"],
             "answers": answers,
             "correct_index": answers.index(correct_answer),
-            "original_question": q  # Keep reference for updates
+            "id": q["id"]  # Stable hash ID for updates
         })
     
     # Store session
-    calibration_session["active"] = True
-    calibration_session["level"] = level
-    calibration_session["questions"] = prepared
-    calibration_session["current_index"] = 0
+    session = get_quiz_session()
+    with session.lock:
+        session.calibration = {
+            "active": True,
+            "level": level,
+            "questions": prepared,
+            "current_index": 0
+        }
     
     # Return questions for frontend
     client_questions = [
-        {"question": q["question"], "answers": q["answers"]}
+        {"id": q["id"], "question": q["question"], "answers": q["answers"]}
         for q in prepared
     ]
     
@@ -721,17 +1018,20 @@ def calibration_start():
 @app.route('/api/quiz/calibration/answer', methods=['POST'])
 def calibration_answer():
     """Process a calibration answer - only returns correctness, does NOT update file."""
-    if not calibration_session["active"]:
+    session = get_quiz_session()
+    with session.lock:
+        calibration = session.calibration
+    if not calibration["active"]:
         return jsonify({"success": False, "error": "No active calibration session"})
     
     data = request.get_json()
     question_index = data.get('question_index', 0)
     answer_index = data.get('answer_index', -1)
     
-    if question_index >= len(calibration_session["questions"]):
+    if question_index >= len(calibration["questions"]):
         return jsonify({"success": False, "error": "Invalid question index"})
     
-    question = calibration_session["questions"][question_index]
+    question = calibration["questions"][question_index]
     is_correct = answer_index == question["correct_index"]
     
     return jsonify({
@@ -744,23 +1044,23 @@ def calibration_answer():
 @app.route('/api/quiz/calibration/submit', methods=['POST'])
 def calibration_submit():
     """Submit calibration result - updates level and flags."""
-    if not calibration_session["active"]:
+    session = get_quiz_session()
+    with session.lock:
+        calibration = session.calibration
+    if not calibration["active"]:
         return jsonify({"success": False, "error": "No active calibration session"})
     
     data = request.get_json()
-    question_index = data.get('question_index', 0)
     flag_type = data.get('flag_type', None) # 'review' or None
     
-    # Validate question index
-    if question_index < 0 or question_index >= len(calibration_session["questions"]):
+    # Validate question
+    question_id = get_session_question_id(calibration["questions"], data)
+    if question_id is None:
         return jsonify({"success": False, "error": "Invalid question index"})
     
-    question = calibration_session["questions"][question_index]
-    
-    all_questions = load_all_questions()
-    source_question = get_question_by_text(all_questions, question["question"])
-    
-    if source_question:
+    level = calibration["level"]
+
+    def apply_calibration(source_question):
         # Migration: Ensure New Structure
         if "flags" not in source_question:
             source_question["flags"] = {
@@ -779,9 +1079,10 @@ def calibration_submit():
             source_question["flags"][flag_type] += 1
             
         # Update Level
-        source_question["calibration_level"] = calibration_session["level"]
-        
-        save_all_questions(all_questions)
+        source_question["calibration_level"] = level
+    
+    # Only this question's record is persisted
+    question_bank.update(question_id, apply_calibration)
     
     return jsonify({
         "success": True,
@@ -792,10 +1093,14 @@ def calibration_submit():
 @app.route('/api/quiz/calibration/end', methods=['POST'])
 def calibration_end():
     """End the calibration session."""
-    calibration_session["active"] = False
-    calibration_session["level"] = 0
-    calibration_session["questions"] = []
-    calibration_session["current_index"] = 0
+    session = get_quiz_session()
+    with session.lock:
+        session.calibration = {
+            "active": False,
+            "level": 0,
+            "questions": [],
+            "current_index": 0
+        }
     
     return jsonify({
         "success": True,
@@ -806,14 +1111,6 @@ def calibration_end():
 
 
 
-# Review Mode Session
-review_session = {
-    "active": False,
-    "questions": [],
-    "current_index": 0
-}
-
-
 # ===========================================
 # Review Mode API Endpoints
 # ===========================================
@@ -821,27 +1118,25 @@ review_session = {
 @app.route('/api/quiz/review/start', methods=['POST'])
 def review_start():
     """Start a review session with all flagged questions."""
-    global review_session
-    
-    all_questions = load_all_questions()
-    
-    # Filter questions where flags.review > 0
+    # Questions where flags.review > 0
     flagged = []
-    for q in all_questions:
-        if "flags" in q and q.get("flags", {}).get("review", 0) > 0:
-            flagged.append({
-                "question": q["question"],
-                "answers": q["answers"],
-                "correct": q["correct"],
-                "flags": q.get("flags", {}),
-                "level": q.get("level", 0)
-            })
+    for q in question_bank.flagged("review"):
+        flagged.append({
+            "id": q["id"],
+            "question": q["question"],
+            "answers": q["answers"],
+            "correct": q["correct"],
+            "flags": q.get("flags", {}),
+            "level": q.get("level", 0)
+        })
     
-    review_session = {
-        "active": True,
-        "questions": flagged,
-        "current_index": 0
-    }
+    session = get_quiz_session()
+    with session.lock:
+        session.review = {
+            "active": True,
+            "questions": flagged,
+            "current_index": 0
+        }
     
     return jsonify({
         "success": True,
@@ -853,26 +1148,23 @@ def review_start():
 @app.route('/api/quiz/review/remove_flag', methods=['POST'])
 def review_remove_flag():
     """Remove review flag from a question."""
-    global review_session
+    session = get_quiz_session()
+    with session.lock:
+        review = session.review
     
-    if not review_session["active"]:
+    if not review["active"]:
         return jsonify({"success": False, "error": "No active review session"})
     
     data = request.get_json()
-    question_index = data.get('question_index', 0)
+    question_id = get_session_question_id(review["questions"], data)
     
-    if question_index < 0 or question_index >= len(review_session["questions"]):
+    if question_id is None:
         return jsonify({"success": False, "error": "Invalid question index"})
     
-    question = review_session["questions"][question_index]
-    
-    # Find and update in main questions file
-    all_questions = load_all_questions()
-    source_question = get_question_by_text(all_questions, question["question"])
+    source_question = question_bank.get(question_id)
     
     if source_question and "flags" in source_question:
-        source_question["flags"]["review"] = 0
-        save_all_questions(all_questions)
+        question_bank.update(question_id, lambda q: q["flags"].update(review=0))
         
         return jsonify({"success": True, "message": "Review flag removed"})
     
@@ -882,24 +1174,20 @@ def review_remove_flag():
 @app.route('/api/quiz/review/delete', methods=['POST'])
 def review_delete():
     """Delete a question permanently."""
-    global review_session
+    session = get_quiz_session()
+    with session.lock:
+        review = session.review
     
-    if not review_session["active"]:
+    if not review["active"]:
         return jsonify({"success": False, "error": "No active review session"})
     
     data = request.get_json()
-    question_index = data.get('question_index', 0)
+    question_id = get_session_question_id(review["questions"], data)
     
-    if question_index < 0 or question_index >= len(review_session["questions"]):
+    if question_id is None:
         return jsonify({"success": False, "error": "Invalid question index"})
     
-    question = review_session["questions"][question_index]
-    
-    # Find and delete from main questions file
-    all_questions = load_all_questions()
-    all_questions = [q for q in all_questions if q["question"] != question["question"]]
-    
-    if save_all_questions(all_questions):
+    if question_bank.delete(question_id):
         return jsonify({"success": True, "message": "Question deleted"})
     
     return jsonify({"success": False, "error": "Failed to save"})
@@ -908,12 +1196,13 @@ def review_delete():
 @app.route('/api/quiz/review/end', methods=['POST'])
 def review_end():
     """End review session."""
-    global review_session
-    review_session = {
-        "active": False,
-        "questions": [],
-        "current_index": 0
-    }
+    session = get_quiz_session()
+    with session.lock:
+        session.review = {
+            "active": False,
+            "questions": [],
+            "current_index": 0
+        }
     return jsonify({"success": True})
 
 
@@ -945,39 +1234,259 @@ def system_update_and_reboot():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/system/latency', methods=['GET'])
+def system_latency():
+    """Rolling input-to-screen latency histograms (p50/p95/p99 per event and stage)."""
+    event = request.args.get('event')
+    return jsonify({
+        "since": latency_tracker.started,
+        "events": latency_tracker.summary(event)
+    })
+
+
+@app.route('/api/system/latency/reset', methods=['POST'])
+def system_latency_reset():
+    """Clear latency samples (e.g. before testing a new controller or Pi image)."""
+    latency_tracker.reset()
+    return jsonify({"success": True})
+
+
+@app.route('/api/system/ingest', methods=['GET'])
+def system_ingest():
+    """Progress of the background video remux/transcode queue."""
+    return jsonify(media_ingest.status())
+
+
+@app.route('/api/system/cache', methods=['GET'])
+def system_cache():
+    """Usage of the local content cache (enabled only for USB-backed content)."""
+    if content_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **content_cache.status()})
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request, Socket.IO and disk-I/O metrics in the Prometheus text format."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Opt-in profiling (SKILLPLAYER_PROFILING=1) - without it these routes don't exist
+if PROFILING_ENABLED:
+    sampling_profiler = SamplingProfiler()
+    request_profiler = RequestProfiler(app)
+
+    @app.route('/api/system/profile/sample', methods=['POST'])
+    def system_profile_sample():
+        """Sample every thread for ?seconds= and return collapsed stacks (flamegraph.pl / speedscope)."""
+        seconds = request.args.get('seconds', DEFAULT_SECONDS, type=float)
+        interval_ms = request.args.get('interval_ms', DEFAULT_INTERVAL * 1000, type=float)
+        print(f"[Profiler] Sampling all threads for {seconds:g}s")
+        result = sampling_profiler.run(seconds, interval_ms / 1000)
+        if result is None:
+            return jsonify({"success": False, "error": "A profile is already running"}), 409
+        text, samples = result
+        print(f"[Profiler] Done: {samples} samples")
+        response = Response(text, mimetype='text/plain')
+        filename = f"skillplayer-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['X-Profile-Samples'] = str(samples)
+        return response
+
+    @app.route('/api/system/profile/request', methods=['POST'])
+    def system_profile_request_arm():
+        """cProfile the next call(s) of a route: {"route": "api_skills" or "/api/skills/<category>", "calls": 1}."""
+        data = request.get_json(silent=True) or {}
+        endpoint = request_profiler.resolve(data.get('route', ''))
+        if endpoint is None or endpoint.startswith('system_profile'):
+            return jsonify({"success": False, "error": "Unknown route"}), 404
+        request_profiler.arm(endpoint, int(data.get('calls', 1)))
+        print(f"[Profiler] Profiling next call(s) of {endpoint}")
+        return jsonify({"success": True, "endpoint": endpoint, **request_profiler.status(endpoint)})
+
+    @app.route('/api/system/profile/request', methods=['GET'])
+    def system_profile_request_report():
+        """State of a route profile (?route=), with the cProfile report once the call has happened."""
+        endpoint = request_profiler.resolve(request.args.get('route', ''))
+        if endpoint is None:
+            return jsonify({"success": False, "error": "Unknown route"}), 404
+        return jsonify({"success": True, "endpoint": endpoint, **request_profiler.status(endpoint)})
+
+    @app.route('/api/system/profile/request', methods=['DELETE'])
+    def system_profile_request_cancel():
+        """Cancel a pending route profile."""
+        endpoint = request_profiler.resolve(request.args.get('route', ''))
+        if endpoint is None:
+            return jsonify({"success": False, "error": "Unknown route"}), 404
+        request_profiler.disarm(endpoint)
+        return jsonify({"success": True})
+
+
+@app.route('/api/system/ready', methods=['GET'])
+def system_ready():
+    """Readiness check: 200 once caches are warm and devices scanned, 503 before. Includes phase timings."""
+    status = startup.status()
+    return jsonify(status), (200 if status["ready"] else 503)
+
+
+def prepare():
+    """
+    Startup work that has to finish before the server binds: the state routes
+    read or write without waiting for it (see startup.py).
+    """
+    with startup.phase('asset manifest'):
+        asset_manifest.build()
+
+    if database is not None:
+        with startup.phase('database'):
+            import_on_first_start(database, BASE_DIR)
+    else:
+        with startup.phase('answer log migration'):
+            answer_log.migrate()
+
+
+def warm_up():
+    """
+    Background startup work, run while the server binds and starts accepting connections.
+    Only what the UI needs comes before mark_ready(); the rest runs after it.
+    """
+    global gamepad_handler
+
+    # Index the content folder once and keep it fresh via the watcher
+    with startup.phase('content index'):
+        content_catalog.start()
+
+    with startup.phase('questions'):
+        question_bank.all()
+
+    startup.mark_ready()
+
+    # Start gamepad handler on Linux if SocketIO is available
+    if platform.system() == 'Linux' and SOCKETIO_AVAILABLE:
+        with startup.phase('gamepads'):
+            try:
+                from gamepad_handler import start_gamepad_handler
+                gamepad_handler = start_gamepad_handler(socketio)
+                if gamepad_handler:
+                    print("[Gamepad] Handler started")
+            except Exception as e:
+                print(f"[Gamepad] Could not start handler: {e}")
+
+    # Copy the most-viewed files off the USB stick ahead of their next play
+    if content_cache is not None:
+        with startup.phase('content cache'):
+            content_cache.load()
+            content_cache.prefetch(
+                path for path in most_viewed_files() if media_ingest.optimized_path(path) is None
+            )
+
+    # Queue thumbnails of the UI images (content thumbnails are queued by the catalog)
+    for name in asset_manifest.hashes:
+        if name.lower().endswith(('.png', '.jpg', '.jpeg')):
+            derivative_store.schedule(Path(app.static_folder) / name)
+
+    # Every source is scheduled now: drop optimized copies and thumbnails of files
+    # replaced or removed while the server was off (not when the content folder is
+    # empty, e.g. the USB stick is unplugged)
+    if content_catalog.has_files():
+        media_ingest.sweep()
+        derivative_store.sweep()
+
+    # Refresh .gz/.br siblings of static text assets that changed since the last run
+    with startup.phase('compress assets'):
+        compress_static(BASE_DIR / "static")
+
+
+def self_test():
+    """
+    Request the UI the way a browser can before startup has finished: before
+    prepare() and before warm_up(), with UI thumbnails left on disk by an earlier
+    start. The requests run in a temporary copy of the app and its data files.
+    """
+    import shutil
+    import subprocess
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Path(tmp)
+        for source in BASE_DIR.glob('*.py'):
+            shutil.copy2(source, workspace)
+        for folder in ('static', 'templates'):
+            shutil.copytree(BASE_DIR / folder, workspace / folder)
+        (workspace / "content").mkdir()
+        result = subprocess.run(
+            [sys.executable, 'app.py', '--self-test-worker'], cwd=workspace,
+            env=dict(os.environ, SKILLPLAYER_CONTENT_PATH=str(workspace / "content"))
+        )
+    print(f"[Startup] Self-test {'passed' if result.returncode == 0 else 'FAILED'}")
+    return result.returncode == 0
+
+
+def _self_test_worker():
+    """The self-test requests (run inside the temporary copy)."""
+    import re
+
+    # What an earlier start left in the derivative cache
+    if derivative_store.can_make(Path(app.static_folder) / 'TDLogo.png'):
+        for image in Path(app.static_folder).glob('*.png'):
+            target = derivative_store._cache_path(image)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(image.read_bytes())
+
+    client = app.test_client()
+    checks = [('/ before prepare()', client.get('/').status_code == 200)]
+    prepare()
+    page = client.get('/')
+    checks.append(('/ before warm_up()', page.status_code == 200))
+    thumbnails = re.findall(r'/thumb/static/[^"]+', page.get_data(as_text=True))
+    checks.append(('thumbnail URLs', all(client.get(url).status_code == 200 for url in thumbnails)))
+    checks.append(('/api/categories', client.get('/api/categories').status_code == 200))
+    checks.append(('/api/system/ready (503)', client.get('/api/system/ready').status_code == 503))
+    warm_up()
+    checks.append(('/api/system/ready (200)', client.get('/api/system/ready').status_code == 200))
+
+    for name, passed in checks:
+        print(f"  {name:<28} {'PASS' if passed else 'FAIL'}")
+    return all(passed for _, passed in checks)
+
+
 def open_browser():
-    """Open the browser after a short delay."""
+    """Open the kiosk browser (called once the app reports ready)."""
     webbrowser.open('http://127.0.0.1:5000')
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-test':
+        sys.exit(0 if self_test() else 1)
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-test-worker':
+        sys.exit(0 if _self_test_worker() else 1)
+
+    startup.add_phase('imports', 0, startup.elapsed())
+
     # Create content directory if it doesn't exist
     CONTENT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Turn SIGTERM (systemd stop, shutdown) into a normal exit so buffered
+    # data such as view counts is flushed by the atexit handlers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     print(f"SkillPlayer starting...")
     print(f"Process ID: {os.getpid()}")
     print(f"Content folder: {CONTENT_DIR}")
     print(f"Add skill folders with videos to: {CONTENT_DIR}")
     print()
-    
-    # Start gamepad handler on Linux if SocketIO is available
-    if platform.system() == 'Linux' and SOCKETIO_AVAILABLE:
-        try:
-            from gamepad_handler import start_gamepad_handler
-            gamepad_handler = start_gamepad_handler(socketio)
-            if gamepad_handler:
-                print("[Gamepad] Handler started")
-        except Exception as e:
-            print(f"[Gamepad] Could not start handler: {e}")
-    
-    # Open browser after a short delay
-    threading.Timer(1.5, open_browser).start()
+
+    # Staged startup: bind the server right after prepare(), warm up in the
+    # background, and open the browser once /api/system/ready says so
+    prepare()
+    threading.Thread(target=warm_up, daemon=True).start()
+    open_browser_when_ready('http://127.0.0.1:5000/api/system/ready', open_browser)
     
     # Use SocketIO if available, otherwise fallback to waitress/Flask
     if SOCKETIO_AVAILABLE and socketio:
-        print("Starting server with SocketIO at http://127.0.0.1:5000")
+        print(f"Starting server with SocketIO ({SERVER_MODE} mode) at http://127.0.0.1:5000")
         print("Press Ctrl+C to stop")
-        socketio.run(app, host='127.0.0.1', port=5000, debug=False, allow_unsafe_werkzeug=True)
+        run_server(app, socketio, '127.0.0.1', 5000)
     else:
         # Use waitress for production-ready serving on Windows
         try:
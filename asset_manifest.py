@@ -0,0 +1,75 @@
+"""
+Asset manifest - content-hashed URLs for the files in static/.
+Built once at startup, before the server binds: every static file gets a
+short content hash, templates link to /static/<name>?v=<hash>, and requests
+carrying the current hash are served with a long-lived immutable
+Cache-Control header. Anything else under /static/ must be revalidated, so a
+redeploy (restart) is picked up at once.
+The build stamp shown in the UI comes from the same pass.
+"""
+
+import datetime
+import hashlib
+from pathlib import Path
+
+from compress_assets import COMPRESSED_SUFFIXES
+
+HASH_LENGTH = 12
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+class AssetManifest:
+    """
+    name -> content hash for every file in the static folder.
+    """
+
+    def __init__(self, static_dir, build_files=()):
+        self.static_dir = Path(static_dir)
+        self.build_files = [Path(f) for f in build_files]
+        self.hashes = {}          # Empty until build(): URLs are unversioned meanwhile
+        self.build_time = "Unknown"
+
+    def build(self):
+        """Hash every static file and compute the build stamp."""
+        hashes = {}
+        for path in sorted(self.static_dir.rglob('*')):
+            if not path.is_file() or path.suffix in COMPRESSED_SUFFIXES:
+                continue
+            try:
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            except OSError as e:
+                print(f"[Assets] Could not hash {path}: {e}")
+                continue
+            hashes[path.relative_to(self.static_dir).as_posix()] = digest[:HASH_LENGTH]
+        self.hashes = hashes
+        self.build_time = self._build_time()
+
+    def _build_time(self):
+        """Latest modification time of key files, as 'HH:MM DD/Mon'."""
+        max_timestamp = 0
+        for path in self.build_files:
+            try:
+                max_timestamp = max(max_timestamp, path.stat().st_mtime)
+            except OSError:
+                continue
+        if max_timestamp > 0:
+            return datetime.datetime.fromtimestamp(max_timestamp).strftime("%H:%M %d/%b")
+        return "Unknown"
+
+    def url(self, name):
+        """Versioned URL for a static file (plain URL if it isn't in the manifest)."""
+        digest = self.hashes.get(name)
+        if digest is None:
+            return f'/static/{name}'
+        return f'/static/{name}?v={digest}'
+
+    def urls(self):
+        """All versioned URLs by name (handed to the frontend JS)."""
+        return {name: self.url(name) for name in self.hashes}
+
+    def cache_control(self, name, version):
+        """Cache-Control for a static request: immutable only if the version matches the content."""
+        if version and self.hashes.get(name) == version:
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
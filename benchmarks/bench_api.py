@@ -0,0 +1,374 @@
+"""
+API benchmark - throughput and latency percentiles for the SkillPlayer hot paths.
+Each size profile runs in a fresh temporary workspace: a copy of the current
+source plus a synthetic content tree (categories x skills x files), question
+bank, answer history and view counts. The app is driven in-process with the
+Flask test client (optionally from several threads), so runs are reproducible
+and never touch real content or data files.
+
+Usage:
+    python benchmarks/bench_api.py                        # 'medium' profile
+    python benchmarks/bench_api.py --profile small large  # several sizes, to see scaling
+    python benchmarks/bench_api.py --skills 200 --answers 500000
+    python benchmarks/bench_api.py --save-baseline        # store results as the baseline
+    python benchmarks/bench_api.py --compare              # compare against the baseline
+
+--compare exits with status 1 if any endpoint regressed by more than --threshold.
+
+benchmarks/baseline.json holds the small and medium profiles of the tree before
+the performance work (commit 36eabec). To record it again, e.g. on other hardware:
+    git worktree add /tmp/skillplayer-base 36eabec
+    python benchmarks/bench_api.py --source /tmp/skillplayer-base --profile small medium --save-baseline
+    git worktree remove /tmp/skillplayer-base
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# name: (categories, skills per category, files per skill, questions, answers, views)
+PROFILES = {
+    'small': (1, 10, 3, 100, 1000, 20),
+    'medium': (3, 50, 5, 1000, 50000, 200),
+    'large': (3, 250, 10, 5000, 500000, 2000),
+}
+
+ENDPOINTS = ['categories', 'skills', 'views_increment', 'quiz_start', 'quiz_answer', 'quiz_score']
+FILE_EXTENSIONS = ['.mp4', '.mp4', '.webm', '.pdf']
+
+
+# ----------------------------------------
+# Synthetic data
+# ----------------------------------------
+
+def skill_name(index):
+    return f"Skill {index:04d}"
+
+
+def file_name(index, ext):
+    return f"clip_{index:03d}{ext}"
+
+
+def build_content(content_dir, categories, skills, files):
+    """Empty content files (the catalog only lists and stats them) plus a logo per skill."""
+    for category in categories:
+        for s in range(skills):
+            skill_dir = content_dir / category / skill_name(s)
+            skill_dir.mkdir(parents=True, exist_ok=True)
+            (skill_dir / f"{skill_name(s)}.png").touch()
+            for f in range(files):
+                (skill_dir / file_name(f, FILE_EXTENSIONS[f % len(FILE_EXTENSIONS)])).touch()
+
+
+def build_data(workspace, config, rng):
+    """questions.json, the legacy quiz_answers.json history and views.json."""
+    questions = []
+    for i in range(config['questions']):
+        answers = [f"Answer {i}-{a}" for a in range(4)]
+        questions.append({
+            "question": f"Synthetic question {i}?",
+            "answers": answers,
+            "correct": answers[0],
+            "tags": [f"tag{i % 7}"]
+        })
+    (workspace / "questions.json").write_text(json.dumps(questions), encoding='utf-8')
+
+    start = datetime(2026, 1, 1)
+    answers = [
+        {
+            "question_id": f"{rng.randrange(config['questions']):08x}",
+            "answer_selected": rng.randrange(4),
+            "correct": rng.random() < 0.7,
+            "time_to_answer_ms": rng.randrange(500, 8000),
+            "skipped": False,
+            "timestamp": (start + timedelta(seconds=i * 30)).isoformat(),
+            "streak_count": rng.randrange(10)
+        }
+        for i in range(config['answers'])
+    ]
+    (workspace / "quiz_answers.json").write_text(json.dumps(answers), encoding='utf-8')
+
+    views = {
+        f"{skill_name(rng.randrange(config['skills']))}/{file_name(f, FILE_EXTENSIONS[f % len(FILE_EXTENSIONS)])}":
+            rng.randrange(1, 500)
+        for f in [rng.randrange(config['files']) for _ in range(config['views'])]
+    }
+    (workspace / "views.json").write_text(json.dumps(views), encoding='utf-8')
+
+
+def make_workspace(config, source_dir=REPO_DIR):
+    """Temporary copy of the app with synthetic data next to it."""
+    workspace = Path(tempfile.mkdtemp(prefix='skillplayer-bench-'))
+    for source in source_dir.glob('*.py'):
+        shutil.copy2(source, workspace)
+    for folder in ('static', 'templates'):
+        shutil.copytree(source_dir / folder, workspace / folder)
+    (workspace / "content").mkdir()
+    build_data(workspace, config, random.Random(config['seed']))
+    return workspace
+
+
+# ----------------------------------------
+# Measurement (runs inside the workspace)
+# ----------------------------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(durations, wall_seconds):
+    ordered = sorted(durations)
+    return {
+        "requests": len(ordered),
+        "throughput_rps": round(len(ordered) / wall_seconds, 1) if wall_seconds else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def run_worker(config):
+    """Import the app from the current directory and benchmark each endpoint."""
+    workspace = Path.cwd()
+    sys.path.insert(0, str(workspace))
+    os.environ.setdefault('SKILLPLAYER_SERVER_MODE', 'threading')
+
+    import app as skillplayer
+    if Path(skillplayer.CONTENT_DIR).resolve() != (workspace / "content").resolve():
+        raise SystemExit(f"Refusing to write synthetic content to {skillplayer.CONTENT_DIR}")
+    categories = skillplayer.CATEGORIES[:config['categories']]
+    build_content(skillplayer.CONTENT_DIR, categories, config['skills'], config['files'])
+
+    # The startup work the app does before it reports ready, without the ffmpeg/thumbnail
+    # jobs (older trees from --source have no catalog and load the rest at import)
+    if hasattr(skillplayer, 'prepare'):
+        skillplayer.prepare()
+    catalog = getattr(skillplayer, 'content_catalog', None)
+    if catalog is not None:
+        catalog.derivatives = None
+        catalog.ingest = None
+        catalog.start()
+    if hasattr(skillplayer, 'question_bank'):
+        skillplayer.question_bank.all()
+
+    flask_app = skillplayer.app
+    rng_lock = threading.Lock()
+    rng = random.Random(config['seed'])
+    all_files = [
+        (skill_name(s), file_name(f, FILE_EXTENSIONS[f % len(FILE_EXTENSIONS)]))
+        for s in range(config['skills']) for f in range(config['files'])
+    ]
+
+    def random_file():
+        with rng_lock:
+            return rng.choice(all_files)
+
+    def new_client():
+        client = flask_app.test_client()
+        client.get('/api/quiz/start')  # Session cookie and a dealt game for quiz_answer
+        return client
+
+    requests_by_endpoint = {
+        'categories': lambda c, i: c.get('/api/categories'),
+        'skills': lambda c, i: c.get(f'/api/skills/{categories[i % len(categories)]}'),
+        'views_increment': lambda c, i: c.post('/api/views/increment', json=dict(
+            zip(('skill', 'filename'), random_file()))),
+        'quiz_start': lambda c, i: c.get('/api/quiz/start'),
+        'quiz_answer': lambda c, i: c.post('/api/quiz/answer', json={
+            'question_index': i % skillplayer.DEAL_SIZE, 'answer_index': i % 4,
+            'time_to_answer_ms': 1500, 'streak_count': 0, 'timestamp': datetime.now().isoformat()}),
+        'quiz_score': lambda c, i: c.post('/api/quiz/score', json={
+            'score': i % 40, 'name': f'B{i % 1000}', 'stats': {}}),
+    }
+
+    results = {}
+    for endpoint in config['endpoints']:
+        send = requests_by_endpoint[endpoint]
+        clients = [new_client() for _ in range(config['threads'])]
+        for i in range(config['warmup']):
+            send(clients[0], i)
+
+        per_thread = max(1, config['requests'] // config['threads'])
+        durations = [[] for _ in clients]
+        errors = []
+
+        def drive(index):
+            client = clients[index]
+            for i in range(per_thread):
+                start = time.perf_counter()
+                response = send(client, i)
+                durations[index].append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        threads = [threading.Thread(target=drive, args=(t,)) for t in range(len(clients))]
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_start
+
+        results[endpoint] = summarize([d for thread_durations in durations for d in thread_durations], wall)
+        results[endpoint]["errors"] = len(errors)
+
+    print(json.dumps(results))
+
+
+# ----------------------------------------
+# Driver
+# ----------------------------------------
+
+def run_profile(name, config, source_dir=REPO_DIR):
+    """Benchmark one profile in its own workspace and process. Returns per-endpoint results."""
+    workspace = make_workspace(config, source_dir)
+    try:
+        result = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--worker', json.dumps(config)],
+            cwd=workspace, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            env=dict(os.environ, SKILLPLAYER_CONTENT_PATH=str(workspace / "content"))
+        )
+        if result.returncode != 0:
+            sys.stderr.write(result.stderr)
+            raise SystemExit(f"Benchmark worker for '{name}' failed (exit {result.returncode})")
+        # App startup logging goes to stdout too - the results are the last line
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def print_results(name, config, results):
+    print(f"\n== {name}: {config['categories']} categories x {config['skills']} skills x "
+          f"{config['files']} files, {config['questions']} questions, {config['answers']} answers, "
+          f"{config['threads']} thread(s) ==")
+    print(f"  {'endpoint':<16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  errors")
+    for endpoint, r in results.items():
+        print(f"  {endpoint:<16} {r['throughput_rps']:>9.1f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+              f"{r['p99_ms']:>9.3f} {r['max_ms']:>9.3f}  {r['errors']}")
+
+
+def compare(results, baseline, threshold):
+    """Print changes against the baseline. Returns the list of regressions."""
+    regressions = []
+    print(f"\n== Compared with baseline ({baseline.get('created', 'unknown date')}) ==")
+    print(f"  {'profile/endpoint':<28} {'req/s':>9} {'p50':>9} {'p95':>9}")
+    for profile, endpoints in results.items():
+        base_profile = baseline.get('profiles', {}).get(profile)
+        if base_profile is None:
+            print(f"  {profile}: not in baseline")
+            continue
+        for endpoint, r in endpoints.items():
+            base = base_profile.get(endpoint)
+            if base is None:
+                continue
+            changes = {}
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms'):
+                changes[key] = (r[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+            # Lower throughput or higher latency is worse
+            worst = max(-changes['throughput_rps'], changes['p50_ms'], changes['p95_ms'])
+            flag = '  REGRESSION' if worst > threshold else ''
+            if flag:
+                regressions.append(f"{profile}/{endpoint}")
+            print(f"  {profile + '/' + endpoint:<28} {changes['throughput_rps']:>+8.1f}% "
+                  f"{changes['p50_ms']:>+8.1f}% {changes['p95_ms']:>+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SkillPlayer API hot paths.")
+    parser.add_argument('--profile', nargs='+', choices=sorted(PROFILES), default=['medium'])
+    parser.add_argument('--categories', type=int, help="Override: categories to fill (max 3)")
+    parser.add_argument('--skills', type=int, help="Override: skills per category")
+    parser.add_argument('--files', type=int, help="Override: files per skill")
+    parser.add_argument('--questions', type=int, help="Override: questions in the bank")
+    parser.add_argument('--answers', type=int, help="Override: records in the answer history")
+    parser.add_argument('--requests', type=int, default=500, help="Timed requests per endpoint")
+    parser.add_argument('--warmup', type=int, default=50, help="Untimed requests per endpoint")
+    parser.add_argument('--threads', type=int, default=1, help="Concurrent client threads")
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--source', type=Path, default=REPO_DIR,
+                        help="App source to benchmark (default: this checkout), e.g. a git worktree")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="Compare with the stored baseline")
+    parser.add_argument('--threshold', type=float, default=20.0, help="Regression threshold in percent")
+    parser.add_argument('--output', type=Path, help="Also write the results as JSON")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return 0
+
+    all_results = {}
+    for name in args.profile:
+        categories, skills, files, questions, answers, views = PROFILES[name]
+        config = {
+            'categories': args.categories or categories,
+            'skills': args.skills or skills,
+            'files': args.files or files,
+            'questions': args.questions or questions,
+            'answers': args.answers if args.answers is not None else answers,
+            'views': views,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'threads': max(1, args.threads),
+            'endpoints': args.endpoints,
+            'seed': args.seed,
+        }
+        results = run_profile(name, config, args.source.resolve())
+        print_results(name, config, results)
+        all_results[name] = results
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'requests': args.requests,
+        'threads': args.threads,
+        'profiles': all_results
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    status = 0
+    if args.compare:
+        if not args.baseline.exists():
+            print(f"\nNo baseline at {args.baseline} - run with --save-baseline first")
+        else:
+            baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+            regressions = compare(all_results, baseline, args.threshold)
+            if regressions:
+                print(f"\n{len(regressions)} regression(s) over {args.threshold:.0f}%: {', '.join(regressions)}")
+                status = 1
+
+    if args.save_baseline:
+        if args.baseline.exists():
+            # Keep profiles that weren't part of this run
+            previous = json.loads(args.baseline.read_text(encoding='utf-8')).get('profiles', {})
+            report['profiles'] = {**previous, **all_results}
+        args.baseline.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\nBaseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
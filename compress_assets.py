@@ -0,0 +1,98 @@
+"""
+Precompressed static assets - .gz / .br siblings for text files in static/.
+Compression happens once (at startup, or by running this file as a build step),
+never per request: app.py serves the sibling that matches the client's
+Accept-Encoding. A sibling is regenerated whenever it is older than its source.
+
+Usage: python compress_assets.py [static_dir]
+"""
+
+import gzip
+import os
+import sys
+from pathlib import Path
+
+# Optional: brotli compresses JS/CSS ~15-20% smaller than gzip
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.json', '.svg', '.html', '.txt', '.map'}
+MIN_SIZE = 1024  # Smaller files aren't worth the extra round of negotiation
+
+# Content-Encoding token -> sibling suffix, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+COMPRESSED_SUFFIXES = set(ENCODINGS.values())
+
+
+def is_compressible(path):
+    """Whether a static file gets precompressed siblings."""
+    return Path(path).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def _compress(data, encoding):
+    if encoding == 'gzip':
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def _write_atomic(path, data, mtime_ns):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    # Match the source mtime so freshness checks are a simple comparison
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, path)
+
+
+def compress_static(static_dir):
+    """
+    Create or refresh .gz/.br siblings for every compressible file.
+    Returns the number of files (re)written.
+    """
+    static_dir = Path(static_dir)
+    encodings = [e for e in ENCODINGS if e != 'br' or BROTLI_AVAILABLE]
+    written = 0
+
+    for source in sorted(static_dir.rglob('*')):
+        if not source.is_file() or not is_compressible(source):
+            continue
+        try:
+            st = source.stat()
+            if st.st_size < MIN_SIZE:
+                continue
+            data = None
+            for encoding in encodings:
+                sibling = source.with_name(source.name + ENCODINGS[encoding])
+                if is_fresh(source, sibling, st):
+                    continue
+                if data is None:
+                    data = source.read_bytes()
+                compressed = _compress(data, encoding)
+                if len(compressed) >= len(data):
+                    continue
+                _write_atomic(sibling, compressed, st.st_mtime_ns)
+                written += 1
+        except OSError as e:
+            print(f"[Assets] Could not compress {source}: {e}")
+
+    return written
+
+
+def is_fresh(source, sibling, source_stat=None):
+    """True if sibling exists and was generated from the current source."""
+    try:
+        source_stat = source_stat or os.stat(source)
+        return os.stat(sibling).st_mtime_ns == source_stat.st_mtime_ns
+    except OSError:
+        return False
+
+
+if __name__ == '__main__':
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "static"
+    count = compress_static(target)
+    print(f"[Assets] Wrote {count} compressed file(s) in {target}"
+          + ("" if BROTLI_AVAILABLE else " (gzip only - install 'brotli' for .br)"))
@@ -0,0 +1,223 @@
+"""
+Content cache - local read-through copy of a USB-backed content folder.
+Reading a clip from a USB stick for the first time can stutter, so files that
+are played (and the most-viewed files, prefetched at startup) are copied in the
+background to a cache directory on the SD card/SSD. serve_file() streams the
+cached copy whenever it still matches the source's mtime and size.
+
+The cache is capped at a total size; least recently used files are evicted
+first. Copies keep the source's mtime, so freshness needs no separate index
+and the ETag served to the browser is the same for the copy and the original.
+"""
+
+import itertools
+import os
+import queue
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_MB = int(os.environ.get('SKILLPLAYER_CONTENT_CACHE_MB', 2048))   # 0 disables the cache
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Copy priorities: files just played go ahead of startup prefetching
+PRIORITY_PLAYED = 0
+PRIORITY_PREFETCH = 1
+
+
+class ContentCache:
+    """
+    Size-capped LRU cache of content files mirrored under cache_dir.
+    """
+
+    def __init__(self, content_dir, cache_dir, max_bytes=CACHE_MB * 1024 * 1024):
+        # Resolved, so containment checks are not fooled by '..' or symlinks
+        self.content_dir = Path(content_dir).resolve()
+        self.cache_dir = Path(cache_dir).resolve()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # relative path -> cached size, least recently used first
+        self.total_bytes = 0
+        self.queued = set()            # Relative paths waiting to be copied
+        self.jobs = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self.thread = None
+
+    def load(self):
+        """Index the files already in the cache, oldest access first (startup warm-up)."""
+        if not self.cache_dir.is_dir():
+            return
+        found = []
+        for path in self.cache_dir.rglob('*'):
+            if not path.is_file():
+                continue
+            rel = path.relative_to(self.cache_dir).as_posix()
+            if path.name.endswith('.tmp'):
+                with self.lock:
+                    copying = rel[:-len('.tmp')] in self.queued
+                if not copying:
+                    path.unlink(missing_ok=True)  # Left over from an interrupted copy
+                continue
+            st = path.stat()
+            found.append((st.st_atime, rel, st.st_size))
+        with self.lock:
+            # Older than anything copied since startup: insert at the LRU end, newest first
+            for _, rel, size in sorted(found, reverse=True):
+                if rel in self.entries:
+                    continue  # Already recopied since startup
+                self.entries[rel] = size
+                self.entries.move_to_end(rel, last=False)
+                self.total_bytes += size
+        if found:
+            print(f"[Cache] {len(found)} cached file(s), {self.total_bytes / 1e6:.0f} MB")
+        self._evict()
+
+    def _relative(self, source):
+        """Path of source relative to the content folder, or None if it lies outside it."""
+        try:
+            return Path(source).resolve().relative_to(self.content_dir).as_posix()
+        except (ValueError, OSError):
+            return None
+
+    def _cached_path(self, rel):
+        """Cache file for a relative path; refuses anything that would land outside cache_dir."""
+        target = (self.cache_dir / rel).resolve()
+        if not target.is_relative_to(self.cache_dir) or target == self.cache_dir:
+            raise ValueError(f"outside the cache: {rel}")
+        return target
+
+    def lookup(self, source):
+        """
+        Path of a valid cached copy of source, or None to read the original.
+        A miss queues the file for copying.
+        """
+        rel = self._relative(source)
+        if rel is None:
+            return None
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+
+        try:
+            cached = self._cached_path(rel)
+        except ValueError:
+            return None
+        with self.lock:
+            known = rel in self.entries
+        if known:
+            try:
+                cst = os.stat(cached)
+                if cst.st_size == st.st_size and cst.st_mtime_ns == st.st_mtime_ns:
+                    with self.lock:
+                        if rel in self.entries:
+                            self.entries.move_to_end(rel)
+                        self.hits += 1
+                    return cached
+            except OSError:
+                pass
+            self._remove(rel)  # Source changed (or copy vanished) - recopy below
+
+        with self.lock:
+            self.misses += 1
+        self._enqueue(rel, PRIORITY_PLAYED)
+        return None
+
+    def prefetch(self, sources):
+        """Queue files for copying (most important first) until the cache would be full."""
+        budget = self.max_bytes
+        for source in sources:
+            rel = self._relative(source)
+            if rel is None:
+                continue
+            try:
+                size = os.stat(source).st_size
+            except OSError:
+                continue
+            if size > budget:
+                break
+            budget -= size
+            self._enqueue(rel, PRIORITY_PREFETCH)
+
+    def _enqueue(self, rel, priority):
+        with self.lock:
+            if rel in self.queued or rel in self.entries:
+                return
+            self.queued.add(rel)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._copy_loop, daemon=True)
+                self.thread.start()
+        self.jobs.put((priority, next(self.sequence), rel))
+
+    def _copy_loop(self):
+        while True:
+            _, _, rel = self.jobs.get()
+            try:
+                self._copy(rel)
+            except (OSError, ValueError) as e:
+                print(f"[Cache] Could not cache {rel}: {e}")
+            finally:
+                with self.lock:
+                    self.queued.discard(rel)
+
+    def _copy(self, rel):
+        """Copy one file into the cache (temp file, then rename) and evict to stay under the cap."""
+        source = (self.content_dir / rel).resolve()
+        if not source.is_relative_to(self.content_dir):
+            raise ValueError(f"outside the content folder: {rel}")
+        st = os.stat(source)
+        if st.st_size > self.max_bytes:
+            return
+
+        target = self._cached_path(rel)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(target.name + '.tmp')
+        try:
+            with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            # Keep the source mtime: it is both the freshness check and the ETag
+            os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            if os.stat(source).st_mtime_ns != st.st_mtime_ns:
+                return  # Source changed while copying
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self.lock:
+            self.total_bytes -= self.entries.pop(rel, 0)
+            self.entries[rel] = st.st_size
+            self.total_bytes += st.st_size
+        self._evict()
+
+    def _remove(self, rel):
+        with self.lock:
+            self.total_bytes -= self.entries.pop(rel, 0)
+        try:
+            os.remove(self._cached_path(rel))
+        except (OSError, ValueError):
+            pass
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits its cap."""
+        while True:
+            with self.lock:
+                if self.total_bytes <= self.max_bytes or not self.entries:
+                    return
+                rel = next(iter(self.entries))
+            self._remove(rel)
+
+    def status(self):
+        """Cache usage for the admin API."""
+        with self.lock:
+            return {
+                "files": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "queued": len(self.queued),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,246 @@
+"""
+Content Watcher for SkillPlayer
+Notifies the app when folders inside the content directory change.
+Uses inotify on Linux (via libc, no extra packages) and falls back to
+cheap directory-mtime polling everywhere else (Windows, or if inotify fails).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import platform
+import selectors
+import struct
+import threading
+import time
+
+# Try to load inotify from libc - only available on Linux
+INOTIFY_AVAILABLE = False
+if platform.system() == 'Linux':
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        INOTIFY_AVAILABLE = True
+    except (OSError, AttributeError):
+        INOTIFY_AVAILABLE = False
+
+# inotify event masks (see <sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# Content layout is content/<Category>/<Skill>/<file>, so we only care
+# about the root, the category folders and the skill folders.
+WATCH_DEPTH = 2
+
+# Seconds between polls when inotify is not available
+POLL_INTERVAL = 10
+
+# Collect bursts of events (e.g. copying a folder from USB) into one refresh
+DEBOUNCE_SECONDS = 0.5
+
+
+def _walk_dirs(root, depth=WATCH_DEPTH):
+    """Yield root and every visible sub-folder down to the given depth."""
+    yield root
+    if depth <= 0:
+        return
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                    yield from _walk_dirs(entry.path, depth - 1)
+    except OSError:
+        return
+
+
+class InotifyWatcher:
+    """
+    Watches the content tree with inotify.
+    Calls callback(folder_path) once per changed folder after a short debounce.
+    """
+
+    def __init__(self, root, callback):
+        self.root = os.path.abspath(str(root))
+        self.callback = callback
+        self.running = True
+        self.watches = {}  # wd -> folder path
+
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        for path in _walk_dirs(self.root):
+            self._add_watch(path)
+
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self.thread.start()
+
+    def _add_watch(self, path):
+        """Add a watch for a folder (ignored if it is deeper than WATCH_DEPTH)."""
+        rel = os.path.relpath(path, self.root)
+        depth = 0 if rel == '.' else rel.count(os.sep) + 1
+        if depth > WATCH_DEPTH:
+            return
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            print(f"[Catalog] Could not watch {path} (errno {ctypes.get_errno()})")
+            return
+        self.watches[wd] = path
+
+    def _read_events(self):
+        """Read all pending events and return the set of folders that changed."""
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                # Kernel dropped events - treat as "everything changed"
+                changed.add(self.root)
+                continue
+
+            folder = self.watches.get(wd)
+            if folder is None:
+                continue
+
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add(os.path.dirname(folder))
+                continue
+
+            changed.add(folder)
+
+            # New folders need their own watches (and their sub-folders)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and name:
+                new_dir = os.path.join(folder, os.fsdecode(name))
+                for path in _walk_dirs(new_dir, WATCH_DEPTH):
+                    self._add_watch(path)
+        return changed
+
+    def _watch_loop(self):
+        """Wait for events, debounce them and hand changed folders to the callback."""
+        # selectors (rather than select.poll) also works when gevent/eventlet patch the stdlib
+        selector = selectors.DefaultSelector()
+        selector.register(self.fd, selectors.EVENT_READ)
+
+        while self.running:
+            if not selector.select(1.0):
+                continue
+
+            changed = self._read_events()
+            # Keep collecting until the burst settles
+            while selector.select(DEBOUNCE_SECONDS):
+                changed |= self._read_events()
+
+            for folder in _parents_first(changed):
+                try:
+                    self.callback(folder)
+                except Exception as e:
+                    print(f"[Catalog] Error refreshing {folder}: {e}")
+
+        selector.close()
+        os.close(self.fd)
+
+    def stop(self):
+        """Stop watching."""
+        self.running = False
+
+
+class PollingWatcher:
+    """
+    Fallback watcher: stats the root, category and skill folders every
+    POLL_INTERVAL seconds and reports the ones whose mtime changed.
+    Adding/removing/renaming files always updates the parent folder's mtime.
+    """
+
+    def __init__(self, root, callback, interval=POLL_INTERVAL):
+        self.root = os.path.abspath(str(root))
+        self.callback = callback
+        self.interval = interval
+        self.running = True
+        self.mtimes = self._snapshot()
+
+        self.thread = threading.Thread(target=self._poll_loop, daemon=True)
+        self.thread.start()
+
+    def _snapshot(self):
+        """Map each watched folder to its current mtime."""
+        mtimes = {}
+        for path in _walk_dirs(self.root):
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _poll_loop(self):
+        while self.running:
+            time.sleep(self.interval)
+            current = self._snapshot()
+
+            changed = set()
+            for path, mtime in current.items():
+                if self.mtimes.get(path) != mtime:
+                    changed.add(path)
+            for path in self.mtimes.keys() - current.keys():
+                changed.add(os.path.dirname(path))
+            self.mtimes = current
+
+            for folder in _parents_first(changed):
+                try:
+                    self.callback(folder)
+                except Exception as e:
+                    print(f"[Catalog] Error refreshing {folder}: {e}")
+
+    def stop(self):
+        """Stop polling."""
+        self.running = False
+
+
+def _parents_first(folders):
+    """Order changed folders so a category is refreshed before its skills."""
+    return sorted(folders, key=len)
+
+
+def start_content_watcher(root, callback):
+    """Factory function: inotify watcher on Linux, polling watcher otherwise."""
+    if INOTIFY_AVAILABLE:
+        try:
+            watcher = InotifyWatcher(root, callback)
+            print(f"[Catalog] Watching {root} with inotify")
+            return watcher
+        except OSError as e:
+            print(f"[Catalog] inotify unavailable ({e}), falling back to polling")
+
+    watcher = PollingWatcher(root, callback)
+    print(f"[Catalog] Polling {root} for changes every {POLL_INTERVAL}s")
+    return watcher
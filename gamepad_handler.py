@@ -2,11 +2,17 @@
 Gamepad Handler for SkillPlayer Quiz
 Handles USB gamepad input using evdev (Linux only).
 Supports multi-gamepad detection with session binding - first button press binds that controller.
+All controllers are served by one selector-based reactor thread.
 """
 
+import os
+import selectors
 import threading
 import time
 
+from latency_tracker import latency_tracker, capture_time
+from log_pipeline import get_log_pipeline
+
 # Try to import evdev - only available on Linux
 try:
     import evdev
@@ -16,6 +22,17 @@ except ImportError:
     EVDEV_AVAILABLE = False
     print("[Gamepad] evdev not available (Windows). Gamepad support disabled.")
 
+# Optional: udev hotplug notifications (falls back to watching /dev/input)
+try:
+    import pyudev
+    PYUDEV_AVAILABLE = True
+except ImportError:
+    PYUDEV_AVAILABLE = False
+
+INPUT_DIR = '/dev/input'
+HOTPLUG_POLL_SECONDS = 2.0  # Selector timeout; also how often /dev/input is checked without pyudev
+RESCAN_DELAY = 0.2          # Seconds udev gets to set permissions on a new node before the rescan
+
 # Button code mapping (User: X=288, B=290, A=291, Y=289)
 # Primary (USB Gamepad)
 X_BTN = 288  # Trigger/Left
@@ -81,10 +98,15 @@ def find_all_gamepad_devices():
 class GamepadHandler:
     """
     Handles USB gamepad input for 1 or 2 players.
+    A single reactor thread multiplexes every gamepad with a selector (epoll on
+    Linux) instead of running one blocking read_loop() thread per device.
+    New controllers are picked up from udev hotplug events (pyudev) or, without
+    pyudev, by rescanning only when /dev/input itself changes.
     """
     
     def __init__(self, socketio):
         self.socketio = socketio
+        self.logger = get_log_pipeline(socketio)
         self.running = True
         
         # Session binding state
@@ -94,22 +116,32 @@ class GamepadHandler:
         self.session_active = False
         self.multimode = False # True if looking for 2 players
         
-        # Track active device paths to avoid duplicate listeners
+        # Open devices by path (also used to avoid duplicate registrations)
         self.active_listeners = set()
+        self.devices = {}
         self.lock = threading.Lock()
+
+        # Monotonic capture time of the event being handled (reactor thread only)
+        self.event_capture = None
         
+        self.selector = selectors.DefaultSelector()
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, ('wake', None))
+
+        self.udev_monitor = self._start_udev_monitor()
+        self.input_dir_mtime = None
+        self.rescan_at = None        # Monotonic time of a scheduled rescan (reactor thread only)
+
         # Start initial device scan
-        self._scan_and_start_listeners()
+        self._scan_devices()
         
-        # Periodic rescan for new devices
-        self.rescan_thread = threading.Thread(target=self._rescan_loop, daemon=True)
-        self.rescan_thread.start()
+        self.reactor_thread = threading.Thread(target=self._reactor_loop, daemon=True)
+        self.reactor_thread.start()
     
-    def log(self, message):
-        """Log message to console and emit to frontend admin terminal."""
-        print(message, flush=True)
-        # Emit to all connected clients
-        self.socketio.emit('server_log', {'message': message, 'timestamp': time.strftime('%H:%M:%S')})
+    def log(self, message, category='gamepad'):
+        """Log message to console and the frontend admin terminal (queued, rate limited per category)."""
+        self.logger.log(message, category)
     
     def start_binding_mode(self, player_target='P1', multi=False):
         """Enter binding mode for a specific player target."""
@@ -124,87 +156,186 @@ class GamepadHandler:
             
     def end_session(self):
         """End the current session and reset binding."""
-        print("[Gamepad] Session ended")
+        print(f"[Gamepad] Session ended (input latency: {self.latency_stats()})")
         self.binding_mode = False
         self.players = {1: None, 2: None}
         self.session_active = False
+
+    def _start_udev_monitor(self):
+        """Subscribe to udev input hotplug events if pyudev is installed."""
+        if not PYUDEV_AVAILABLE:
+            print("[Gamepad] pyudev not installed - watching /dev/input for hotplug instead")
+            return None
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            monitor.filter_by(subsystem='input')
+            monitor.start()
+            self.selector.register(monitor.fileno(), selectors.EVENT_READ, ('udev', None))
+            return monitor
+        except Exception as e:
+            print(f"[Gamepad] Could not start udev monitor ({e}) - watching /dev/input instead")
+            return None
     
-    def _scan_and_start_listeners(self):
-        """Scan for devices and start listeners for new ones."""
+    def _scan_devices(self):
+        """Scan for devices and register new ones with the reactor."""
         found_paths = find_all_gamepad_devices()
         
         with self.lock:
             for path in found_paths:
                 if path not in self.active_listeners:
-                    self.log(f"[Gamepad] New device found at {path}, starting listener...")
-                    self.active_listeners.add(path)
-                    thread = threading.Thread(
-                        target=self._device_listener, 
-                        args=(path,), 
-                        daemon=True
-                    )
-                    thread.start()
-    
-    def _rescan_loop(self):
-        """Periodically rescan for new gamepad devices."""
-        while self.running:
-            time.sleep(5)
-            self._scan_and_start_listeners()
-    
-    def _device_listener(self, device_path):
-        """Monitor a single gamepad device."""
-        print(f"[Gamepad] Listener thread started for {device_path}")
-        
+                    self.log(f"[Gamepad] New device found at {path}, registering...")
+                    self._open_device(path)
+
+    def _open_device(self, device_path):
+        """Open a device and add it to the selector."""
         try:
             device = evdev.InputDevice(device_path)
-            self.log(f"[Gamepad] Connected: {device.name} at {device_path}")
-            
-            # Read events
-            for event in device.read_loop():
-                if not self.running:
-                    break
-                
-                # Log EV_KEY for debugging
-                if event.type == ecodes.EV_KEY:
-                    # Verbose logging (optional, maybe too noisy for admin console, but standard print ok)
-                    # Use standard print for raw spam, log() for key events
-                    print(f"[Gamepad] Raw: {event.code}, Val: {event.value}", flush=True)
-
-                # Handle button events (press=1, release=0, hold=2)
-                if event.type == ecodes.EV_KEY:
-                    if event.value in [0, 1]: # Ignore hold (2) auto-repeat events for now
-                        self._handle_button_event(device_path, event.code, event.value)
-                
-                # Handle D-pad (hat) events for left/right navigation
-                # Support both HAT (ABS_HAT0X) and analog axis (ABS_X) D-pads
-                if event.type == ecodes.EV_ABS:
-                    if event.code == ecodes.ABS_HAT0X:
-                        # Hat-switch style: -1=left, 0=center, 1=right
-                        if event.value == -1:
-                            self.log(f"[Gamepad] D-pad LEFT (HAT)")
-                            self.socketio.emit('gamepad_dpad', {'direction': 'left'})
-                        elif event.value == 1:
-                            self.log(f"[Gamepad] D-pad RIGHT (HAT)")
-                            self.socketio.emit('gamepad_dpad', {'direction': 'right'})
-                    elif event.code == ecodes.ABS_X:
-                        # Analog axis style: 0=left, 127/128=center, 255=right
-                        if event.value == 0:
-                            self.log(f"[Gamepad] D-pad LEFT (ABS_X)")
-                            self.socketio.emit('gamepad_dpad', {'direction': 'left'})
-                        elif event.value == 255:
-                            self.log(f"[Gamepad] D-pad RIGHT (ABS_X)")
-                            self.socketio.emit('gamepad_dpad', {'direction': 'right'})
-            
+            self.selector.register(device.fd, selectors.EVENT_READ, ('device', device))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Gamepad] Could not open {device_path}: {e}")
+            return
+        self.active_listeners.add(device_path)
+        self.devices[device_path] = device
+        self.log(f"[Gamepad] Connected: {device.name} at {device_path}")
+
+    def _close_device(self, device, reason):
+        """Remove a device from the selector (unplugged or failed)."""
+        with self.lock:
+            try:
+                self.selector.unregister(device.fd)
+            except (KeyError, ValueError):
+                pass
+            try:
+                device.close()
+            except OSError:
+                pass
+            self.active_listeners.discard(device.path)
+            self.devices.pop(device.path, None)
+        print(f"[Gamepad] Device {device.path} disconnected: {reason}")
+
+    def _input_dir_changed(self):
+        """Cheap hotplug fallback: /dev/input's mtime changes when nodes come and go."""
+        try:
+            mtime = os.stat(INPUT_DIR).st_mtime_ns
+        except OSError:
+            return False
+        changed = self.input_dir_mtime is not None and mtime != self.input_dir_mtime
+        self.input_dir_mtime = mtime
+        return changed
+
+    def _schedule_rescan(self):
+        """Rescan after RESCAN_DELAY without blocking the reactor (input keeps flowing meanwhile)."""
+        if self.rescan_at is None:
+            self.rescan_at = time.monotonic() + RESCAN_DELAY
+
+    def _reactor_loop(self):
+        """Single event loop for all gamepads, hotplug and shutdown."""
+        self._input_dir_changed()
+        next_dir_check = time.monotonic() + HOTPLUG_POLL_SECONDS
+        while self.running:
+            # Wake for the next deadline: a scheduled rescan or the /dev/input check
+            deadline = next_dir_check
+            if self.rescan_at is not None:
+                deadline = min(deadline, self.rescan_at)
+            try:
+                ready = self.selector.select(timeout=max(0.0, deadline - time.monotonic()))
+            except OSError as e:
+                print(f"[Gamepad] Selector error: {e}")
+                time.sleep(1)
+                continue
+
+            for key, _mask in ready:
+                kind, device = key.data
+                if kind == 'device':
+                    self._read_device(device)
+                elif kind == 'udev':
+                    self._handle_udev_events()
+                elif kind == 'wake':
+                    try:
+                        os.read(self.wake_r, 64)
+                    except BlockingIOError:
+                        pass
+
+            now = time.monotonic()
+            # Without pyudev, stat /dev/input on timeouts only, not per input event
+            if now >= next_dir_check:
+                next_dir_check = now + HOTPLUG_POLL_SECONDS
+                if self.udev_monitor is None and self._input_dir_changed():
+                    self._schedule_rescan()
+
+            if self.rescan_at is not None and now >= self.rescan_at:
+                self.rescan_at = None
+                self._scan_devices()
+
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+
+    def _handle_udev_events(self):
+        """Rescan when an input device is added."""
+        added = False
+        while True:
+            udev_device = self.udev_monitor.poll(timeout=0)
+            if udev_device is None:
+                break
+            if udev_device.action == 'add' and (udev_device.device_node or '').startswith('/dev/input/event'):
+                added = True
+        if added:
+            self._schedule_rescan()
+
+    def _read_device(self, device):
+        """Drain all pending events from one device."""
+        try:
+            for event in device.read():
+                self._handle_event(device.path, event)
+        except BlockingIOError:
+            return
         except (OSError, FileNotFoundError) as e:
-            print(f"[Gamepad] Device {device_path} disconnected: {e}")
+            self._close_device(device, e)
         except Exception as e:
-            print(f"[Gamepad] Error on {device_path}: {e}")
-        finally:
-            # Clean up when thread exits
-            with self.lock:
-                if device_path in self.active_listeners:
-                    self.active_listeners.remove(device_path)
-            print(f"[Gamepad] Listener thread ended for {device_path}")
+            print(f"[Gamepad] Error on {device.path}: {e}")
+
+    def _handle_event(self, device_path, event):
+        """Route one evdev event."""
+        self.event_capture = capture_time(event)
+
+        # Log raw EV_KEY events only in verbose mode (SKILLPLAYER_VERBOSE_INPUT=1), console only
+        if event.type == ecodes.EV_KEY:
+            self.logger.log(f"[Gamepad] Raw: {event.code}, Val: {event.value}", 'raw', emit=False, verbose=True)
+
+        # Handle button events (press=1, release=0, hold=2)
+        if event.type == ecodes.EV_KEY:
+            if event.value in [0, 1]: # Ignore hold (2) auto-repeat events for now
+                self._handle_button_event(device_path, event.code, event.value)
+        
+        # Handle D-pad (hat) events for left/right navigation
+        # Support both HAT (ABS_HAT0X) and analog axis (ABS_X) D-pads
+        if event.type == ecodes.EV_ABS:
+            if event.code == ecodes.ABS_HAT0X:
+                # Hat-switch style: -1=left, 0=center, 1=right
+                if event.value == -1:
+                    self.log(f"[Gamepad] D-pad LEFT (HAT)", 'dpad')
+                    self._emit_input('gamepad_dpad', {'direction': 'left'})
+                elif event.value == 1:
+                    self.log(f"[Gamepad] D-pad RIGHT (HAT)", 'dpad')
+                    self._emit_input('gamepad_dpad', {'direction': 'right'})
+            elif event.code == ecodes.ABS_X:
+                # Analog axis style: 0=left, 127/128=center, 255=right
+                if event.value == 0:
+                    self.log(f"[Gamepad] D-pad LEFT (ABS_X)", 'dpad')
+                    self._emit_input('gamepad_dpad', {'direction': 'left'})
+                elif event.value == 255:
+                    self.log(f"[Gamepad] D-pad RIGHT (ABS_X)", 'dpad')
+                    self._emit_input('gamepad_dpad', {'direction': 'right'})
+
+    def _emit_input(self, name, payload=None):
+        """Emit an input event to the frontend, stamped for latency tracing."""
+        self.socketio.emit(name, latency_tracker.stamp(name, self.event_capture, payload))
+
+    def latency_stats(self):
+        """Answer-button latency percentiles in milliseconds (server, client and total stages)."""
+        stages = latency_tracker.summary('gamepad_button').get('gamepad_button', {})
+        return {stage: {k: v for k, v in stats.items() if k != 'buckets'} for stage, stats in stages.items()}
     
     def _handle_button_event(self, device_path, button_code, value):
         """Handle a button event (press/release) from any device."""
@@ -256,11 +387,11 @@ class GamepadHandler:
                 # 1. Handle Special Hold-to-Stop Button (START)
                 if button_code == START_BTN:
                     if value == 1: # Down
-                         self.log(f"[Gamepad] Player {player_id} START DOWN (Holding...)")
-                         self.socketio.emit('gamepad_start_down', {'player': player_id})
+                         self.log(f"[Gamepad] Player {player_id} START DOWN (Holding...)", 'button')
+                         self._emit_input('gamepad_start_down', {'player': player_id})
                     elif value == 0: # Up
-                         self.log(f"[Gamepad] Player {player_id} START UP (Released)")
-                         self.socketio.emit('gamepad_start_up', {'player': player_id})
+                         self.log(f"[Gamepad] Player {player_id} START UP (Released)", 'button')
+                         self._emit_input('gamepad_start_up', {'player': player_id})
                     return # Start button is special, don't map to answers
 
                 # 2. Handle Standard Answer Buttons (Press Only)
@@ -268,33 +399,33 @@ class GamepadHandler:
                     # Forward mapped buttons
                     if button_code in BUTTON_TO_ANSWER:
                         answer_index = BUTTON_TO_ANSWER[button_code]
-                        self.log(f"[Gamepad] Player {player_id} pressed Button {button_code} -> Answer {answer_index}")
+                        self.log(f"[Gamepad] Player {player_id} pressed Button {button_code} -> Answer {answer_index}", 'button')
                         
                         if answer_index == 'skip':
-                            self.log("[Gamepad] SKIP EVENT EMITTED!")
+                            self.log("[Gamepad] SKIP EVENT EMITTED!", 'button')
 
-                        self.socketio.emit('gamepad_button', {
+                        self._emit_input('gamepad_button', {
                             'player': player_id,
                             'answer_index': answer_index
                         })
                     else:
-                        print(f"[Gamepad] Unmapped Button Pressed: {button_code}")
+                        self.logger.log(f"[Gamepad] Unmapped Button Pressed: {button_code}", 'button', emit=False)
         
         elif not self.binding_mode:
             # PRE-SESSION: Forward button presses so the start screen can respond
             # Only START uses hold-to-start (with cancellation on release)
             if button_code == START_BTN:
                 if value == 1:  # Press
-                    self.log(f"[Gamepad] Pre-session hold-start button DOWN (code {button_code})")
-                    self.socketio.emit('gamepad_start_down', {'player': 0})
+                    self.log(f"[Gamepad] Pre-session hold-start button DOWN (code {button_code})", 'button')
+                    self._emit_input('gamepad_start_down', {'player': 0})
                 elif value == 0:  # Release
-                    self.log(f"[Gamepad] Pre-session hold-start button UP (code {button_code})")
-                    self.socketio.emit('gamepad_start_up', {'player': 0})
+                    self.log(f"[Gamepad] Pre-session hold-start button UP (code {button_code})", 'button')
+                    self._emit_input('gamepad_start_up', {'player': 0})
             elif value == 1 and button_code in BUTTON_TO_ANSWER:
                 # Other face buttons just auto-select gamepad mode (no quiz start)
                 answer_index = BUTTON_TO_ANSWER[button_code]
-                self.log(f"[Gamepad] Pre-session button -> {answer_index}")
-                self.socketio.emit('gamepad_button', {
+                self.log(f"[Gamepad] Pre-session button -> {answer_index}", 'button')
+                self._emit_input('gamepad_button', {
                     'player': 0,
                     'answer_index': answer_index
                 })
@@ -302,6 +433,10 @@ class GamepadHandler:
     def stop(self):
         """Stop the gamepad handler."""
         self.running = False
+        try:
+            os.write(self.wake_w, b'x')
+        except OSError:
+            pass
 
 
 def start_gamepad_handler(socketio):
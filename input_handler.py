@@ -4,25 +4,37 @@ import threading
 import time
 import asyncio
 
+from latency_tracker import latency_tracker, capture_time
+from log_pipeline import get_log_pipeline
+
 # Screen Dimensions (Update if your display is different)
 SCREEN_WIDTH = 1920
 SCREEN_HEIGHT = 1080
 
+# Cursor broadcast rate: full rate for a single screen, scaled down as more clients
+# connect (every update goes to every client), but never below MIN_BROADCAST_HZ
+MAX_BROADCAST_HZ = 60.0
+MIN_BROADCAST_HZ = 20.0
+PLAYER_NUMBERS = {'p1': 1, 'p2': 2}
+
 class InputManager:
     def __init__(self, socketio):
         self.socketio = socketio
+        self.logger = get_log_pipeline(socketio)
         self.running = True
         
         # Device Paths
         self.P1_PATH = '/dev/input/by-id/usb-PixArt_HP_320M_USB_Optical_Mouse-event-mouse'
         self.P2_PATH = '/dev/input/by-id/usb-PixArt_Microsoft_USB_Optical_Mouse-event-mouse'
         
-        # Cursor State
+        # Cursor State (the condition's lock guards cursors and dirty)
         self.lock = threading.Lock()
+        self.cursor_changed = threading.Condition(self.lock)
         self.cursors = {
             'p1': {'x': SCREEN_WIDTH // 4, 'y': SCREEN_HEIGHT // 2},
             'p2': {'x': (SCREEN_WIDTH // 4) * 3, 'y': SCREEN_HEIGHT // 2}
         }
+        self.dirty = set()  # Players whose cursor moved since the last broadcast
         
         # Start Threads
         threading.Thread(target=self._broadcast_loop, daemon=True).start()
@@ -31,70 +43,110 @@ class InputManager:
         
     def _device_listener(self, player_id, device_path):
         """Monitor input device, auto-reconnecting on failure."""
-        print(f"[{player_id.upper()}] Input listener started for {device_path}")
+        self.logger.log(f"[{player_id.upper()}] Input listener started for {device_path}", 'mouse', emit=False)
         
         while self.running:
             try:
                 device = evdev.InputDevice(device_path)
-                print(f"[{player_id.upper()}] Connected: {device.name}")
+                self.logger.log(f"[{player_id.upper()}] Connected: {device.name}", 'mouse', emit=False)
                 
                 # GRAB the device to prevent system cursor movement
                 try:
                     device.grab()
-                    print(f"[{player_id.upper()}] Device GRABBED (System cursor disabled for this device)")
+                    self.logger.log(f"[{player_id.upper()}] Device GRABBED (System cursor disabled for this device)", 'mouse', emit=False)
                 except Exception as e:
-                    print(f"[{player_id.upper()}] WARNING: Could not grab device (System cursor will still move): {e}")
+                    self.logger.log(f"[{player_id.upper()}] WARNING: Could not grab device (System cursor will still move): {e}", 'mouse', emit=False)
 
-                # Consume events
+                # Consume events. Relative motion is summed per SYN_REPORT so the
+                # lock is taken once per report instead of once per axis event.
+                dx = dy = 0
                 for event in device.read_loop():
                     if event.type == ecodes.EV_REL:
-                        with self.lock:
-                            if event.code == ecodes.REL_X:
-                                self.cursors[player_id]['x'] += event.value
-                                # Clamp X
-                                self.cursors[player_id]['x'] = max(0, min(SCREEN_WIDTH, self.cursors[player_id]['x']))
-                                
-                            elif event.code == ecodes.REL_Y:
-                                self.cursors[player_id]['y'] += event.value
-                                # Clamp Y
-                                self.cursors[player_id]['y'] = max(0, min(SCREEN_HEIGHT, self.cursors[player_id]['y']))
-                                
+                        if event.code == ecodes.REL_X:
+                            dx += event.value
+                        elif event.code == ecodes.REL_Y:
+                            dy += event.value
+
+                    elif event.type == ecodes.EV_SYN and event.code == ecodes.SYN_REPORT:
+                        if dx or dy:
+                            self._move_cursor(player_id, dx, dy)
+                            dx = dy = 0
+
                     elif event.type == ecodes.EV_KEY:
                         if event.code == ecodes.BTN_LEFT and event.value == 1: # Click down
-                            # Send click IMMEDIATELY for responsiveness
-                            self.socketio.emit(f'{player_id}_click', {})
+                            # Send click IMMEDIATELY for responsiveness, with the current
+                            # position so it doesn't wait for the next cursor broadcast
+                            with self.lock:
+                                position = dict(self.cursors[player_id])
+                            name = f'{player_id}_click'
+                            self.socketio.emit(name, latency_tracker.stamp(name, capture_time(event), position))
                             
             except (OSError, FileNotFoundError):
                 # Device unplugged or permission error
-                print(f"[{player_id.upper()}] Connection lost or not found. Retrying in 2s...")
+                self.logger.log(f"[{player_id.upper()}] Connection lost or not found. Retrying in 2s...", 'reconnect', emit=False)
                 time.sleep(2)
             except Exception as e:
-                print(f"[{player_id.upper()}] Unexpected error: {e}")
+                self.logger.log(f"[{player_id.upper()}] Unexpected error: {e}", 'reconnect', emit=False)
                 time.sleep(2)
 
+    def _move_cursor(self, player_id, dx, dy):
+        """Apply one report's worth of motion and wake the broadcaster."""
+        with self.cursor_changed:
+            cursor = self.cursors[player_id]
+            x = max(0, min(SCREEN_WIDTH, cursor['x'] + dx))
+            y = max(0, min(SCREEN_HEIGHT, cursor['y'] + dy))
+            if x == cursor['x'] and y == cursor['y']:
+                return  # Pinned against the screen edge
+            cursor['x'], cursor['y'] = x, y
+            self.dirty.add(player_id)
+            self.cursor_changed.notify()
+
+    def _client_count(self):
+        """Number of connected Socket.IO clients (1 if it can't be determined)."""
+        try:
+            return len(self.socketio.server.eio.sockets)
+        except AttributeError:
+            return 1
+
+    def _broadcast_interval(self, clients):
+        """Seconds between cursor broadcasts for the given number of clients."""
+        rate = max(MIN_BROADCAST_HZ, MAX_BROADCAST_HZ / max(1, clients))
+        return 1.0 / rate
+
     def _broadcast_loop(self):
-        """Emit cursor positions at 60Hz to prevent network flood."""
-        last_state = {}
-        
+        """
+        Emit cursor moves as they happen, at most once per broadcast interval.
+        Sleeps until a cursor is dirty and sends only the players that moved as a
+        flat array: 'cursor_update' [player, x, y, player, x, y, ...].
+        """
         while self.running:
-            start_time = time.time()
-            
-            # Create snapshot of current state
-            with self.lock:
-                current_state = {
-                    'p1': self.cursors['p1'].copy(),
-                    'p2': self.cursors['p2'].copy()
-                }
-            
-            # Emit only if changed (simple optimization)
-            if current_state != last_state:
-                self.socketio.emit('state_update', current_state)
-                last_state = current_state
-            
-            # Warning: Sleep duration is simplistic, but fine for 60Hz soft-realtime
-            elapsed = time.time() - start_time
-            sleep_time = max(0, (1.0/60.0) - elapsed)
-            time.sleep(sleep_time)
+            with self.cursor_changed:
+                while not self.dirty and self.running:
+                    self.cursor_changed.wait()
+                if not self.running:
+                    return
+
+                clients = self._client_count()
+                if clients == 0:
+                    payload = None  # Nobody to draw it; keep the players dirty
+                else:
+                    payload = []
+                    for player_id in sorted(self.dirty):
+                        cursor = self.cursors[player_id]
+                        payload += [PLAYER_NUMBERS[player_id], cursor['x'], cursor['y']]
+                    self.dirty.clear()
+
+            if payload:
+                self.socketio.emit('cursor_update', payload)
+
+            # Coalesce further motion until the next slot
+            time.sleep(self._broadcast_interval(clients) if clients else 0.5)
+
+    def stop(self):
+        """Stop broadcasting (device listeners exit with the process)."""
+        with self.cursor_changed:
+            self.running = False
+            self.cursor_changed.notify_all()
 
 def start_input_monitoring(socketio):
     """Factory to start the manager."""
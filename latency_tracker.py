@@ -0,0 +1,145 @@
+"""
+Latency tracker - input-to-screen timing for gamepad and mouse events.
+Input events are stamped with a sequence number and their capture time on the
+server's monotonic clock. The frontend echoes both back ('input_ack') once it
+has acted on the event and the next frame is drawn. Three stages are kept per
+event type, each as a rolling window with p50/p95/p99 and a bucket histogram:
+
+    server  - kernel capture -> Socket.IO emit
+    client  - event received in the browser -> next animation frame
+    total   - kernel capture -> ack back at the server (includes the ack's trip back)
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+WINDOW_SIZE = 1000                  # Samples kept per event type and stage
+BUCKET_EDGES_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+MAX_VALID_MS = 10000                # Acks older than this are treated as bogus
+
+
+def capture_time(event=None):
+    """
+    Monotonic capture time of an evdev event (or now if no event is given).
+    evdev timestamps use the wall clock, so the event's age is subtracted from time.monotonic().
+    """
+    now = time.monotonic()
+    if event is None:
+        return now
+    age = time.time() - event.timestamp()
+    return now - max(0.0, age)
+
+
+class RollingHistogram:
+    """Last WINDOW_SIZE samples (ms) with percentile and bucket summaries."""
+
+    def __init__(self, size=WINDOW_SIZE):
+        self.samples = deque(maxlen=size)
+
+    def add(self, value_ms):
+        self.samples.append(value_ms)
+
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': 0}
+        pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        # Non-cumulative counts per bucket: [{'le_ms': 1, 'count': n}, ..., {'le_ms': None, 'count': n}]
+        buckets = []
+        remaining = iter(samples)
+        value = next(remaining, None)
+        for edge in BUCKET_EDGES_MS + [None]:
+            count = 0
+            while value is not None and (edge is None or value <= edge):
+                count += 1
+                value = next(remaining, None)
+            buckets.append({'le_ms': edge, 'count': count})
+
+        return {
+            'count': len(samples),
+            'p50_ms': round(pick(0.50), 2),
+            'p95_ms': round(pick(0.95), 2),
+            'p99_ms': round(pick(0.99), 2),
+            'max_ms': round(samples[-1], 2),
+            'buckets': buckets
+        }
+
+
+class LatencyTracker:
+    """
+    Thread-safe collection of per-event, per-stage latency histograms.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = itertools.count(1)
+        self.histograms = {}  # (event name, stage) -> RollingHistogram
+        self.started = time.time()
+
+    def _record(self, name, stage, value_ms):
+        """Add one sample (called with the lock held)."""
+        key = (name, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = RollingHistogram()
+        histogram.add(value_ms)
+
+    def stamp(self, name, captured=None, payload=None):
+        """
+        Add trace fields to an outgoing event payload and record the server stage.
+        Returns the payload (a new dict if none was given).
+        """
+        now = time.monotonic()
+        if captured is None:
+            captured = now
+        payload = dict(payload) if payload else {}
+        payload['seq'] = next(self.seq)
+        payload['t_capture'] = round(captured * 1000, 3)
+
+        with self.lock:
+            self._record(name, 'server', (now - captured) * 1000)
+        return payload
+
+    def ack(self, data):
+        """Record a frontend acknowledgement ({'event', 'seq', 't_capture', 'client_ms'})."""
+        if not isinstance(data, dict):
+            return False
+        name = data.get('event')
+        try:
+            captured_ms = float(data['t_capture'])
+            client_ms = float(data.get('client_ms', 0))
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        total_ms = time.monotonic() * 1000 - captured_ms
+        if not isinstance(name, str) or not 0 <= total_ms <= MAX_VALID_MS or not 0 <= client_ms <= total_ms:
+            return False
+
+        with self.lock:
+            # Only events the server has stamped (keeps client-supplied names bounded)
+            if (name, 'server') not in self.histograms:
+                return False
+            self._record(name, 'client', client_ms)
+            self._record(name, 'total', total_ms)
+        return True
+
+    def summary(self, name=None):
+        """Histograms by event name and stage (optionally for a single event name)."""
+        with self.lock:
+            keys = [k for k in self.histograms if name is None or k[0] == name]
+            result = {}
+            for event_name, stage in sorted(keys):
+                result.setdefault(event_name, {})[stage] = self.histograms[(event_name, stage)].summary()
+        return result
+
+    def reset(self):
+        """Drop all samples (e.g. before comparing a new controller or Pi image)."""
+        with self.lock:
+            self.histograms = {}
+            self.started = time.time()
+
+
+latency_tracker = LatencyTracker()
@@ -1,93 +1,209 @@
 """
 Leaderboard module - handles score persistence with 14-day expiry.
+Scores are held in memory (a bounded heap of the live top MAX_SCORES plus a
+date-sorted list for expiry) and written to scores.json in the background,
+one write per burst of changes.
 """
 
-import json
+import bisect
+import heapq
+import itertools
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from persistence import BACKUP_VERSIONS, read_json, writer
+
 
 SCORES_FILE = Path(__file__).parent / "scores.json"
 MAX_SCORES = 10
 EXPIRY_DAYS = 14
 MAX_NAME_LENGTH = 10
+WRITE_DELAY = 2.0   # Seconds changes are collected before scores.json is rewritten
+
+
+class Leaderboard:
+    """
+    In-memory top-N leaderboard with write-behind persistence.
+    """
+
+    def __init__(self, scores_file, max_scores=MAX_SCORES, expiry_days=EXPIRY_DAYS):
+        self.scores_file = Path(scores_file)
+        self.max_scores = max_scores
+        self.expiry = timedelta(days=expiry_days)
+
+        self.lock = threading.Lock()
+        self.seq = itertools.count()
+        # Min-heap of (score, -seq, seq): heap[0] is the entry that drops off next
+        # (lowest score; newest first among ties, matching a stable sort)
+        self.heap = []
+        self.entries = {}        # seq -> entry dict
+        self.by_date = []        # sorted (date, seq), oldest first, for expiry
+
+        self._load()
+
+    def _load(self):
+        """Load scores from file into memory."""
+        scores = read_json(self.scores_file, [], operation='load_scores')
+        if not isinstance(scores, list):
+            return
+
+        dated = []
+        for entry in scores:
+            try:
+                dated.append((datetime.fromisoformat(entry["date"]), entry))
+            except (KeyError, ValueError, TypeError):
+                continue
+
+        # Keep file order for ties (the file is written best-first)
+        for entry_date, entry in dated:
+            self._insert(entry, entry_date)
+        self._expire()
+
+    def _insert(self, entry, entry_date):
+        """Add an entry, evicting the lowest if the board is full. Returns False if it didn't make it."""
+        seq = next(self.seq)
+        key = (entry["score"], -seq, seq)
+
+        if len(self.heap) < self.max_scores:
+            heapq.heappush(self.heap, key)
+        elif key > self.heap[0]:
+            evicted = heapq.heapreplace(self.heap, key)
+            self.entries.pop(evicted[2], None)
+        else:
+            return False
+
+        self.entries[seq] = entry
+        bisect.insort(self.by_date, (entry_date, seq))
+        return True
+
+    def _expire(self):
+        """Drop entries older than the expiry window."""
+        cutoff = datetime.now() - self.expiry
+        expired = False
+        stale = bisect.bisect_left(self.by_date, (cutoff, -1))
+        for _, seq in self.by_date[:stale]:
+            if self.entries.pop(seq, None) is not None:
+                expired = True
+        del self.by_date[:stale]
+        # Rebuild the (at most MAX_SCORES long) heap only if something expired
+        if expired:
+            self.heap = [key for key in self.heap if key[2] in self.entries]
+            heapq.heapify(self.heap)
+        # Entries evicted by better scores are dropped from the date list lazily
+        if len(self.by_date) > 2 * self.max_scores:
+            self.by_date = [item for item in self.by_date if item[1] in self.entries]
+
+    def _sorted(self):
+        """Current entries, best first."""
+        keys = sorted(self.heap, key=lambda k: (-k[0], k[2]))
+        return [self.entries[k[2]] for k in keys]
+
+    def get(self):
+        """Get the current leaderboard."""
+        with self.lock:
+            self._expire()
+            return self._sorted()
+
+    def is_top_score(self, score):
+        """Check if score qualifies for the leaderboard."""
+        with self.lock:
+            self._expire()
+            if len(self.heap) < self.max_scores:
+                return True
+            # Check if score beats the lowest score
+            return score > self.heap[0][0]
+
+    def add(self, entry):
+        """Add an entry. Returns (made_the_board, updated leaderboard)."""
+        with self.lock:
+            self._expire()
+            added = self._insert(entry, datetime.fromisoformat(entry["date"]))
+            if added:
+                self._mark_dirty()
+            return added, self._sorted()
+
+    def replace(self, scores):
+        """Replace every entry (e.g. [] to clear the board)."""
+        with self.lock:
+            self.heap, self.entries, self.by_date = [], {}, []
+            for entry in scores:
+                try:
+                    self._insert(entry, datetime.fromisoformat(entry["date"]))
+                except (KeyError, ValueError, TypeError):
+                    continue
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        writer.schedule(self.scores_file, self._snapshot, WRITE_DELAY,
+                        backups=BACKUP_VERSIONS, operation='save_scores')
+
+    def _snapshot(self):
+        """Scores to write, best first (called by the writer at write time)."""
+        with self.lock:
+            return self._sorted()
+
+    def flush(self):
+        """Write pending changes to disk now."""
+        writer.flush(self.scores_file)
+
+    def close(self):
+        """Flush anything still pending (the writer also flushes at exit)."""
+        self.flush()
+
+
+_leaderboard = Leaderboard(SCORES_FILE)
+
+
+def use_leaderboard(board) -> None:
+    """Swap in another leaderboard store with the same methods (e.g. storage.SQLiteLeaderboard)."""
+    global _leaderboard
+    _leaderboard = board
 
 
 def load_scores() -> list:
-    """Load scores from file, filtering out expired entries."""
-    if not SCORES_FILE.exists():
-        return []
-    
-    try:
-        with open(SCORES_FILE, 'r', encoding='utf-8') as f:
-            scores = json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return []
-    
-    # Filter out expired scores (older than 14 days)
-    cutoff_date = datetime.now() - timedelta(days=EXPIRY_DAYS)
-    valid_scores = []
-    
-    for entry in scores:
-        try:
-            entry_date = datetime.fromisoformat(entry["date"])
-            if entry_date >= cutoff_date:
-                valid_scores.append(entry)
-        except (KeyError, ValueError):
-            continue
-    
-    # Sort by score descending, keep top 10
-    valid_scores.sort(key=lambda x: x["score"], reverse=True)
-    return valid_scores[:MAX_SCORES]
+    """Load scores, filtering out expired entries."""
+    return _leaderboard.get()
 
 
 def save_scores(scores: list) -> None:
-    """Save scores to file."""
-    try:
-        with open(SCORES_FILE, 'w', encoding='utf-8') as f:
-            json.dump(scores, f, indent=2)
-    except IOError as e:
-        print(f"Error saving scores: {e}")
+    """Save scores (written to file in the background)."""
+    _leaderboard.replace(scores)
 
 
 def is_top_score(score: int) -> bool:
     """Check if score qualifies for the leaderboard."""
-    scores = load_scores()
-    
-    if len(scores) < MAX_SCORES:
-        return True
-    
-    # Check if score beats the lowest score
-    return score > scores[-1]["score"]
+    return _leaderboard.is_top_score(score)
 
 
-def add_score(name: str, score: int, stats: dict = None) -> list:
+def submit_score(name: str, score: int, stats: dict = None) -> tuple:
     """
-    Add a new score to the leaderboard.
-    Returns the updated leaderboard.
+    Add a score if it qualifies for the leaderboard.
+    Returns (is_top_score, updated leaderboard) in a single step.
     """
     # Validate and truncate name
     name = name.strip()[:MAX_NAME_LENGTH].upper()
     if not name:
         name = "ANON"
-    
-    scores = load_scores()
-    
+
     new_entry = {
         "name": name,
         "score": score,
         "date": datetime.now().isoformat(),
         "stats": stats or {}
     }
-    
-    scores.append(new_entry)
-    scores.sort(key=lambda x: x["score"], reverse=True)
-    scores = scores[:MAX_SCORES]
-    
-    save_scores(scores)
+    return _leaderboard.add(new_entry)
+
+
+def add_score(name: str, score: int, stats: dict = None) -> list:
+    """
+    Add a new score to the leaderboard.
+    Returns the updated leaderboard.
+    """
+    _, scores = submit_score(name, score, stats)
     return scores
 
 
 def get_leaderboard() -> list:
     """Get the current leaderboard."""
-    return load_scores()
+    return _leaderboard.get()
@@ -0,0 +1,115 @@
+"""
+Log pipeline for the input handlers.
+log() only appends to a bounded ring buffer; a background worker prints the
+messages and forwards them to the admin console ('server_log' Socket.IO event).
+Each category is rate limited, so a stuck button or a noisy device can't flood
+the console, and game-critical emits never wait on console or websocket I/O.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+BUFFER_SIZE = 1000          # Oldest messages are dropped if the worker falls behind
+DEFAULT_RATE = 20.0         # Messages per second per category
+DEFAULT_BURST = 40          # Messages allowed back-to-back before limiting kicks in
+SUMMARY_INTERVAL = 30.0     # Seconds between "N messages suppressed" reports
+CATEGORY_RATES = {
+    'raw': (50.0, 100),     # Raw evdev events (verbose mode only)
+    'reconnect': (1 / 30, 2),  # Missing-device retry messages: one per 30s after the first two
+}
+
+# Set SKILLPLAYER_VERBOSE_INPUT=1 to log every raw input event
+VERBOSE = os.environ.get('SKILLPLAYER_VERBOSE_INPUT', '0') == '1'
+
+
+class LogPipeline:
+    """
+    Bounded, rate-limited, asynchronous logger.
+    """
+
+    def __init__(self, socketio=None):
+        self.socketio = socketio
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        self.cond = threading.Condition()
+        self.buckets = {}     # category -> [tokens, last_refill]
+        self.suppressed = {}  # category -> messages dropped by the rate limiter
+
+        self.thread = threading.Thread(target=self._drain_loop, daemon=True)
+        self.thread.start()
+
+    def log(self, message, category='general', emit=True, verbose=False):
+        """
+        Queue a message. Never blocks on I/O.
+        emit=False keeps it on the console only; verbose=True drops it unless VERBOSE is on.
+        """
+        if verbose and not VERBOSE:
+            return
+
+        with self.cond:
+            if not self._allow(category):
+                self.suppressed[category] = self.suppressed.get(category, 0) + 1
+                return
+            self.buffer.append((message, emit, time.strftime('%H:%M:%S')))
+            self.cond.notify()
+
+    def _allow(self, category):
+        """Token bucket check for a category (called with the lock held)."""
+        rate, burst = CATEGORY_RATES.get(category, (DEFAULT_RATE, DEFAULT_BURST))
+        now = time.monotonic()
+        bucket = self.buckets.get(category)
+        if bucket is None:
+            bucket = self.buckets[category] = [burst, now]
+
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _drain_loop(self):
+        """Background worker: print and forward queued messages in batches."""
+        last_summary = time.monotonic()
+        while True:
+            with self.cond:
+                while not self.buffer:
+                    self.cond.wait(SUMMARY_INTERVAL)
+                    if self.suppressed and time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                        break
+                batch = list(self.buffer)
+                self.buffer.clear()
+                suppressed = {}
+                if time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                    suppressed, self.suppressed = self.suppressed, {}
+                    last_summary = time.monotonic()
+
+            for category, count in suppressed.items():
+                batch.append((f"[Log] {count} '{category}' messages suppressed (rate limit)",
+                              False, time.strftime('%H:%M:%S')))
+
+            if batch:
+                print('\n'.join(message for message, _, _ in batch), flush=True)
+
+            if self.socketio is not None:
+                for message, emit, timestamp in batch:
+                    if emit:
+                        try:
+                            self.socketio.emit('server_log', {'message': message, 'timestamp': timestamp})
+                        except Exception as e:
+                            print(f"[Log] Could not forward log message: {e}")
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_log_pipeline(socketio=None):
+    """Shared pipeline for all input handlers (created on first use)."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = LogPipeline(socketio)
+        elif socketio is not None and _pipeline.socketio is None:
+            _pipeline.socketio = socketio
+        return _pipeline
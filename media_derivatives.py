@@ -0,0 +1,241 @@
+"""
+Media derivatives - downscaled thumbnails and video poster frames.
+Skill logos, the UI images in static/ and a poster frame per video are
+generated in the background by a few worker threads and kept in a cache
+directory. Cache files are keyed by the source path, mtime and size, so a
+replaced file gets a new derivative and nothing is regenerated needlessly.
+
+Uses Pillow for images and ffmpeg for video posters (and for images if
+Pillow is missing). Without either, callers fall back to the originals.
+The work is done by ffmpeg subprocesses and Pillow (which releases the GIL
+while resizing), so threads are enough - no process pool is forked from the
+multi-threaded server or re-imports app.py on Windows/frozen builds.
+"""
+
+import atexit
+import hashlib
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+# Optional: Pillow for image thumbnails
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+FFMPEG = shutil.which('ffmpeg')
+
+THUMB_SIZE = 240            # Longest side in px (2x the largest on-screen logo, 120px)
+POSTER_WIDTH = 192          # Video card icons are 48px; room for 2x and larger cards
+POSTER_SEEK_SECONDS = 1.0   # Skip black first frames
+FFMPEG_TIMEOUT = 60
+WORKERS = int(os.environ.get('SKILLPLAYER_DERIVATIVE_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.mkv', '.avi', '.mov', '.wmv', '.m4v'}
+
+
+def _replace_from_tmp(tmp_path, target):
+    if os.path.getsize(tmp_path) == 0:
+        raise OSError("empty output")
+    os.replace(tmp_path, target)
+
+
+def _ffmpeg(args, tmp_path):
+    try:
+        subprocess.run(
+            [FFMPEG, '-hide_banner', '-loglevel', 'error', '-y'] + args + [tmp_path],
+            check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE, timeout=FFMPEG_TIMEOUT
+        )
+    except subprocess.CalledProcessError as e:
+        lines = e.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(f"ffmpeg failed: {lines[-1] if lines else f'exit status {e.returncode}'}")
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffmpeg timed out after {FFMPEG_TIMEOUT}s")
+
+
+def make_thumbnail(source, target, size=THUMB_SIZE):
+    """Worker: write a downscaled copy of an image (never upscaled). Runs on a worker thread."""
+    tmp_path = f"{target}.tmp{Path(target).suffix}"
+    try:
+        if PIL_AVAILABLE:
+            with Image.open(source) as image:
+                image.thumbnail((size, size))
+                if Path(target).suffix == '.jpg' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                image.save(tmp_path, optimize=True, **({'quality': 85} if Path(target).suffix == '.jpg' else {}))
+        else:
+            scale = f"scale='min({size},iw)':'min({size},ih)':force_original_aspect_ratio=decrease"
+            _ffmpeg(['-i', str(source), '-vf', scale, '-frames:v', '1'], tmp_path)
+        _replace_from_tmp(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return str(target)
+
+
+def make_poster(source, target, width=POSTER_WIDTH):
+    """Worker: grab one frame of a video as a small JPEG. Runs on a worker thread."""
+    tmp_path = f"{target}.tmp.jpg"
+    try:
+        for seek in (POSTER_SEEK_SECONDS, 0):
+            try:
+                _ffmpeg(['-ss', str(seek), '-i', str(source), '-frames:v', '1',
+                         '-vf', f'scale={width}:-2', '-q:v', '5'], tmp_path)
+                if os.path.getsize(tmp_path) > 0:
+                    break
+            except (RuntimeError, OSError):
+                # Clips shorter than the seek point have no frame there - retry from the start
+                if seek == 0:
+                    raise
+        _replace_from_tmp(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return str(target)
+
+
+class DerivativeStore:
+    """
+    Cache of generated thumbnails/posters plus the worker threads that make them.
+    """
+
+    def __init__(self, cache_dir, workers=WORKERS):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.pending = set()     # Cache paths queued or being generated
+        self.failed = set()      # Cache paths that failed (not retried until the source changes)
+        self.targets = {}        # Source path -> cache path for its current version
+        self.queue = queue.Queue()
+        self.threads = []
+        self.closed = False
+        atexit.register(self.close)
+
+    def can_make(self, source):
+        """Whether a derivative can be generated for this file type."""
+        suffix = Path(source).suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            return PIL_AVAILABLE or FFMPEG is not None
+        if suffix in VIDEO_EXTENSIONS:
+            return FFMPEG is not None
+        return False
+
+    def _cache_path(self, source):
+        """Cache file for the current version of source (None if it can't be stat'ed)."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        suffix = Path(source).suffix.lower()
+        size = POSTER_WIDTH if suffix in VIDEO_EXTENSIONS else THUMB_SIZE
+        key = hashlib.sha1(
+            f"{os.path.abspath(source)}|{st.st_mtime_ns}|{st.st_size}|{size}".encode('utf-8')
+        ).hexdigest()[:24]
+        # PNGs keep their transparency; everything else becomes JPEG
+        ext = '.png' if suffix == '.png' else '.jpg'
+        return self.cache_dir / f"{key}{ext}"
+
+    def get(self, source):
+        """
+        Path of the ready derivative for source, or None.
+        A missing derivative is queued for generation.
+        """
+        if Path(source).suffix.lower() not in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS:
+            return None
+        target = self._cache_path(source)
+        if target is None:
+            return None
+        self._track(source, target)
+        if not self.can_make(source):
+            return None
+        if target.exists():
+            return target
+        self._submit(source, target)
+        return None
+
+    def schedule(self, source):
+        """Queue generation for source if it isn't cached yet."""
+        self.get(source)
+
+    def _track(self, source, target):
+        """Remember source's current cache path; a replaced source's old derivative is deleted."""
+        key = os.path.abspath(source)
+        with self.lock:
+            old = self.targets.get(key)
+            if old == target:
+                return
+            self.targets[key] = target
+            if old is None:
+                return
+            self.failed.discard(old)
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+    def sweep(self):
+        """
+        Delete derivatives that no requested source maps to (files replaced or removed
+        while the server was off). Call after every source was scheduled.
+        """
+        with self.lock:
+            keep = set(self.targets.values())
+        removed = 0
+        try:
+            entries = list(self.cache_dir.iterdir())
+        except OSError:
+            return 0
+        for path in entries:
+            if path in keep or '.tmp' in path.name:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            print(f"[Derivatives] Removed {removed} superseded file(s)")
+        return removed
+
+    def _submit(self, source, target):
+        with self.lock:
+            if self.closed or target in self.pending or target in self.failed:
+                return
+            if not self.threads:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                for i in range(max(1, self.workers)):
+                    thread = threading.Thread(target=self._worker, name=f'derivatives-{i}', daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
+            self.pending.add(target)
+        self.queue.put((source, target))
+
+    def _worker(self):
+        while True:
+            source, target = self.queue.get()
+            if self.closed:
+                continue
+            job = make_poster if Path(source).suffix.lower() in VIDEO_EXTENSIONS else make_thumbnail
+            error = None
+            try:
+                job(str(source), str(target))
+            except Exception as e:
+                error = e
+            with self.lock:
+                self.pending.discard(target)
+                if error is not None:
+                    self.failed.add(target)
+            if error is not None:
+                print(f"[Derivatives] Could not process {source}: {error}")
+
+    def close(self):
+        """Stop taking jobs; queued (not yet started) jobs are dropped."""
+        with self.lock:
+            self.closed = True
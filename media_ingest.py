@@ -0,0 +1,357 @@
+"""
+Media ingest - converts content videos into Pi-friendly, streamable MP4s.
+The Pi's browser only hardware-decodes H.264, and MP4s whose index (moov atom)
+sits at the end can't start playing until the whole file has been read. Each
+video the catalog finds is checked in the background and, if needed, remuxed
+(H.264 in MKV/MOV, or non-faststart MP4) or transcoded (anything else) to a
+faststart H.264/AAC MP4 in a side cache. serve_file() then streams the
+optimized copy under the original URL. The content folder is never modified.
+
+Jobs run one at a time, at low CPU priority and with a limited number of
+encoder threads, so playback on the kiosk isn't disturbed.
+
+Usage:
+    python media_ingest.py <content_dir>   # optimize every video now
+    python media_ingest.py --self-test     # check ffmpeg with generated sample clips
+"""
+
+import hashlib
+import os
+import queue
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from media_derivatives import FFMPEG, VIDEO_EXTENSIONS
+
+TRANSCODE_THREADS = int(os.environ.get('SKILLPLAYER_TRANSCODE_THREADS', 2))
+TRANSCODE_NICE = 10          # Lower CPU priority for ffmpeg
+PAUSE_BETWEEN_JOBS = 1.0     # Seconds of breathing room between jobs
+PROBE_TIMEOUT = 30
+JOB_TIMEOUT = 4 * 60 * 60    # Give up on a single file after 4 hours
+MAX_HEIGHT = 1080            # Transcodes are scaled down to at most 1080p
+
+BROWSER_SAFE_AUDIO = {'aac', 'mp3'}
+MP4_EXTENSIONS = {'.mp4', '.m4v'}
+
+_STREAM_RE = re.compile(r'Stream #\d+:\d+.*?: (Video|Audio): (\w+)')
+
+
+def is_faststart(path):
+    """True if an MP4's moov atom comes before its media data (playback can start immediately)."""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return False
+                size, kind = struct.unpack('>I4s', header)
+                if kind == b'moov':
+                    return True
+                if kind == b'mdat':
+                    return False
+                if size == 1:
+                    size = struct.unpack('>Q', f.read(8))[0]
+                    f.seek(size - 16, os.SEEK_CUR)
+                elif size == 0:
+                    return False  # Atom runs to end of file
+                else:
+                    f.seek(size - 8, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return False
+
+
+def probe_codecs(path):
+    """(video codec, audio codec) of the first streams, via `ffmpeg -i` (None if absent)."""
+    result = subprocess.run(
+        [FFMPEG, '-hide_banner', '-i', str(path)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        timeout=PROBE_TIMEOUT
+    )
+    video = audio = None
+    for kind, codec in _STREAM_RE.findall(result.stderr.decode('utf-8', 'replace')):
+        if kind == 'Video' and video is None and codec not in ('mjpeg', 'png'):  # Skip cover art
+            video = codec
+        elif kind == 'Audio' and audio is None:
+            audio = codec
+    return video, audio
+
+
+def plan_conversion(path):
+    """
+    ffmpeg codec arguments to make path Pi-friendly, or None if it already is.
+    H.264 video is only remuxed; audio is copied if the browser can play it.
+    """
+    video, audio = probe_codecs(path)
+    if video is None:
+        return None  # Not a video we can read - leave it alone
+
+    suffix = Path(path).suffix.lower()
+    audio_ok = audio is None or audio in BROWSER_SAFE_AUDIO
+    if suffix in MP4_EXTENSIONS and video == 'h264' and audio_ok and is_faststart(path):
+        return None
+
+    if video == 'h264':
+        video_args = ['-c:v', 'copy']
+    else:
+        video_args = [
+            '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23', '-pix_fmt', 'yuv420p',
+            '-vf', f"scale=-2:'min({MAX_HEIGHT},ih)'", '-threads', str(TRANSCODE_THREADS)
+        ]
+    if audio is None:
+        audio_args = ['-an']
+    elif audio_ok:
+        audio_args = ['-c:a', 'copy']
+    else:
+        audio_args = ['-c:a', 'aac', '-b:a', '128k']
+
+    return ['-map', '0:v:0', '-map', '0:a:0?'] + video_args + audio_args + ['-movflags', '+faststart']
+
+
+def _low_priority():
+    """Command prefix and Popen flags that start ffmpeg at low CPU priority.
+    (No preexec_fn: running Python between fork and exec is unsafe in this threaded server.)"""
+    if os.name == 'nt':
+        return [], subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    nice = shutil.which('nice')
+    return ([nice, '-n', str(TRANSCODE_NICE)] if nice else []), 0
+
+
+def convert(source, target, codec_args):
+    """Run one remux/transcode into target (written to a temp file first)."""
+    tmp_path = f"{target}.tmp.mp4"
+    prefix, creationflags = _low_priority()
+    try:
+        result = subprocess.run(
+            prefix + [FFMPEG, '-hide_banner', '-loglevel', 'error', '-y', '-i', str(source)]
+            + codec_args + [tmp_path],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            timeout=JOB_TIMEOUT, creationflags=creationflags
+        )
+        if result.returncode != 0:
+            lines = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"ffmpeg exit status {result.returncode}")
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class MediaIngest:
+    """
+    Background queue that optimizes videos into a side cache, one at a time.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.queued = set()      # Cache targets waiting or in progress
+        self.skipped = set()     # Cache targets not needed (source already fine)
+        self.failed = set()      # Cache targets that failed (not retried until the source changes)
+        self.targets = {}        # Source path -> cache target for its current version
+        self.current = None
+        self.converted = 0
+        self.thread = None
+
+    def available(self):
+        return FFMPEG is not None
+
+    def _cache_path(self, source):
+        """Optimized file for the current version of source (None if it can't be stat'ed)."""
+        try:
+            st = os.stat(source)
+        except OSError:
+            return None
+        key = hashlib.sha1(
+            f"{os.path.abspath(source)}|{st.st_mtime_ns}|{st.st_size}".encode('utf-8')
+        ).hexdigest()[:24]
+        return self.cache_dir / f"{key}.mp4"
+
+    def optimized_path(self, source):
+        """Path of the ready optimized copy of source, or None to serve the original."""
+        if Path(source).suffix.lower() not in VIDEO_EXTENSIONS:
+            return None
+        target = self._cache_path(source)
+        if target is not None and target.exists():
+            return target
+        return None
+
+    def schedule(self, source):
+        """Queue source for checking/optimizing unless already handled."""
+        if Path(source).suffix.lower() not in VIDEO_EXTENSIONS:
+            return
+        target = self._cache_path(source)
+        if target is None:
+            return
+        self._track(source, target)
+        if not self.available() or target.exists():
+            return
+        with self.lock:
+            if target in self.queued or target in self.skipped or target in self.failed:
+                return
+            self.queued.add(target)
+            if self.thread is None:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self.thread = threading.Thread(target=self._worker_loop, daemon=True)
+                self.thread.start()
+        self.jobs.put((Path(source), target))
+
+    def _track(self, source, target):
+        """Remember source's current cache target; a replaced source's old copy is deleted."""
+        key = os.path.abspath(source)
+        with self.lock:
+            old = self.targets.get(key)
+            self.targets[key] = target
+            if old is None or old == target:
+                return
+            self.skipped.discard(old)
+            self.failed.discard(old)
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+    def sweep(self):
+        """
+        Delete optimized copies that no scheduled source maps to (files replaced or
+        removed while the server was off). Call after every video was scheduled.
+        """
+        with self.lock:
+            keep = set(self.targets.values())
+        removed = 0
+        try:
+            entries = list(self.cache_dir.iterdir())
+        except OSError:
+            return 0
+        for path in entries:
+            if path in keep or '.tmp' in path.name:
+                continue
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            print(f"[Ingest] Removed {removed} superseded optimized file(s)")
+        return removed
+
+    def process(self, source, target):
+        """Check one file and optimize it if needed. Returns 'converted', 'skipped' or 'failed'."""
+        try:
+            codec_args = plan_conversion(source)
+            if codec_args is None:
+                outcome = 'skipped'
+            else:
+                action = 'Transcoding' if 'libx264' in codec_args else 'Remuxing'
+                print(f"[Ingest] {action} {source.name}...")
+                start_time = time.time()
+                convert(source, target, codec_args)
+                print(f"[Ingest] {source.name} ready in {time.time() - start_time:.1f}s")
+                outcome = 'converted'
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            print(f"[Ingest] Could not optimize {source}: {e}")
+            outcome = 'failed'
+
+        with self.lock:
+            self.queued.discard(target)
+            if outcome == 'skipped':
+                self.skipped.add(target)
+            elif outcome == 'failed':
+                self.failed.add(target)
+            else:
+                self.converted += 1
+        return outcome
+
+    def _worker_loop(self):
+        while True:
+            source, target = self.jobs.get()
+            with self.lock:
+                self.current = source.name
+            self.process(source, target)
+            with self.lock:
+                self.current = None
+            time.sleep(PAUSE_BETWEEN_JOBS)
+
+    def status(self):
+        """Queue state for the admin API."""
+        with self.lock:
+            return {
+                "available": self.available(),
+                "queued": len(self.queued),
+                "current": self.current,
+                "converted": self.converted,
+                "already_optimal": len(self.skipped),
+                "failed": len(self.failed)
+            }
+
+
+def _make_sample(path, container_args):
+    subprocess.run(
+        [FFMPEG, '-hide_banner', '-loglevel', 'error', '-y',
+         '-f', 'lavfi', '-i', 'testsrc=duration=2:size=320x240:rate=25',
+         '-f', 'lavfi', '-i', 'sine=frequency=440:duration=2'] + container_args + [str(path)],
+        check=True, stdin=subprocess.DEVNULL, timeout=PROBE_TIMEOUT
+    )
+
+
+def self_test():
+    """Generate sample clips, run them through the worker and check the results."""
+    if FFMPEG is None:
+        print("[Ingest] Self-test: ffmpeg not found on PATH")
+        return False
+
+    samples = {
+        # name: (ffmpeg output args, expected outcome)
+        'faststart.mp4': (['-c:v', 'libx264', '-c:a', 'aac', '-movflags', '+faststart'], 'skipped'),
+        'moov_at_end.mp4': (['-c:v', 'libx264', '-c:a', 'aac'], 'converted'),
+        'h264.mkv': (['-c:v', 'libx264', '-c:a', 'libvorbis'], 'converted'),
+        'mpeg4.avi': (['-c:v', 'mpeg4', '-c:a', 'mp3'], 'converted'),
+    }
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        ingest = MediaIngest(Path(tmp) / 'cache')
+        ingest.cache_dir.mkdir()
+        for name, (args, expected) in samples.items():
+            source = Path(tmp) / name
+            try:
+                _make_sample(source, args)
+            except (subprocess.SubprocessError, OSError) as e:
+                print(f"  {name:<18} SKIP (could not generate sample: {e})")
+                continue
+
+            outcome = ingest.process(source, ingest._cache_path(source))
+            result = ingest.optimized_path(source)
+            passed = outcome == expected
+            if result is not None:
+                video, audio = probe_codecs(result)
+                passed = passed and video == 'h264' and audio in BROWSER_SAFE_AUDIO and is_faststart(result)
+            ok = ok and passed
+            print(f"  {name:<18} {outcome:<10} {'PASS' if passed else 'FAIL'}")
+    print(f"[Ingest] Self-test {'passed' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-test':
+        sys.exit(0 if self_test() else 1)
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+
+    content_dir = Path(sys.argv[1])
+    ingest = MediaIngest(Path(__file__).parent / "data" / "optimized")
+    ingest.cache_dir.mkdir(parents=True, exist_ok=True)
+    for source in sorted(content_dir.rglob('*')):
+        if source.is_file() and source.suffix.lower() in VIDEO_EXTENSIONS:
+            target = ingest._cache_path(source)
+            if target is not None and not target.exists():
+                ingest.process(source, target)
+    print(f"[Ingest] {ingest.status()}")
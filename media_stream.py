@@ -0,0 +1,161 @@
+"""
+Media streaming module - serves content files with full HTTP caching and byte-range support.
+Handles Range / If-Range / If-None-Match / If-Modified-Since, picks a read chunk size
+suited to the storage device and hands the file to the server's zero-copy path
+(wsgi.file_wrapper -> os.sendfile) when the WSGI server offers one.
+"""
+
+import os
+import time
+from flask import Response, request
+from werkzeug.http import http_date
+
+# Read sizes: USB sticks stall on many small reads, so read big blocks from them
+DEFAULT_CHUNK_SIZE = 256 * 1024
+REMOVABLE_CHUNK_SIZE = 1024 * 1024
+REMOVABLE_MOUNT_PREFIXES = ('/media/', '/mnt/', '/run/media/')
+
+# Optional override, e.g. SKILLPLAYER_STREAM_CHUNK_KB=512
+_env_chunk_kb = os.environ.get('SKILLPLAYER_STREAM_CHUNK_KB')
+CHUNK_SIZE_OVERRIDE = int(_env_chunk_kb) * 1024 if _env_chunk_kb and _env_chunk_kb.isdigit() else None
+
+# Set SKILLPLAYER_STREAM_SENDFILE=0 to always stream through Python
+USE_FILE_WRAPPER = os.environ.get('SKILLPLAYER_STREAM_SENDFILE', '1') != '0'
+
+
+def chunk_size_for(file_path, st=None):
+    """Pick a read size for a file based on where it lives."""
+    if CHUNK_SIZE_OVERRIDE:
+        return CHUNK_SIZE_OVERRIDE
+
+    path = os.path.abspath(str(file_path))
+    if path.startswith(REMOVABLE_MOUNT_PREFIXES):
+        return REMOVABLE_CHUNK_SIZE
+
+    block_size = getattr(st, 'st_blksize', 0) or 0
+    return max(DEFAULT_CHUNK_SIZE, block_size)
+
+
+def make_etag(st):
+    """Build an ETag from the file's mtime and size (no content hashing needed)."""
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _not_modified(etag, mtime):
+    """Evaluate If-None-Match / If-Modified-Since for a GET/HEAD request."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return int(mtime) <= request.if_modified_since.timestamp()
+    return False
+
+
+def _range_allowed(etag, mtime):
+    """Evaluate If-Range: only honour Range if the client's copy is still current."""
+    if_range = request.if_range
+    if not if_range or (if_range.etag is None and if_range.date is None):
+        return True
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    return int(mtime) == int(if_range.date.timestamp())
+
+
+def _advise_sequential(fd, offset, length):
+    """Ask the kernel to read ahead aggressively for this range (Linux only)."""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def _log_stream(filename, status, sent, length, started, first_byte):
+    """Log bytes served and time-to-first-byte for one request."""
+    total_ms = (time.perf_counter() - started) * 1000
+    ttfb_ms = (first_byte - started) * 1000 if first_byte else total_ms
+    print(f"[Stream] {status} {filename}: {sent}/{length} bytes, "
+          f"ttfb {ttfb_ms:.1f}ms, total {total_ms:.1f}ms")
+
+
+def _iter_range(f, start, length, chunk_size, stats):
+    """Yield a byte range from an open file in chunk_size pieces."""
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            if stats['first_byte'] is None:
+                stats['first_byte'] = time.perf_counter()
+            remaining -= len(data)
+            stats['sent'] += len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def stream_file(file_path, mimetype):
+    """
+    Build a response for a content file, honouring conditional and range headers.
+    Returns 200 (full), 206 (single range), 304 (not modified) or 416 (bad range).
+    """
+    started = time.perf_counter()
+    st = os.stat(file_path)
+    size = st.st_size
+    etag = make_etag(st)
+    filename = os.path.basename(str(file_path))
+
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"',
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control': 'no-cache'
+    }
+
+    if _not_modified(etag, st.st_mtime):
+        return Response(status=304, headers=headers)
+
+    # Work out which bytes to send
+    status = 200
+    start, length = 0, size
+    byte_range = request.range
+    if byte_range is not None and _range_allowed(etag, st.st_mtime):
+        if byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+            # Multi-range requests are answered with the whole file (allowed by RFC 9110)
+            pass
+        else:
+            span = byte_range.range_for_length(size)
+            if span is None:
+                headers['Content-Range'] = f"bytes */{size}"
+                return Response(status=416, headers=headers)
+            start, stop = span
+            length = stop - start
+            status = 206
+            headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+
+    headers['Content-Length'] = str(length)
+
+    if request.method == 'HEAD':
+        return Response(status=status, headers=headers, mimetype=mimetype)
+
+    chunk_size = chunk_size_for(file_path, st)
+    f = open(file_path, 'rb')
+    _advise_sequential(f.fileno(), start, length)
+
+    file_wrapper = request.environ.get('wsgi.file_wrapper') if USE_FILE_WRAPPER else None
+    if file_wrapper is not None:
+        # Zero-copy path: servers that support it (e.g. gunicorn) use os.sendfile
+        # from the current offset for Content-Length bytes. The server owns the
+        # transfer from here, so we log when the response is handed over.
+        f.seek(start)
+        _log_stream(filename, status, length, length, started, time.perf_counter())
+        return Response(file_wrapper(f, chunk_size), status=status, headers=headers,
+                        mimetype=mimetype, direct_passthrough=True)
+
+    stats = {'sent': 0, 'first_byte': None}
+    response = Response(_iter_range(f, start, length, chunk_size, stats), status=status,
+                        headers=headers, mimetype=mimetype)
+    response.call_on_close(
+        lambda: _log_stream(filename, status, stats['sent'], length, started, stats['first_byte']))
+    return response
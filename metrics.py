@@ -0,0 +1,212 @@
+"""
+Metrics - request counts, latency histograms and disk-I/O timings.
+Every Flask route and Socket.IO handler is counted and timed; the modules that
+touch the disk (views, answers, questions, scores) time their reads and writes.
+Everything is exposed in the Prometheus text format at /metrics for a local
+scraper. Recording a sample is a couple of dict updates under one lock, and
+labels are route templates (not URLs) so the number of series stays small.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram upper bounds in seconds (an implicit +Inf bucket follows)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram (per-bucket counts; made cumulative when rendered)."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+def _labels(**labels):
+    """Prometheus label set: {a="x",b="y"} with values escaped."""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Metrics:
+    """
+    In-process metrics registry.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.requests = {}        # (route, method, status) -> count
+        self.request_time = {}    # (route, method) -> Histogram
+        self.response_bytes = {}  # (route, method) -> bytes sent
+        self.socket_events = {}   # (event, outcome) -> count
+        self.socket_time = {}     # event -> Histogram
+        self.io_time = {}         # operation -> Histogram
+        self.io_errors = {}       # operation -> count
+
+    def observe_request(self, route, method, status, seconds, size):
+        """Record one finished HTTP request."""
+        with self.lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            key = (route, method)
+            histogram = self.request_time.get(key)
+            if histogram is None:
+                histogram = self.request_time[key] = Histogram()
+            histogram.observe(seconds)
+            self.response_bytes[key] = self.response_bytes.get(key, 0) + (size or 0)
+
+    def observe_socket(self, event, seconds, ok=True):
+        """Record one Socket.IO handler call."""
+        with self.lock:
+            key = (event, 'ok' if ok else 'error')
+            self.socket_events[key] = self.socket_events.get(key, 0) + 1
+            histogram = self.socket_time.get(event)
+            if histogram is None:
+                histogram = self.socket_time[event] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_io(self, operation, seconds, ok=True):
+        """Record one disk read/write."""
+        with self.lock:
+            histogram = self.io_time.get(operation)
+            if histogram is None:
+                histogram = self.io_time[operation] = Histogram()
+            histogram.observe(seconds)
+            if not ok:
+                self.io_errors[operation] = self.io_errors.get(operation, 0) + 1
+
+    @contextmanager
+    def io_timer(self, operation):
+        """Time a block of disk I/O: `with metrics.io_timer('save_views'): ...`"""
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.observe_io(operation, time.perf_counter() - start, ok)
+
+    def track_socket(self, event):
+        """Decorator for Socket.IO handlers (apply below @socketio.on(event))."""
+        def decorator(handler):
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                ok = False
+                try:
+                    result = handler(*args, **kwargs)
+                    ok = True
+                    return result
+                finally:
+                    self.observe_socket(event, time.perf_counter() - start, ok)
+            wrapper.__name__ = handler.__name__
+            wrapper.__doc__ = handler.__doc__
+            return wrapper
+        return decorator
+
+    def init_app(self, app):
+        """Time every Flask request. Call right after creating the app, before other hooks."""
+        from flask import g, request
+
+        @app.before_request
+        def start_request_timer():
+            g.metrics_start = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+                self.observe_request(route, request.method, response.status_code,
+                                     time.perf_counter() - start, response.content_length)
+            return response
+
+        @app.teardown_request
+        def record_failed_request(error=None):
+            # Unhandled exceptions skip after_request
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+                self.observe_request(route, request.method, 500, time.perf_counter() - start, 0)
+
+    def _render_histogram(self, lines, name, histograms, label_names):
+        for key, histogram in sorted(histograms.items()):
+            values = dict(zip(label_names, key if isinstance(key, tuple) else (key,)))
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(**values, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**values)} {histogram.total:.6f}")
+            lines.append(f"{name}_count{_labels(**values)} {histogram.count}")
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP skillplayer_uptime_seconds Seconds since the server started.",
+            "# TYPE skillplayer_uptime_seconds gauge",
+            f"skillplayer_uptime_seconds {time.time() - self.started:.1f}",
+        ]
+        with self.lock:
+            lines += [
+                "# HELP skillplayer_http_requests_total HTTP requests by route, method and status.",
+                "# TYPE skillplayer_http_requests_total counter",
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f"skillplayer_http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+            lines += [
+                "# HELP skillplayer_http_request_duration_seconds Time to produce the response (streamed bodies excluded).",
+                "# TYPE skillplayer_http_request_duration_seconds histogram",
+            ]
+            self._render_histogram(lines, 'skillplayer_http_request_duration_seconds', self.request_time, ('route', 'method'))
+
+            lines += [
+                "# HELP skillplayer_http_response_bytes_total Response body bytes by route (Content-Length).",
+                "# TYPE skillplayer_http_response_bytes_total counter",
+            ]
+            for (route, method), size in sorted(self.response_bytes.items()):
+                lines.append(f"skillplayer_http_response_bytes_total{_labels(route=route, method=method)} {size}")
+
+            lines += [
+                "# HELP skillplayer_socketio_events_total Socket.IO handler calls by event and outcome.",
+                "# TYPE skillplayer_socketio_events_total counter",
+            ]
+            for (event, outcome), count in sorted(self.socket_events.items()):
+                lines.append(f"skillplayer_socketio_events_total{_labels(event=event, outcome=outcome)} {count}")
+
+            lines += [
+                "# HELP skillplayer_socketio_handler_duration_seconds Socket.IO handler run time.",
+                "# TYPE skillplayer_socketio_handler_duration_seconds histogram",
+            ]
+            self._render_histogram(lines, 'skillplayer_socketio_handler_duration_seconds', self.socket_time, ('event',))
+
+            lines += [
+                "# HELP skillplayer_disk_io_duration_seconds Time spent reading/writing data files, by operation.",
+                "# TYPE skillplayer_disk_io_duration_seconds histogram",
+            ]
+            self._render_histogram(lines, 'skillplayer_disk_io_duration_seconds', self.io_time, ('operation',))
+
+            lines += [
+                "# HELP skillplayer_disk_io_errors_total Failed data file reads/writes, by operation.",
+                "# TYPE skillplayer_disk_io_errors_total counter",
+            ]
+            for operation, count in sorted(self.io_errors.items()):
+                lines.append(f"skillplayer_disk_io_errors_total{_labels(operation=operation)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
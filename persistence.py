@@ -0,0 +1,293 @@
+"""
+Persistence - crash-safe, thread-safe writes for the JSON data files.
+
+    writes   - data goes to a .tmp sibling, is fsynced, then renamed over the target
+               (and the directory fsynced), so a power cut leaves either the old
+               or the new file, never a truncated one.
+    locks    - one lock per file serializes writers in this process.
+    skipping - a write whose bytes match what this process last wrote (and the
+               file was not changed since) is skipped.
+    backups  - files written with backups=N keep up to N older versions as
+               name.bak1 (newest) .. name.bakN, at most one per BACKUP_INTERVAL.
+               They are hard links to the replaced file, so a backup costs a
+               rename, not a copy. read_json falls back to them when the file is
+               unreadable instead of returning an empty default.
+    write-behind - `writer` coalesces scheduled writes: scheduling a file again
+               before it was written costs nothing, and the snapshot is taken at
+               write time, so a burst of changes becomes one write.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from metrics import metrics
+
+# Optional overrides, e.g. SKILLPLAYER_BACKUP_VERSIONS=0 to keep no backups
+BACKUP_VERSIONS = int(os.environ.get('SKILLPLAYER_BACKUP_VERSIONS', 3))
+BACKUP_INTERVAL = float(os.environ.get('SKILLPLAYER_BACKUP_INTERVAL', 3600))
+RETRY_DELAY = 5.0            # Seconds before a failed background write is retried
+
+_locks = {}                  # path -> RLock
+_locks_guard = threading.Lock()
+_written = {}                # path -> (sha1 of bytes, (mtime_ns, size)) of our last write
+_unreadable = set()          # paths read_json could not parse (never backed up)
+
+
+def file_lock(path):
+    """The lock shared by everything in this process that writes path."""
+    path = Path(path).resolve()
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = threading.RLock()
+        return lock
+
+
+def _signature(path):
+    try:
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def _fsync_dir(directory):
+    """Make a rename in directory durable (not supported on every platform)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def backup_paths(path, versions=BACKUP_VERSIONS):
+    """Backup files of path, newest first."""
+    path = Path(path)
+    return [path.with_name(f"{path.name}.bak{i}") for i in range(1, versions + 1)]
+
+
+def _rotate_backups(path, versions):
+    """Keep the current version of path as .bak1 (if the newest backup is old enough)."""
+    if versions <= 0 or path in _unreadable or not path.exists():
+        return
+    backups = backup_paths(path, versions)
+    try:
+        if time.time() - backups[0].stat().st_mtime < BACKUP_INTERVAL:
+            return
+    except OSError:
+        pass
+
+    for newer, older in zip(reversed(backups[:-1]), reversed(backups[1:])):
+        if newer.exists():
+            os.replace(newer, older)
+    try:
+        os.link(path, backups[0])
+    except OSError:
+        # No hard links (e.g. FAT): fall back to a copy
+        shutil.copy2(path, backups[0])
+
+
+def write_bytes(path, data, backups=0, operation=None):
+    """
+    Atomically replace path with data. Returns False if the write was skipped
+    because the file already holds exactly this data. Raises OSError.
+    """
+    path = Path(path)
+    digest = hashlib.sha1(data).digest()
+    with file_lock(path):
+        key = path.resolve()
+        if _written.get(key) == (digest, _signature(path)):
+            return False
+
+        tmp_path = path.with_name(path.name + '.tmp')
+        with metrics.io_timer(operation) if operation else nullcontext():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                _rotate_backups(key, backups)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            _fsync_dir(path.parent)
+
+        _unreadable.discard(key)
+        _written[key] = (digest, _signature(path))
+        return True
+
+
+def write_json(path, data, backups=0, operation=None, indent=2, separators=None):
+    """Atomically replace path with data as UTF-8 JSON (see write_bytes)."""
+    text = json.dumps(data, indent=indent, separators=separators, ensure_ascii=False)
+    return write_bytes(path, text.encode('utf-8'), backups, operation)
+
+
+def append_text(path, text, operation=None):
+    """Durably append text (whole lines) to path."""
+    path = Path(path)
+    with file_lock(path):
+        with metrics.io_timer(operation) if operation else nullcontext():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def read_json(path, default=None, operation=None):
+    """
+    Load a JSON file. A missing file gives default; an unreadable one (torn or
+    empty after a crash, or a bad hand edit) gives its newest readable backup.
+    """
+    path = Path(path)
+    if not path.exists():
+        return default
+
+    try:
+        with metrics.io_timer(operation) if operation else nullcontext():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except (ValueError, OSError) as e:
+        print(f"[Persistence] {path.name} is unreadable ({e}), trying backups")
+
+    # Keep the damaged file out of the backups until it is rewritten
+    _unreadable.add(path.resolve())
+    for backup in backup_paths(path):
+        try:
+            with open(backup, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (ValueError, OSError):
+            continue
+        print(f"[Persistence] Recovered {path.name} from {backup.name}")
+        return data
+    return default
+
+
+class WriteBehind:
+    """
+    Background writer for JSON files, shared by the in-memory stores.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}    # path -> [due (monotonic), snapshot, write_json options]
+        self.wake = threading.Event()
+        self.thread = None
+        atexit.register(self.flush)
+
+    def schedule(self, path, snapshot, delay=0.0, **options):
+        """
+        Write snapshot() to path within `delay` seconds. snapshot is called at
+        write time (so it returns the latest state) and may return None to skip.
+        Scheduling a path that is already pending only moves its write earlier.
+        """
+        path = Path(path)
+        due = time.monotonic() + delay
+        with self.lock:
+            entry = self.pending.get(path)
+            if entry is None:
+                self.pending[path] = [due, snapshot, options]
+            elif due < entry[0]:
+                entry[0] = due
+            else:
+                return
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._write_loop, name='write-behind', daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def _write(self, path):
+        # Holding the file lock makes flush() wait for a write already in progress
+        with file_lock(path):
+            with self.lock:
+                entry = self.pending.pop(path, None)
+            if entry is None:
+                return
+            _, snapshot, options = entry
+            try:
+                data = snapshot()
+                if data is None:
+                    return
+                write_json(path, data, **options)
+            except OSError as e:
+                print(f"[Persistence] Error writing {path.name}: {e}")
+                self.schedule(path, snapshot, RETRY_DELAY, **options)
+            except Exception as e:
+                # A bad snapshot (e.g. a value json can't encode) loses this write,
+                # not the writer thread: the next schedule() of the file tries again
+                print(f"[Persistence] Could not write {path.name}: {e!r}")
+
+    def _write_loop(self):
+        while True:
+            now = time.monotonic()
+            with self.lock:
+                due = [path for path, entry in self.pending.items() if entry[0] <= now]
+                next_due = min((entry[0] for entry in self.pending.values()), default=None)
+            for path in due:
+                self._write(path)
+            if not due:
+                self.wake.wait(None if next_due is None else next_due - now)
+                self.wake.clear()
+
+    def flush(self, path=None):
+        """Write pending files now (all of them, or just path)."""
+        with self.lock:
+            paths = list(self.pending) if path is None else [Path(path)]
+        for pending_path in paths:
+            self._write(pending_path)
+
+
+writer = WriteBehind()
+
+
+def self_test():
+    """Check that a snapshot that raises doesn't stop later writes."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bad, good = Path(tmp) / 'bad.json', Path(tmp) / 'good.json'
+        test_writer = WriteBehind()
+        test_writer.schedule(bad, lambda: {'value': object()})   # TypeError in json.dumps
+        test_writer.schedule(Path(tmp) / 'raises.json', lambda: 1 / 0)
+        deadline = time.monotonic() + 5
+        while test_writer.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        test_writer.schedule(good, lambda: {'value': 1})
+        while not good.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        checks = [
+            ('bad snapshot skipped', not bad.exists()),
+            ('writer thread alive', test_writer.thread.is_alive()),
+            ('later write landed', read_json(good) == {'value': 1}),
+        ]
+    for name, passed in checks:
+        print(f"  {name:<22} {'PASS' if passed else 'FAIL'}")
+    ok = all(passed for _, passed in checks)
+    print(f"[Persistence] Self-test {'passed' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-test':
+        sys.exit(0 if self_test() else 1)
+    print(__doc__)
@@ -0,0 +1,185 @@
+"""
+Profiler - opt-in profiling of the running server from the admin console.
+Two modes, both off unless SKILLPLAYER_PROFILING=1 (nothing is installed otherwise):
+
+    sampling - for a few seconds, a background thread snapshots the stack of every
+               thread (request handlers, gamepad/input loops, background writers)
+               and returns the counts as collapsed stacks ("a;b;c 42" per line),
+               ready for flamegraph.pl or speedscope.
+    request  - cProfile the next call(s) of one named route. The route's view
+               function is only swapped for a profiling wrapper while armed, so
+               unprofiled requests run exactly as before. One call is profiled
+               at a time; calls overlapping it run unprofiled.
+
+Under gevent/eventlet only OS threads are sampled, not individual greenlets.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILING_ENABLED = os.environ.get('SKILLPLAYER_PROFILING', '0') == '1'
+
+DEFAULT_SECONDS = 10
+MAX_SECONDS = 60
+DEFAULT_INTERVAL = 0.005     # 200 samples per second
+MIN_INTERVAL = 0.001
+MAX_STACK_DEPTH = 200
+STATS_LINES = 40             # Functions listed in a request profile report
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Stack sampler for all threads of this process (one profile at a time).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def run(self, seconds=DEFAULT_SECONDS, interval=DEFAULT_INTERVAL):
+        """
+        Sample for `seconds` and return (collapsed stack text, sample count),
+        or None if another profile is already running.
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = min(max(seconds, 0.1), MAX_SECONDS)
+            interval = max(interval, MIN_INTERVAL)
+            stacks = Counter()
+            caller = threading.get_ident()
+            samples = 0
+
+            def sample_loop():
+                nonlocal samples
+                own = threading.get_ident()
+                deadline = time.monotonic() + seconds
+                while time.monotonic() < deadline:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    for ident, frame in sys._current_frames().items():
+                        if ident in (own, caller):
+                            continue
+                        labels = []
+                        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                            labels.append(_frame_label(frame.f_code))
+                            frame = frame.f_back
+                        labels.append(names.get(ident, f"thread-{ident}"))
+                        stacks[';'.join(reversed(labels))] += 1
+                    samples += 1
+                    time.sleep(interval)
+
+            sampler = threading.Thread(target=sample_loop, name='profiler', daemon=True)
+            sampler.start()
+            sampler.join()
+
+            lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+            return '\n'.join(lines) + '\n', samples
+        finally:
+            self.lock.release()
+
+
+class RequestProfiler:
+    """
+    Arms cProfile for the next call(s) of a Flask view and keeps the last report per endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.armed = {}      # endpoint -> original view function
+        self.remaining = {}  # endpoint -> calls still to profile
+        self.seconds = {}    # endpoint -> time spent in the calls profiled so far
+        self.reports = {}    # endpoint -> {'stats': text, 'calls', 'seconds', 'finished'}
+
+    def resolve(self, name):
+        """Endpoint name for a route given by endpoint name ('api_skills') or URL rule ('/api/skills/<category>')."""
+        if name in self.app.view_functions:
+            return name
+        for rule in self.app.url_map.iter_rules():
+            if rule.rule == name:
+                return rule.endpoint
+        return None
+
+    def arm(self, endpoint, calls=1):
+        """Profile the next `calls` calls of endpoint (merged into one report)."""
+        with self.lock:
+            self.remaining[endpoint] = max(1, calls)
+            if endpoint in self.armed:
+                return
+            original = self.app.view_functions[endpoint]
+            self.armed[endpoint] = original
+            self.seconds[endpoint] = 0.0
+            self.reports.pop(endpoint, None)
+            profile = cProfile.Profile()
+            # A Profile can only be enabled once at a time: overlapping calls run unprofiled
+            busy = threading.Lock()
+
+            def profiled_view(*args, **kwargs):
+                if not busy.acquire(blocking=False):
+                    return original(*args, **kwargs)
+                try:
+                    if self.app.view_functions.get(endpoint) is not profiled_view:
+                        # Finished or disarmed after this call was routed here
+                        return original(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return profile.runcall(original, *args, **kwargs)
+                    finally:
+                        self._called(endpoint, profile, time.perf_counter() - start)
+                finally:
+                    busy.release()
+
+            profiled_view.__name__ = original.__name__
+            self.app.view_functions[endpoint] = profiled_view
+
+    def _called(self, endpoint, profile, seconds):
+        with self.lock:
+            if endpoint not in self.armed:
+                return
+            self.seconds[endpoint] += seconds
+            self.remaining[endpoint] -= 1
+            if self.remaining[endpoint] > 0:
+                return
+            self.app.view_functions[endpoint] = self.armed.pop(endpoint)
+            del self.remaining[endpoint]
+            seconds = self.seconds.pop(endpoint)
+
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        calls = stats.total_calls
+        stats.sort_stats('cumulative').print_stats(STATS_LINES)
+        with self.lock:
+            self.reports[endpoint] = {
+                'stats': out.getvalue(),
+                'calls': calls,
+                'seconds': round(seconds, 3),   # Time inside the profiled calls
+                'finished': time.strftime('%H:%M:%S')
+            }
+
+    def disarm(self, endpoint):
+        """Cancel a pending profile."""
+        with self.lock:
+            original = self.armed.pop(endpoint, None)
+            self.remaining.pop(endpoint, None)
+            self.seconds.pop(endpoint, None)
+            if original is not None:
+                self.app.view_functions[endpoint] = original
+
+    def status(self, endpoint):
+        """'armed', 'done' or 'idle', with the report once done."""
+        with self.lock:
+            if endpoint in self.armed:
+                return {"state": "armed", "remaining": self.remaining[endpoint]}
+            report = self.reports.get(endpoint)
+        if report is None:
+            return {"state": "idle"}
+        return {"state": "done", **report}
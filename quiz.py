@@ -2,87 +2,509 @@
 Quiz logic module - handles question loading, random selection, and answer shuffling.
 """
 
+import atexit
 import hashlib
 import json
 import random
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
 
+from metrics import metrics
+from persistence import BACKUP_VERSIONS, append_text, file_lock, read_json, write_bytes, write_json
+
+# How often (seconds) the question bank re-checks questions.json for edits
+RELOAD_CHECK_INTERVAL = 2.0
+
+# Journaled single-question edits before questions.json is rewritten
+COMPACT_AFTER_EDITS = 100
+
+# Journaled history additions before question_history.json is rewritten
+COMPACT_HISTORY_AFTER = 500
+
 
 def get_question_hash(question_text):
     """Generate an 8-character MD5 hash of the question text."""
     return hashlib.md5(question_text.encode('utf-8')).hexdigest()[:8]
 
 
-def update_question_history(questions, history_file):
+def _history_paths(history_file):
+    """Journal of newly seen questions and the fingerprint cache that sit next to the history file."""
+    history_file = Path(history_file)
+    journal_file = history_file.with_suffix('.jsonl')
+    fingerprint_file = history_file.with_name('question_fingerprints.json')
+    return journal_file, fingerprint_file
+
+
+def load_question_history(history_file):
+    """Load the full question history (base file plus journaled additions)."""
+    history_file = Path(history_file)
+    journal_file, _ = _history_paths(history_file)
+
+    history = read_json(history_file, {})
+    if not isinstance(history, dict):
+        history = {}
+
+    if journal_file.exists():
+        try:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from a power cut
+                    history.setdefault(entry.pop('id'), entry)
+        except IOError:
+            pass
+    return history
+
+
+def _load_fingerprints(fingerprint_file):
+    """Load the cached text -> ID map and the set of IDs already in the history."""
+    try:
+        with open(fingerprint_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache.get('source'), cache.get('texts', {}), set(cache.get('history_ids', []))
+    except (json.JSONDecodeError, IOError, AttributeError):
+        return None, None, None
+
+
+def _save_fingerprints(fingerprint_file, source_signature, texts, history_ids):
+    """Write the fingerprint cache (no backups, it is only a cache)."""
+    try:
+        write_json(fingerprint_file, {
+            'source': list(source_signature) if source_signature else None,
+            'texts': texts,
+            'history_ids': sorted(history_ids)
+        }, indent=None, separators=(',', ':'))
+    except (IOError, OSError):
+        print(f"Error saving question fingerprints to {fingerprint_file}")
+
+
+def _compact_history(history_file):
+    """Fold the history journal back into the base history file."""
+    journal_file, _ = _history_paths(history_file)
+    history = load_question_history(history_file)
+    try:
+        write_json(history_file, history, backups=BACKUP_VERSIONS)
+        journal_file.unlink()
+    except (IOError, OSError):
+        print(f"Error compacting question history {history_file}")
+
+
+def update_question_history(questions, history_file, source_signature=None):
     """
-    Update the history file with any new questions.
+    Update the history file with any new questions and inject their IDs.
+    source_signature is the (mtime_ns, size) of the questions file; when it matches
+    the fingerprint cache nothing is hashed and the history is not touched. Otherwise
+    only question texts the cache has never seen are hashed, and new history entries
+    are appended to a journal instead of rewriting question_history.json.
     Returns a dictionary mapping question text to ID.
     """
-    history = {}
-    if history_file.exists():
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        except (json.JSONDecodeError, IOError):
-            history = {}
-    
-    updated = False
-    
-    # Process each question
+    history_file = Path(history_file)
+    journal_file, fingerprint_file = _history_paths(history_file)
+
+    cached_source, texts, history_ids = _load_fingerprints(fingerprint_file)
+    if texts is None:
+        # First run (or lost cache): seed it from the existing history
+        texts = {}
+        history_ids = set(load_question_history(history_file).keys())
+        cached_source = None
+
+    source_unchanged = (source_signature is not None and
+                        cached_source == list(source_signature))
+
+    text_to_id = {}
+    new_entries = []
     for q in questions:
         q_text = q.get('question', '')
-        q_hash = get_question_hash(q_text)
-        
+        q_hash = texts.get(q_text)
+        if q_hash is None:
+            q_hash = get_question_hash(q_text)
+            texts[q_text] = q_hash
+
         # If hash doesn't exist in history, add it
-        if q_hash not in history:
-            history[q_hash] = {
+        if q_hash not in history_ids:
+            history_ids.add(q_hash)
+            new_entries.append({
+                'id': q_hash,
                 'question': q_text,
                 'answers': q.get('answers', []),
                 'correct': q.get('correct', ''),
                 'first_seen': datetime.now().isoformat(),
                 'tags': q.get('tags', [])
-            }
-            updated = True
-            
+            })
+
         # Inject the ID into the question object for this session
         q['id'] = q_hash
+        text_to_id[q_text] = q_hash
 
-    # Save tracking file if updated
-    if updated:
+    if new_entries:
         try:
-            # Ensure directory exists
-            history_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2)
+            append_text(journal_file, ''.join(json.dumps(entry) + '\n' for entry in new_entries))
         except IOError:
-            print(f"Error saving question history to {history_file}")
-            
-    return history
+            print(f"Error saving question history to {journal_file}")
 
+        try:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                journal_lines = sum(1 for _ in f)
+        except IOError:
+            journal_lines = 0
+        if journal_lines >= COMPACT_HISTORY_AFTER:
+            _compact_history(history_file)
 
-def load_questions(filepath: str = None) -> list:
-    """Load questions from JSON file and track them."""
-    if filepath is None:
-        filepath = Path(__file__).parent / "questions.json"
-    
-    # Define history file path
-    # Handle frozen state if necessary, but typically relative to app root
-    base_dir = filepath.parent
-    history_file = base_dir / "data" / "question_history.json"
-    
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            questions = json.load(f)
-            
-        # Update history and inject IDs
-        update_question_history(questions, history_file)
-        
-        return questions
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"Error loading questions: {e}")
-        return []
+    if new_entries or not source_unchanged:
+        # Drop texts that are no longer in the bank so the cache stays bounded
+        history_file.parent.mkdir(parents=True, exist_ok=True)
+        _save_fingerprints(fingerprint_file, source_signature, text_to_id, history_ids)
+
+    return text_to_id
+
+
+class EditJournal:
+    """
+    JSON-Lines file of single-question edits (one {'id', 'record'|'deleted'} per line).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def read(self, after=None):
+        """
+        Edits journaled after position `after` (a byte offset; None reads them all),
+        oldest first, and the position to continue from. (The file journal has a single
+        writing process, so unlike a shared store it never returns None for the edits.)
+        """
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return [], 0
+        start = after or 0
+        if start > size:
+            start = 0  # Cleared since - read it all again
+        if start == size:
+            return [], size
+
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        # A torn last line (power cut mid-append) is left for the next read
+        end = data.rfind(b'\n') + 1
+        edits = []
+        for line in data[:end].splitlines():
+            try:
+                edits.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return edits, start + end
+
+    def append(self, edit):
+        """Durably append one edit."""
+        append_text(self.path, json.dumps(edit, ensure_ascii=False) + '\n', operation='save_question_edit')
+
+    def clear(self, upto=None):
+        """
+        Forget the edits before position `upto` (all if None), after they were folded
+        into questions.json. Returns the position that `upto` has now.
+        """
+        with file_lock(self.path):
+            try:
+                if upto is not None and self.path.stat().st_size > upto:
+                    with open(self.path, 'rb') as f:
+                        f.seek(upto)
+                        rest = f.read()
+                    write_bytes(self.path, rest)
+                else:
+                    self.path.unlink()
+            except FileNotFoundError:
+                pass
+        return 0
+
+    def exclusive(self):
+        """Lock held while the journal is folded into questions.json."""
+        return file_lock(self.path)
+
+
+class QuestionBank:
+    """
+    Parsed, indexed copy of questions.json shared by quiz, calibration and review modes.
+    The file is only re-read when its mtime or size changes.
+
+    Single-question edits (calibration level, flags, deletes) are applied in place
+    and appended to a small edits journal instead of rewriting questions.json;
+    the journal is folded back into questions.json once it grows past
+    COMPACT_AFTER_EDITS lines (or on shutdown). The journal is a file by default;
+    any object with read/append/clear/exclusive (see EditJournal) can be passed as
+    edit_store. Edits journaled by other processes sharing the store (SQLite) are
+    picked up on the regular reload check, and compaction only removes the edits
+    it folded in.
+    """
+
+    def __init__(self, questions_file, history_file, edits_file=None, edit_store=None):
+        self.questions_file = Path(questions_file)
+        self.history_file = Path(history_file)
+        self.edits = edit_store or (EditJournal(edits_file) if edits_file else None)
+        self.lock = threading.RLock()
+
+        self.signature = None  # (mtime_ns, size) of the loaded file
+        self.last_check = 0.0
+        self.questions = []
+        self.by_id = {}
+        self.by_level = {}   # level -> {id: question}
+        self.by_flag = {}    # flag -> {id: question}
+        self.index_keys = {}  # id -> (level, flags) the question is indexed under
+        self.pending_edits = 0
+        self.edit_position = None  # Where the next journal read continues
+
+        if self.edits is not None:
+            atexit.register(self.compact)
+
+    def _file_signature(self):
+        try:
+            st = self.questions_file.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        """Reload the file if it changed since the last load (checked at most every RELOAD_CHECK_INTERVAL)."""
+        now = time.monotonic()
+        if self.signature is not None and now - self.last_check < RELOAD_CHECK_INTERVAL:
+            return
+        self.last_check = now
+
+        signature = self._file_signature()
+        if signature == self.signature and signature is not None:
+            self._apply_edits()
+            return
+        self._load(signature)
+
+    def _load(self, signature):
+        """Load questions.json and replay the whole edits journal on top."""
+        if self.edits is not None:
+            # No other process may fold edits between reading the file and the journal
+            with self.edits.exclusive():
+                return self._read_questions(self._file_signature())
+        return self._read_questions(signature)
+
+    def _read_questions(self, signature):
+        questions = []
+        if signature is not None:
+            try:
+                with metrics.io_timer('load_questions'):
+                    # An unreadable file falls back to its newest backup rather than an empty bank
+                    questions = read_json(self.questions_file, [])
+                    if not isinstance(questions, list):
+                        questions = []
+                    # Update history and inject IDs
+                    update_question_history(questions, self.history_file, signature)
+                print(f"[Questions] Loaded {len(questions)} questions")
+            except (IOError, OSError) as e:
+                print(f"Error loading questions: {e}")
+                questions = []
+
+        self.signature = signature
+        self._set_questions(questions)
+        self.pending_edits = 0
+        self.edit_position = None
+        self._apply_edits()
+
+    def _set_questions(self, questions):
+        """Replace the question list and rebuild the indexes."""
+        self.questions = questions
+        self.by_id, self.by_level, self.by_flag, self.index_keys = {}, {}, {}, {}
+        for q in self.questions:
+            if 'id' not in q:
+                q['id'] = get_question_hash(q.get('question', ''))
+            if q['id'] not in self.by_id:
+                self.by_id[q['id']] = q
+                self._index(q)
+
+    def _index(self, q):
+        """Add a question to the level and flag indexes."""
+        level = q.get('calibration_level', 0)
+        flags = tuple(flag for flag, count in q.get('flags', {}).items() if count > 0)
+        self.by_level.setdefault(level, {})[q['id']] = q
+        for flag in flags:
+            self.by_flag.setdefault(flag, {})[q['id']] = q
+        self.index_keys[q['id']] = (level, flags)
+
+    def _unindex(self, question_id):
+        """Remove a question from the level and flag indexes."""
+        keys = self.index_keys.pop(question_id, None)
+        if keys is None:
+            return
+        level, flags = keys
+        self.by_level.get(level, {}).pop(question_id, None)
+        for flag in flags:
+            self.by_flag.get(flag, {}).pop(question_id, None)
+
+    def _apply_edits(self):
+        """Replay journaled edits not applied yet (ours and other processes'), in journal order."""
+        if self.edits is None:
+            return
+
+        try:
+            edits, position = self.edits.read(self.edit_position)
+        except (IOError, OSError) as e:
+            print(f"Error reading question edits: {e}")
+            return
+        if edits is None:
+            # Another process folded edits we had not seen into questions.json
+            return self._load(self._file_signature())
+        self.edit_position = position
+
+        for edit in edits:
+            self.pending_edits += 1
+            question_id = edit.get('id')
+            if edit.get('deleted'):
+                self._remove(question_id)
+            elif question_id in self.by_id and isinstance(edit.get('record'), dict):
+                q = self.by_id[question_id]
+                q.clear()
+                q.update(edit['record'])
+                q['id'] = question_id
+                self._unindex(question_id)
+                self._index(q)
+
+    def _remove(self, question_id):
+        """Drop every copy of a question from memory."""
+        if self.by_id.pop(question_id, None) is None:
+            return False
+        self._unindex(question_id)
+        self.questions = [q for q in self.questions if q.get('id') != question_id]
+        return True
+
+    def _journal(self, edit):
+        """Append one edit to the journal, compacting into questions.json when it gets long."""
+        if self.edits is None:
+            return self._write_questions()
+
+        try:
+            self.edits.append(edit)
+        except (IOError, OSError) as e:
+            print(f"Error saving question edit: {e}")
+            return False
+
+        # Replays our own edit (a no-op) and any edits other processes made before it
+        self._apply_edits()
+        if self.pending_edits >= COMPACT_AFTER_EDITS:
+            self._compact()
+        return True
+
+    def _compact(self):
+        """Fold the whole journal, including other processes' edits, into questions.json."""
+        with self.edits.exclusive():
+            if self._file_signature() != self.signature:
+                # The file was replaced (or another process compacted): start from its copy
+                self._load(self._file_signature())
+            else:
+                self._apply_edits()
+            return self._write_questions()
+
+    def _write_questions(self):
+        """Rewrite questions.json from memory and drop the journaled edits it now contains."""
+        # IDs are derived from the text, so they are not stored in questions.json
+        data = [{k: v for k, v in q.items() if k != 'id'} for q in self.questions]
+        if self.edits is None:
+            return self._write_file(data)
+
+        # Edits journaled after edit_position stay, and are replayed on top of this file
+        with self.edits.exclusive():
+            if not self._write_file(data):
+                return False
+            try:
+                self.edit_position = self.edits.clear(self.edit_position)
+            except (IOError, OSError):
+                pass
+        self.pending_edits = 0
+        return True
+
+    def _write_file(self, data):
+        try:
+            write_json(self.questions_file, data, backups=BACKUP_VERSIONS, operation='save_all_questions')
+        except (IOError, OSError) as e:
+            print(f"Error saving questions: {e}")
+            return False
+        self.signature = self._file_signature()
+        self.last_check = time.monotonic()
+        return True
+
+    def all(self):
+        """All questions (shared objects - copy before reordering)."""
+        with self.lock:
+            self._refresh()
+            return self.questions
+
+    def get(self, question_id):
+        """Look up a question by its hash ID."""
+        with self.lock:
+            self._refresh()
+            return self.by_id.get(question_id)
+
+    def at_level(self, level):
+        """Questions currently at a calibration level."""
+        with self.lock:
+            self._refresh()
+            return list(self.by_level.get(level, {}).values())
+
+    def flagged(self, flag):
+        """Questions with a positive count for a flag (e.g. 'review')."""
+        with self.lock:
+            self._refresh()
+            return list(self.by_flag.get(flag, {}).values())
+
+    def level_counts(self):
+        """Number of questions at each calibration level (0-5)."""
+        with self.lock:
+            self._refresh()
+            counts = {i: 0 for i in range(6)}
+            for level, questions in self.by_level.items():
+                if level in counts:
+                    counts[level] += len(questions)
+                else:
+                    counts[0] += len(questions)  # Default to 0 if invalid
+            return counts
+
+    def update(self, question_id, mutate):
+        """
+        Change one question in place and persist just that record.
+        mutate(question) edits the dict directly. Returns False if the ID is unknown.
+        """
+        with self.lock:
+            self._refresh()
+            q = self.by_id.get(question_id)
+            if q is None:
+                return False
+
+            mutate(q)
+            self._unindex(question_id)
+            self._index(q)
+
+            record = {k: v for k, v in q.items() if k != 'id'}
+            return self._journal({'id': question_id, 'record': record})
+
+    def delete(self, question_id):
+        """Delete a question permanently. Returns False if the ID is unknown or saving failed."""
+        with self.lock:
+            self._refresh()
+            if not self._remove(question_id):
+                return False
+            return self._journal({'id': question_id, 'deleted': True})
+
+    def save(self, questions):
+        """Write a full question list back to the JSON file and keep the in-memory copy in sync."""
+        with self.lock:
+            self._set_questions(questions)
+            return self._write_questions()
+
+    def compact(self):
+        """Fold any journaled edits into questions.json."""
+        with self.lock:
+            self._apply_edits()
+            if self.pending_edits:
+                self._compact()
 
 
 def get_random_questions(questions: list, count: int) -> list:
@@ -0,0 +1,106 @@
+"""
+Quiz session module - per-client quiz, calibration and review state.
+Each browser (kiosk, admin tablet, ...) gets its own session id via a cookie, so
+several clients can play against one server without overwriting each other's
+games. Sessions have their own lock, are evicted after IDLE_TIMEOUT seconds and
+at most MAX_SESSIONS are kept (least recently used are dropped first).
+"""
+
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_COOKIE = 'sp_quiz_session'
+SESSION_HEADER = 'X-Quiz-Session'
+IDLE_TIMEOUT = 2 * 60 * 60  # 2 hours without a request
+MAX_SESSIONS = 32
+
+_VALID_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+class QuizSession:
+    """
+    State for one client. Hold session.lock while reading or changing it.
+    """
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+        # Active quiz game
+        self.game = {
+            "questions": [],
+            "current_index": 0,
+            "score": 0
+        }
+
+        # Dealt deck: persists across games so every question is seen before any repeats.
+        # Holds raw question dicts (answers not yet shuffled).
+        self.deck = []
+
+        self.calibration = {
+            "active": False,
+            "level": 0,
+            "questions": [],
+            "current_index": 0
+        }
+
+        self.review = {
+            "active": False,
+            "questions": [],
+            "current_index": 0
+        }
+
+
+class SessionManager:
+    """
+    Keeps QuizSession objects by id with idle eviction and an upper bound.
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, max_sessions=MAX_SESSIONS):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # id -> QuizSession, least recently used first
+
+    def get_or_create(self, session_id=None):
+        """
+        Return (session, created) for a client-supplied id.
+        Unknown but well-formed ids are re-created under the same id so a
+        client whose session was evicted keeps its cookie.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._evict_idle(now)
+
+            session = self.sessions.get(session_id) if session_id else None
+            if session is not None:
+                session.last_seen = now
+                self.sessions.move_to_end(session_id)
+                return session, False
+
+            if not session_id or not _VALID_SESSION_ID.match(session_id):
+                session_id = secrets.token_urlsafe(16)
+
+            session = QuizSession(session_id)
+            self.sessions[session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                evicted_id, _ = self.sessions.popitem(last=False)
+                print(f"[Sessions] Evicted least recently used session {evicted_id[:6]}...")
+            return session, True
+
+    def _evict_idle(self, now):
+        """Drop sessions that have not been used for idle_timeout seconds."""
+        while self.sessions:
+            oldest_id, oldest = next(iter(self.sessions.items()))
+            if now - oldest.last_seen < self.idle_timeout:
+                break
+            del self.sessions[oldest_id]
+
+    def count(self):
+        """Number of live sessions."""
+        with self.lock:
+            return len(self.sessions)
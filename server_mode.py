@@ -0,0 +1,65 @@
+"""
+Server mode - chooses how the HTTP API, media streaming and Socket.IO are served.
+Set SKILLPLAYER_SERVER_MODE to one of:
+
+    threading  - Werkzeug server with one thread per connection (default, no extra packages)
+    gevent     - gevent WSGI server (+ gevent-websocket for native websockets); recommended
+                 for many kiosk/admin clients
+    eventlet   - eventlet WSGI server (eventlet itself is in maintenance mode)
+
+gevent and eventlet must patch the standard library before anything else is
+imported, so importing this module applies the patch and app.py imports it
+first. If the chosen package isn't installed the server falls back to threading.
+"""
+
+import os
+
+SERVER_MODES = ('threading', 'gevent', 'eventlet')
+DEFAULT_SERVER_MODE = 'threading'
+
+
+def _requested_mode():
+    mode = os.environ.get('SKILLPLAYER_SERVER_MODE', DEFAULT_SERVER_MODE).strip().lower()
+    if mode not in SERVER_MODES:
+        print(f"[Server] Unknown SKILLPLAYER_SERVER_MODE '{mode}' - using {DEFAULT_SERVER_MODE}")
+        return DEFAULT_SERVER_MODE
+    return mode
+
+
+def _patch_for_server_mode():
+    """
+    Monkey-patch the standard library for the configured async mode.
+    Returns the mode actually in use ('threading' if the package is missing).
+    """
+    mode = _requested_mode()
+    try:
+        if mode == 'gevent':
+            from gevent import monkey
+            monkey.patch_all()
+        elif mode == 'eventlet':
+            import eventlet
+            eventlet.monkey_patch()
+    except ImportError:
+        print(f"[Server] {mode} is not installed - falling back to threading")
+        mode = 'threading'
+    return mode
+
+
+SERVER_MODE = _patch_for_server_mode()
+
+
+def run_server(app, socketio, host, port):
+    """Serve the app (and Socket.IO) with the configured server."""
+    if SERVER_MODE == 'threading':
+        # Werkzeug: fine for a single kiosk, limited for many clients
+        socketio.run(app, host=host, port=port, debug=False, allow_unsafe_werkzeug=True)
+        return
+
+    if SERVER_MODE == 'gevent':
+        try:
+            import geventwebsocket  # noqa: F401
+        except ImportError:
+            print("[Server] gevent-websocket not installed - Socket.IO will use long-polling")
+
+    # Flask-SocketIO picks the matching production server (gevent pywsgi / eventlet.wsgi)
+    socketio.run(app, host=host, port=port, debug=False)
@@ -0,0 +1,127 @@
+"""
+Startup tracking - per-phase timings and readiness for a staged launch.
+The server binds early; caches are warmed and devices scanned in the
+background, and the kiosk browser is only opened once the app reports ready
+(/api/system/ready) instead of after a fixed delay.
+
+Routes are not gated on readiness, so app.py splits the work in three:
+    prepare()  - before binding: state routes read or write as-is (asset
+                 hashes, the SQLite first-start import, the answer migration).
+    warm_up()  - until mark_ready(): state routes wait for or load on first
+                 use (content index, question bank).
+    after      - nice to have; routes work without it (gamepads, content
+                 cache, thumbnails, orphan sweeps, precompressed assets).
+"""
+
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+READY_POLL_INTERVAL = 0.1   # Seconds between readiness checks by the browser launcher
+READY_TIMEOUT = 120         # Open the browser anyway after this many seconds
+
+
+class StartupTracker:
+    """
+    Records how long each startup phase took and whether the app is ready.
+    Times are measured from when this module was first imported.
+    """
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.lock = threading.Lock()
+        self.phases = []      # [(name, start offset, duration)]
+        self.marks = {}       # name -> offset (one-off events such as 'listening')
+        self.ready_event = threading.Event()
+
+    def elapsed(self):
+        """Seconds since startup began."""
+        return time.monotonic() - self.t0
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block: `with startup.phase('content index'): ...`"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            with self.lock:
+                self.phases.append((name, start - self.t0, end - start))
+
+    def add_phase(self, name, start_offset, duration):
+        """Record a phase measured elsewhere."""
+        with self.lock:
+            self.phases.append((name, start_offset, duration))
+
+    def mark(self, name):
+        """Record a one-off event (only the first occurrence counts)."""
+        with self.lock:
+            self.marks.setdefault(name, self.elapsed())
+
+    def mark_ready(self):
+        """Everything is warmed up."""
+        self.mark('ready')
+        self.ready_event.set()
+
+    def is_ready(self):
+        return self.ready_event.is_set()
+
+    def status(self):
+        """Readiness and timings (milliseconds) for the readiness endpoint."""
+        with self.lock:
+            return {
+                "ready": self.ready_event.is_set(),
+                "uptime_ms": round(self.elapsed() * 1000),
+                "phases": [
+                    {"name": name, "start_ms": round(start * 1000), "duration_ms": round(duration * 1000, 1)}
+                    for name, start, duration in sorted(self.phases, key=lambda p: p[1])
+                ],
+                "marks": {name: round(offset * 1000) for name, offset in self.marks.items()}
+            }
+
+    def report(self):
+        """Human-readable per-phase timing table."""
+        with self.lock:
+            lines = ["[Startup] Phase timings:"]
+            for name, start, duration in sorted(self.phases, key=lambda p: p[1]):
+                lines.append(f"  {name:<20} {duration * 1000:8.0f} ms  (at +{start * 1000:.0f} ms)")
+            for name, offset in sorted(self.marks.items(), key=lambda item: item[1]):
+                lines.append(f"  {name + ' at':<20} {offset * 1000:8.0f} ms")
+        return '\n'.join(lines)
+
+
+startup = StartupTracker()
+
+
+def open_browser_when_ready(ready_url, open_browser):
+    """
+    Background thread: poll ready_url until the server answers 200, then call
+    open_browser() and print the timing report. Any HTTP answer (even 503 while
+    warming up) records the 'listening' mark.
+    """
+    def wait_and_open():
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(ready_url, timeout=2) as response:
+                    startup.mark('listening')
+                    if response.status == 200:
+                        break
+            except urllib.error.HTTPError:
+                startup.mark('listening')  # Bound, still warming up
+            except (urllib.error.URLError, OSError):
+                pass  # Not bound yet
+            time.sleep(READY_POLL_INTERVAL)
+        else:
+            print(f"[Startup] App not ready after {READY_TIMEOUT}s - opening browser anyway")
+
+        startup.mark('browser opened')
+        open_browser()
+        print(startup.report(), flush=True)
+
+    thread = threading.Thread(target=wait_and_open, daemon=True)
+    thread.start()
+    return thread
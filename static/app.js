@@ -1,3 +1,8 @@
+// Content-hashed static URLs from the server's asset manifest (cached as immutable)
+function assetUrl(name) {
+    return (window.ASSET_URLS && window.ASSET_URLS[name]) || `/static/${name}`;
+}
+
 // Stop Hold Logic
 let stopHoldTimeout = null;
 
@@ -166,7 +171,7 @@ function cancelStartHold() {
 }
 
 // Sound Effects
-const soundRight = new Audio('/static/Right.mp3');
+const soundRight = new Audio(assetUrl('Right.mp3'));
 // const soundWrong = new Audio('/static/Wrong.mp3'); // Removed unused
 
 // Initialize volume
@@ -369,8 +374,9 @@ async function loadSkills() {
         }
 
         skillsList.innerHTML = skills.map(skill => {
+            // Small cached thumbnail (falls back to the original logo server-side until it's generated)
             const iconHtml = skill.logo
-                ? `<img src="/video/${currentCategory}/${skill.id}/${skill.logo}" class="skill-logo" alt="${skill.name}">`
+                ? `<img src="${skill.thumb || `/video/${currentCategory}/${skill.id}/${skill.logo}`}" class="skill-logo" alt="${skill.name}">`
                 : '<span class="skill-icon">📚</span>';
             const newBadge = skill.is_new ? '<span class="new-badge">NEW</span>' : '';
 
@@ -444,10 +450,14 @@ async function selectSkill(skillId, skillName) {
                         <path d="M12 2C6.48 2 2 6.48 2 12s4.48 10 10 10 10-4.48 10-10S17.52 2 12 2zm-2 14.5v-9l6 4.5-6 4.5z"/>
                     </svg>`;
             const icon = file.type === 'pdf' ? pdfIcon : videoIcon;
+            // Poster frame over the icon; removed again if it isn't generated yet
+            const poster = file.poster
+                ? `<img src="${file.poster}" class="video-card-poster" alt="" loading="lazy" onerror="this.remove()">`
+                : '';
             const newBadge = file.is_new ? '<span class="new-badge">NEW</span>' : '';
             return `
                     <button class="video-card" onclick="playContent(event, '${file.category}', '${file.skill}', '${file.filename}', '${file.name.replace(/'/g, "\\'")}', '${file.type}')">
-                        <div class="video-card-icon">${icon}</div>
+                        <div class="video-card-icon">${icon}${poster}</div>
                         <div class="video-card-info">
                             <span class="video-name">${file.name} ${newBadge}</span>
                         </div>
@@ -1799,7 +1809,7 @@ document.addEventListener('click', function () {
 
 async function loadChangelog() {
     try {
-        const response = await fetch('/static/changelog.json?t=' + Date.now());
+        const response = await fetch(assetUrl('changelog.json'));
         const changelogData = await response.json();
 
         // Update version label
@@ -1880,6 +1890,38 @@ async function triggerUpdate() {
     }
 }
 
+// ===========================================
+// Server Profiling (only shown with SKILLPLAYER_PROFILING=1)
+// ===========================================
+async function runServerProfile() {
+    const btn = document.querySelector('.profile-action');
+    const label = btn.querySelector('span');
+    btn.classList.add('loading');
+    label.textContent = 'Profiling...';
+
+    try {
+        const response = await fetch('/api/system/profile/sample?seconds=10', { method: 'POST' });
+        if (!response.ok) {
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        // Save the collapsed stacks as a file (open with speedscope or flamegraph.pl)
+        const blob = await response.blob();
+        const match = /filename="([^"]+)"/.exec(response.headers.get('Content-Disposition') || '');
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(blob);
+        link.download = match ? match[1] : 'skillplayer.collapsed';
+        link.click();
+        URL.revokeObjectURL(link.href);
+        clientLog(`Profile saved: ${link.download} (${response.headers.get('X-Profile-Samples')} samples)`);
+    } catch (error) {
+        alert('Profiling failed: ' + error.message);
+    } finally {
+        btn.classList.remove('loading');
+        label.textContent = 'Profile Server (10s)';
+    }
+}
+
 // ===========================================
 // Reset Scores System
 // ===========================================
@@ -2047,7 +2089,10 @@ async function removeReviewFlag() {
         const response = await fetch('/api/quiz/review/remove_flag', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question_index: reviewCurrentIndex })
+            body: JSON.stringify({
+                question_index: reviewCurrentIndex,
+                question_id: reviewQuestions[reviewCurrentIndex].id
+            })
         });
 
         const data = await response.json();
@@ -2075,7 +2120,7 @@ async function deleteReviewQuestion() {
         const response = await fetch('/api/quiz/review/delete', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ question_index: reviewCurrentIndex })
+            body: JSON.stringify({ question_index: reviewCurrentIndex, question_id: q.id })
         });
 
         const data = await response.json();
@@ -2401,6 +2446,7 @@ async function markPreviousForReview() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 question_index: calibrationCurrentIndex - 1, // PREVIOUS
+                question_id: calibrationQuestions[calibrationCurrentIndex - 1]?.id,
                 flag_type: 'review'
             })
         });
@@ -2431,6 +2477,7 @@ async function submitCalibration(flagType) {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 question_index: calibrationCurrentIndex,
+                question_id: calibrationQuestions[calibrationCurrentIndex]?.id,
                 flag_type: flagType
             })
         });
@@ -2585,6 +2632,24 @@ socket.on('disconnect', () => {
     console.warn('[SocketIO] Disconnected');
 });
 
+// Latency tracing: acknowledge traced input events once the next frame has been drawn.
+// onAny runs before the event's own handler, so the frame includes its effect.
+const TRACED_INPUT_EVENTS = new Set([
+    'gamepad_button', 'gamepad_dpad', 'gamepad_start_down', 'gamepad_start_up', 'p1_click', 'p2_click'
+]);
+socket.onAny((eventName, data) => {
+    if (!TRACED_INPUT_EVENTS.has(eventName) || !data || data.seq === undefined) return;
+    const receivedAt = performance.now();
+    requestAnimationFrame(() => {
+        socket.emit('input_ack', {
+            event: eventName,
+            seq: data.seq,
+            t_capture: data.t_capture,
+            client_ms: performance.now() - receivedAt
+        });
+    });
+});
+
 // Server Log Handler for Admin Console
 socket.on('server_log', (data) => {
     const consoleEl = document.getElementById('admin-log-console');
@@ -2797,15 +2862,24 @@ socket.on('binding_status', (data) => {
     }
 });
 
-// Update cursor positions (60Hz interpolation target)
-socket.on('state_update', (state) => {
-    if (state.p1) {
-        if (p1Cursor) p1Cursor.style.transform = `translate(${state.p1.x}px, ${state.p1.y}px)`;
-        if (p1PosDisplay) p1PosDisplay.textContent = `${Math.round(state.p1.x)},${Math.round(state.p1.y)}`;
-    }
-    if (state.p2) {
-        if (p2Cursor) p2Cursor.style.transform = `translate(${state.p2.x}px, ${state.p2.y}px)`;
-        if (p2PosDisplay) p2PosDisplay.textContent = `${Math.round(state.p2.x)},${Math.round(state.p2.y)}`;
+// Latest cursor positions (used to simulate clicks)
+let lastP1Pos = { x: 0, y: 0 };
+let lastP2Pos = { x: 0, y: 0 };
+
+// Update cursor positions. Only players that moved are sent, as a flat array:
+// [player, x, y, player, x, y, ...]
+socket.on('cursor_update', (update) => {
+    for (let i = 0; i + 2 < update.length; i += 3) {
+        const pos = { x: update[i + 1], y: update[i + 2] };
+        if (update[i] === 1) {
+            lastP1Pos = pos;
+            if (p1Cursor) p1Cursor.style.transform = `translate(${pos.x}px, ${pos.y}px)`;
+            if (p1PosDisplay) p1PosDisplay.textContent = `${Math.round(pos.x)},${Math.round(pos.y)}`;
+        } else if (update[i] === 2) {
+            lastP2Pos = pos;
+            if (p2Cursor) p2Cursor.style.transform = `translate(${pos.x}px, ${pos.y}px)`;
+            if (p2PosDisplay) p2PosDisplay.textContent = `${Math.round(pos.x)},${Math.round(pos.y)}`;
+        }
     }
 });
 
@@ -2846,21 +2920,16 @@ function createRipple(x, y, player) {
     setTimeout(() => ripple.remove(), 500);
 }
 
-// We need the latest position to simulate click
-// The backend input_handler emits click event but not pos?
-// Wait, backend 'p1_click' implies click at CURRENT p1 position.
-// We can track the last known position from state_update.
-
-let lastP1Pos = { x: 0, y: 0 };
-let lastP2Pos = { x: 0, y: 0 };
-
-socket.on('state_update', (state) => {
-    if (state.p1) lastP1Pos = state.p1;
-    if (state.p2) lastP2Pos = state.p2;
+// Clicks carry the server's current position (newer than the last cursor_update);
+// fall back to the last known position for older servers.
+socket.on('p1_click', (data) => {
+    if (data && data.x !== undefined) lastP1Pos = { x: data.x, y: data.y };
+    handleVirtualClick('p1', lastP1Pos);
+});
+socket.on('p2_click', (data) => {
+    if (data && data.x !== undefined) lastP2Pos = { x: data.x, y: data.y };
+    handleVirtualClick('p2', lastP2Pos);
 });
-
-socket.on('p1_click', () => handleVirtualClick('p1', lastP1Pos));
-socket.on('p2_click', () => handleVirtualClick('p2', lastP2Pos));
 
 function cancelBinding() {
     showQuizStartScreen();
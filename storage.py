@@ -0,0 +1,469 @@
+"""
+Storage - optional SQLite backend for view counts, quiz answers, scores and question edits.
+The default storage is the JSON files (see view_counter, answer_log, leaderboard
+and quiz). With SKILLPLAYER_STORAGE=sqlite everything goes into one database,
+data/skillplayer.db, in WAL mode: every write is a short transaction touching
+only its own rows, readers never block writers, and several server processes
+sharing the file can't lose each other's increments.
+
+The classes here have the same methods as their JSON counterparts, so app.py
+only chooses which one to create. The first SQLite start imports the existing
+JSON data once, before the server binds (merged into any rows already there).
+
+Usage:
+    python storage.py import [base_dir] [--replace]   # JSON files -> database
+    python storage.py import [base_dir] --merge       # ... added to the rows already there
+    python storage.py export <out_dir> [base_dir]     # database -> JSON files (backup / switch back)
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from leaderboard import MAX_SCORES, EXPIRY_DAYS
+from metrics import metrics
+from persistence import BACKUP_VERSIONS, read_json, write_bytes, write_json
+
+STORAGE_BACKEND = os.environ.get('SKILLPLAYER_STORAGE', 'json').lower()   # 'json' or 'sqlite'
+DATABASE_NAME = "skillplayer.db"
+BUSY_TIMEOUT = 5.0   # Seconds to wait for another writer's lock
+
+QUESTION_EDITS_TABLE = """
+CREATE TABLE IF NOT EXISTS question_edits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,   -- Never reused: ids are read positions
+    question_id TEXT NOT NULL,
+    edit TEXT NOT NULL
+);
+"""
+
+SCHEMA = QUESTION_EDITS_TABLE + """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS views (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    question_id TEXT,
+    correct INTEGER,
+    skipped INTEGER,
+    timestamp TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_by_question ON answers (question_id);
+CREATE INDEX IF NOT EXISTS answers_by_time ON answers (timestamp);
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    stats TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (score DESC, id);
+CREATE INDEX IF NOT EXISTS scores_by_date ON scores (date);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('views_total', 0);
+"""
+
+TABLES = ('views', 'answers', 'scores', 'question_edits')
+
+
+class Database:
+    """
+    The SQLite file, with one connection per thread.
+    Database errors are raised as OSError, like failed file writes.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.connection()
+        conn.executescript(SCHEMA)
+        self._upgrade(conn)
+
+    def _upgrade(self, conn):
+        """Rebuild a question_edits table made before its ids were AUTOINCREMENT."""
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'question_edits'").fetchone()[0]
+        if 'AUTOINCREMENT' in sql:
+            return
+        conn.executescript("""
+            BEGIN IMMEDIATE;
+            ALTER TABLE question_edits RENAME TO question_edits_old;
+            """ + QUESTION_EDITS_TABLE + """
+            INSERT INTO question_edits (id, question_id, edit)
+                SELECT id, question_id, edit FROM question_edits_old;
+            DROP TABLE question_edits_old;
+            COMMIT;
+        """)
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly below
+            conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')  # Durable at checkpoints; never corrupt
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        `with db.transaction() as conn:` - one atomic write (takes the write lock up front).
+        A transaction opened inside another on the same thread joins the outer one.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            raise OSError(f"database error: {e}") from e
+
+    def query(self, sql, params=()):
+        """Run a read and return all rows."""
+        try:
+            return self.connection().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise OSError(f"database error: {e}") from e
+
+    def is_empty(self):
+        return all(self.query(f"SELECT COUNT(*) FROM {table}")[0][0] == 0 for table in TABLES)
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+class SQLiteViewCounter:
+    """
+    View counts (same methods as view_counter.ViewCounter). Each play is one upsert.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def increment(self, key):
+        """Add one view for key. Returns (count for key, total views)."""
+        with metrics.io_timer('save_views'), self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO views (key, count) VALUES (?, 1) "
+                "ON CONFLICT (key) DO UPDATE SET count = count + 1", (key,))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'views_total'")
+            count = conn.execute("SELECT count FROM views WHERE key = ?", (key,)).fetchone()[0]
+            total = conn.execute("SELECT value FROM meta WHERE key = 'views_total'").fetchone()[0]
+        return count, total
+
+    def get_total(self):
+        """Total views across all files."""
+        return self.db.query("SELECT value FROM meta WHERE key = 'views_total'")[0][0]
+
+    def snapshot(self):
+        """Copy of all view counts."""
+        with metrics.io_timer('load_views'):
+            return dict(self.db.query("SELECT key, count FROM views"))
+
+    def flush(self):
+        """Nothing buffered - every increment is committed."""
+
+    def close(self):
+        """Nothing buffered - every increment is committed."""
+
+
+class SQLiteAnswerLog:
+    """
+    Quiz answer history (same methods as answer_log.AnswerLog). Each answer is one insert.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def append(self, record):
+        """Store one answer record."""
+        try:
+            with metrics.io_timer('save_answer'), self.db.transaction() as conn:
+                _insert_answer(conn, record)
+        except OSError as e:
+            print(f"[Answers] Error writing answer: {e}")
+
+    def load_all(self):
+        """Every recorded answer, oldest first."""
+        with metrics.io_timer('load_answers'):
+            return [json.loads(row[0]) for row in self.db.query("SELECT record FROM answers ORDER BY id")]
+
+    def flush(self):
+        """Nothing buffered - every answer is committed."""
+
+    def close(self):
+        """Nothing buffered - every answer is committed."""
+
+
+def _insert_answer(conn, record, answer_id=None):
+    conn.execute(
+        "INSERT INTO answers (id, question_id, correct, skipped, timestamp, record) VALUES (?, ?, ?, ?, ?, ?)",
+        (answer_id, str(record.get('question_id')), bool(record.get('correct')), bool(record.get('skipped')),
+         record.get('timestamp'), json.dumps(record, separators=(',', ':'))))
+
+
+class SQLiteLeaderboard:
+    """
+    Top-N scores with expiry (same methods as leaderboard.Leaderboard).
+    Rows that fall off the board or expire are deleted when a score is written, so
+    the table stays tiny; reads are plain SELECTs and never take the write lock.
+    """
+
+    def __init__(self, db, max_scores=MAX_SCORES, expiry_days=EXPIRY_DAYS):
+        self.db = db
+        self.max_scores = max_scores
+        self.expiry = timedelta(days=expiry_days)
+
+    def _cutoff(self):
+        return (datetime.now() - self.expiry).isoformat()
+
+    def _top(self, rows):
+        """Score rows as entries, best first (older first among ties)."""
+        return [{"name": name, "score": score, "date": date, "stats": json.loads(stats)}
+                for name, score, date, stats in rows]
+
+    def _board(self, conn):
+        """Entries after _prune (inside a write), best first."""
+        return self._top(conn.execute("SELECT name, score, date, stats FROM scores ORDER BY score DESC, id"))
+
+    def _prune(self, conn):
+        """Delete expired rows and rows that fell off the board (only done when writing)."""
+        conn.execute("DELETE FROM scores WHERE date < ?", (self._cutoff(),))
+        conn.execute(
+            "DELETE FROM scores WHERE id NOT IN (SELECT id FROM scores ORDER BY score DESC, id LIMIT ?)",
+            (self.max_scores,))
+
+    def get(self):
+        """Get the current leaderboard (a plain read - expired rows are skipped, not deleted)."""
+        with metrics.io_timer('load_scores'):
+            return self._top(self.db.query(
+                "SELECT name, score, date, stats FROM scores WHERE date >= ? ORDER BY score DESC, id LIMIT ?",
+                (self._cutoff(), self.max_scores)))
+
+    def is_top_score(self, score):
+        """Check if score qualifies for the leaderboard."""
+        board = self.get()
+        return len(board) < self.max_scores or score > board[-1]["score"]
+
+    def add(self, entry):
+        """Add an entry. Returns (made_the_board, updated leaderboard)."""
+        with metrics.io_timer('save_scores'), self.db.transaction() as conn:
+            self._prune(conn)
+            board = self._board(conn)
+            if len(board) >= self.max_scores and entry["score"] <= board[-1]["score"]:
+                return False, board
+            _insert_score(conn, entry)
+            self._prune(conn)
+            return True, self._board(conn)
+
+    def replace(self, scores):
+        """Replace every entry (e.g. [] to clear the board)."""
+        with metrics.io_timer('save_scores'), self.db.transaction() as conn:
+            conn.execute("DELETE FROM scores")
+            for entry in scores:
+                try:
+                    datetime.fromisoformat(entry["date"])
+                    _insert_score(conn, entry)
+                except (KeyError, ValueError, TypeError):
+                    continue
+            self._prune(conn)
+
+    def flush(self):
+        """Nothing buffered - every score is committed."""
+
+    def close(self):
+        """Nothing buffered - every score is committed."""
+
+
+def _insert_score(conn, entry):
+    conn.execute(
+        "INSERT INTO scores (name, score, date, stats) VALUES (?, ?, ?, ?)",
+        (entry["name"], int(entry["score"]), entry["date"], json.dumps(entry.get("stats") or {})))
+
+
+class SQLiteQuestionEdits:
+    """
+    Question edit journal (same methods as quiz.EditJournal).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def read(self, after=None):
+        """
+        Edits stored after row id `after` (None reads them all), oldest first, and the
+        last id read. Returns (None, 0) if another process already folded edits after
+        `after` into questions.json - the caller has to reload that file first.
+        """
+        if after:
+            folded = self.db.query("SELECT value FROM meta WHERE key = 'question_edits_folded'")
+            if folded and folded[0][0] > after:
+                return None, 0
+        rows = self.db.query("SELECT id, edit FROM question_edits WHERE id > ? ORDER BY id", (after or 0,))
+        return [json.loads(edit) for _, edit in rows], (rows[-1][0] if rows else after or 0)
+
+    def append(self, edit):
+        """Store one edit."""
+        with metrics.io_timer('save_question_edit'), self.db.transaction() as conn:
+            conn.execute("INSERT INTO question_edits (question_id, edit) VALUES (?, ?)",
+                         (edit.get('id'), json.dumps(edit, ensure_ascii=False)))
+
+    def clear(self, upto=None):
+        """
+        Forget the edits up to row id `upto` (all if None), after they were folded into
+        questions.json; later edits (e.g. from another process) are kept. Returns the
+        id folded up to.
+        """
+        with self.db.transaction() as conn:
+            if upto is None:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'question_edits'").fetchone()
+                upto = row[0] if row else 0
+            conn.execute("DELETE FROM question_edits WHERE id <= ?", (upto,))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('question_edits_folded', ?)", (upto,))
+        return upto
+
+    def exclusive(self):
+        """
+        Database write lock, held while the journal is folded into questions.json,
+        so no other process adds or folds edits in between.
+        """
+        return self.db.transaction()
+
+
+# ----------------------------------------
+# JSON import / export
+# ----------------------------------------
+
+def json_paths(base_dir):
+    """Where the JSON backend keeps its files (mirrors app.py)."""
+    base_dir = Path(base_dir)
+    return {
+        'views': base_dir / "views.json",
+        'scores': base_dir / "scores.json",
+        'answers_dir': base_dir / "data",
+        'answers_legacy': base_dir / "quiz_answers.json",
+        'question_edits': base_dir / "data" / "question_edits.jsonl",
+    }
+
+
+def import_json(db, base_dir, replace=False, merge=False):
+    """
+    Copy the JSON backend's data into the database. Returns row counts per table.
+    With merge, existing rows are kept: view counts are added up and the imported
+    answers are placed before the ones already stored (scores and question edits
+    are added after them).
+    """
+    from answer_log import read_journal
+    from leaderboard import Leaderboard
+    from quiz import EditJournal
+    from view_counter import ViewCounter
+
+    if not db.is_empty() and not (replace or merge):
+        raise RuntimeError("database already has data (use --replace to overwrite or --merge to add)")
+
+    paths = json_paths(base_dir)
+    # Read the files as they are: nothing is migrated, rotated or rewritten
+    view_counts = ViewCounter(paths['views']).snapshot()
+    score_entries = Leaderboard(paths['scores']).get()
+    legacy_answers = read_json(paths['answers_legacy'], [])
+    answer_records = (legacy_answers if isinstance(legacy_answers, list) else []) + read_journal(paths['answers_dir'])
+    edits, _ = EditJournal(paths['question_edits']).read()
+
+    with db.transaction() as conn:
+        if not merge:
+            for table in TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("UPDATE meta SET value = 0 WHERE key = 'views_total'")
+        conn.executemany(
+            "INSERT INTO views (key, count) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET count = count + excluded.count", view_counts.items())
+        conn.execute("UPDATE meta SET value = value + ? WHERE key = 'views_total'", (sum(view_counts.values()),))
+        # The imported answers are older: move the stored ones up to make room at the
+        # front (in two steps, as ids must stay unique after every row)
+        conn.execute("UPDATE answers SET id = -id")
+        conn.execute("UPDATE answers SET id = ? - id", (len(answer_records),))
+        for answer_id, record in enumerate(answer_records, 1):
+            _insert_answer(conn, record, answer_id)
+        for entry in score_entries:
+            _insert_score(conn, entry)
+        conn.executemany("INSERT INTO question_edits (question_id, edit) VALUES (?, ?)",
+                         [(edit.get('id'), json.dumps(edit, ensure_ascii=False)) for edit in edits])
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', 1)")
+
+    return {'views': len(view_counts), 'answers': len(answer_records),
+            'scores': len(score_entries), 'question_edits': len(edits)}
+
+
+def export_json(db, out_dir):
+    """
+    Write the database out in the JSON backend's layout under out_dir
+    (answers as a quiz_answers.json array, which the JSON backend migrates on start).
+    """
+    paths = json_paths(out_dir)
+    views = dict(db.query("SELECT key, count FROM views ORDER BY key"))
+    answers = [json.loads(row[0]) for row in db.query("SELECT record FROM answers ORDER BY id")]
+    scores = [{"name": name, "score": score, "date": date, "stats": json.loads(stats)}
+              for name, score, date, stats in db.query(
+                  "SELECT name, score, date, stats FROM scores ORDER BY score DESC, id")]
+    edits = [row[0] for row in db.query("SELECT edit FROM question_edits ORDER BY id")]
+
+    write_json(paths['views'], views, backups=BACKUP_VERSIONS)
+    write_json(paths['answers_legacy'], answers)
+    write_json(paths['scores'], scores, backups=BACKUP_VERSIONS)
+    if edits:
+        write_bytes(paths['question_edits'], ''.join(edit + '\n' for edit in edits).encode('utf-8'))
+    return {'views': len(views), 'answers': len(answers), 'scores': len(scores), 'question_edits': len(edits)}
+
+
+def import_on_first_start(db, base_dir):
+    """
+    Import the JSON files once (run before the server binds). Only the json_imported
+    flag counts: rows the database already holds are kept and the JSON data merged in.
+    """
+    if db.query("SELECT 1 FROM meta WHERE key = 'json_imported'"):
+        return
+    counts = import_json(db, base_dir, merge=True)
+    if any(counts.values()):
+        print(f"[Storage] Imported JSON data into {db.path.name}: {counts}")
+
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args or args[0] not in ('import', 'export') or (args[0] == 'export' and len(args) < 2):
+        print(__doc__)
+        sys.exit(2)
+
+    if args[0] == 'import':
+        base = Path(args[1]) if len(args) > 1 else Path(__file__).parent
+        database = Database(base / "data" / DATABASE_NAME)
+        try:
+            counts = import_json(database, base, replace='--replace' in sys.argv, merge='--merge' in sys.argv)
+            print(f"[Storage] Imported: {counts}")
+        except RuntimeError as e:
+            print(f"[Storage] {e}")
+            sys.exit(1)
+    else:
+        base = Path(args[2]) if len(args) > 2 else Path(__file__).parent
+        database = Database(base / "data" / DATABASE_NAME)
+        print(f"[Storage] Exported to {args[1]}: {export_json(database, Path(args[1]))}")
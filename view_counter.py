@@ -0,0 +1,87 @@
+"""
+View counter module - keeps content view counts in memory and writes them to disk in the background.
+A play costs a dict update; the JSON file is rewritten (atomically, by the shared
+persistence writer) at most every FLUSH_INTERVAL seconds, or sooner once
+FLUSH_THRESHOLD plays are waiting.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from persistence import BACKUP_VERSIONS, read_json, writer
+
+# Optional overrides, e.g. SKILLPLAYER_VIEWS_FLUSH_SECONDS=30
+FLUSH_INTERVAL = float(os.environ.get('SKILLPLAYER_VIEWS_FLUSH_SECONDS', 10))
+FLUSH_THRESHOLD = int(os.environ.get('SKILLPLAYER_VIEWS_FLUSH_EVERY', 25))
+
+
+class ViewCounter:
+    """
+    In-process view counts with write-behind persistence.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, flush_threshold=FLUSH_THRESHOLD):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self.lock = threading.Lock()
+        self.counts = self._load()
+        self.total = sum(self.counts.values())
+        self.dirty = 0
+
+    def _load(self):
+        """Load view counts from the JSON file."""
+        data = read_json(self.path, {}, operation='load_views')
+        try:
+            if isinstance(data, dict):
+                return {k: int(v) for k, v in data.items()}
+        except (ValueError, TypeError):
+            pass
+        return {}
+
+    def increment(self, key):
+        """Add one view for key. Returns (count for key, total views)."""
+        with self.lock:
+            count = self.counts.get(key, 0) + 1
+            self.counts[key] = count
+            self.total += 1
+            self.dirty += 1
+            total = self.total
+            dirty = self.dirty
+
+        # The first play schedules a write; reaching the threshold brings it forward
+        if dirty == self.flush_threshold:
+            self._schedule(0)
+        elif dirty == 1:
+            self._schedule(self.flush_interval)
+        return count, total
+
+    def get_total(self):
+        """Total views across all files."""
+        with self.lock:
+            return self.total
+
+    def snapshot(self):
+        """Copy of all view counts."""
+        with self.lock:
+            return dict(self.counts)
+
+    def _schedule(self, delay):
+        writer.schedule(self.path, self._snapshot, delay,
+                        backups=BACKUP_VERSIONS, operation='save_views')
+
+    def _snapshot(self):
+        """Counts to write (called by the writer at write time)."""
+        with self.lock:
+            self.dirty = 0
+            return dict(self.counts)
+
+    def flush(self):
+        """Write pending plays to disk now."""
+        writer.flush(self.path)
+
+    def close(self):
+        """Flush anything still pending (the writer also flushes at exit)."""
+        self.flush()